@@ -0,0 +1,292 @@
+import hashlib
+import json
+import os
+
+from local.dataIO import json as json_io
+from local.dataIO import packed
+from local.rigging.common import utils as rig_utils
+
+import numpy as np
+
+INDEX_FILE_NAME = 'index.json'
+BLOB_FILE_FORMAT = 'poses_{:03}.pack'
+# Blobs are closed to new poses once they pass this size
+BLOB_SIZE_LIMIT = 64 * 1024 * 1024
+INDEX_VERSION = 1
+
+
+class PoseLibrary(object):
+    """
+    A directory of rig poses.  Poses are appended as packed records to a few
+    pooled blob files, and one index file maps every pose name to its blob,
+    byte offset, tags and control layout.  Layouts (the controls and attributes
+    a pose stores) are kept once in the index and shared by every pose saved
+    from the same rig, so loading part of a pose reads only the byte ranges of
+    the controls asked for.
+
+    Control sets name groups of controls, such as a hand, to load or blend on
+    their own.
+
+    Example:
+        library = PoseLibrary('/show/poses/hero')
+        library.save_pose('fist', root='hero_RIG', tags=['hand'])
+        library.set_control_set('L_hand', ['L_thumb_01_CTL', 'L_index_01_CTL'])
+        library.apply_pose('fist', root='hero_RIG', control_set='L_hand')
+
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._index = None
+        self._maps = {}
+        self._readers = {}
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, INDEX_FILE_NAME)
+
+    @property
+    def index(self):
+        if self._index is None:
+            if os.path.isfile(self.index_path):
+                self._index = dict(json_io.load_from_json(self.index_path))
+                if self._index.get('version', 0) > INDEX_VERSION:
+                    raise IOError('{} uses index version {}, newer than supported ({})!'.format(
+                        self.index_path, self._index['version'], INDEX_VERSION))
+            else:
+                self._index = {'version': INDEX_VERSION, 'layouts': {}, 'poses': {},
+                               'control_sets': {}}
+        return self._index
+
+    def _save_index(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        json_io.save_to_json(self.index, self.index_path)
+
+    def _reader(self, blob, offset):
+        key = (blob, offset)
+        if key not in self._readers:
+            if blob not in self._maps:
+                self._maps[blob] = packed.open_map(os.path.join(self.directory, blob))
+            self._readers[key] = packed.PackedReader(
+                os.path.join(self.directory, blob), offset, shared_map=self._maps[blob])
+        return self._readers[key]
+
+    def _close_blob(self, blob):
+        for key in [key for key in self._readers if key[0] == blob]:
+            self._readers.pop(key).close()
+        if blob in self._maps:
+            self._maps.pop(blob).close()
+
+    def close(self):
+        """
+        Releases every memory mapped blob.
+        """
+        for blob in list(self._maps):
+            self._close_blob(blob)
+
+    def _current_blob(self):
+        blobs = sorted(set(pose['blob'] for pose in self.index['poses'].values()))
+        if blobs:
+            blob_path = os.path.join(self.directory, blobs[-1])
+            if os.path.getsize(blob_path) < BLOB_SIZE_LIMIT:
+                return blobs[-1]
+        return BLOB_FILE_FORMAT.format(len(blobs))
+
+    # Poses ------------------------------------------------------------#
+    def names(self, tag=None):
+        return sorted(name for name, pose in self.index['poses'].items()
+                      if tag is None or tag in pose['tags'])
+
+    def tags(self):
+        return sorted(set(tag for pose in self.index['poses'].values() for tag in pose['tags']))
+
+    def exists(self, name):
+        return name in self.index['poses']
+
+    def save_pose(self, name, root, tags=None):
+        """
+        Reads the rig's current pose and appends it to the library, replacing
+        any pose saved under the same name.
+        """
+        pose_controls, values = rig_utils.read_rig_pose(root)
+        layout_data = json.dumps(pose_controls, sort_keys=True).encode('utf-8')
+        layout = hashlib.sha1(layout_data).hexdigest()[:12]
+        self.index['layouts'].setdefault(layout, pose_controls)
+
+        blob = self._current_blob()
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        header = {'type': rig_utils.POSE_FILE_TYPE, 'version': rig_utils.POSE_FILE_VERSION,
+                  'name': name, 'layout': layout}
+        offset, size = packed.append_packed(header, values,
+                                            os.path.join(self.directory, blob))
+        # The blob grew, existing maps do not cover the new record
+        self._close_blob(blob)
+
+        self.index['poses'][name] = {'blob': blob, 'offset': offset, 'size': size,
+                                     'layout': layout, 'tags': sorted(set(tags or []))}
+        self._save_index()
+        return name
+
+    def delete_pose(self, name):
+        """
+        Removes a pose from the index.  Its record stays in the blob until the
+        library is rebuilt.
+        """
+        if self.index['poses'].pop(name, None) is not None:
+            self._save_index()
+
+    def set_tags(self, name, tags):
+        self.index['poses'][name]['tags'] = sorted(set(tags))
+        self._save_index()
+
+    # Control sets -----------------------------------------------------#
+    def control_sets(self):
+        return sorted(self.index['control_sets'])
+
+    def set_control_set(self, name, controls):
+        self.index['control_sets'][name] = sorted(
+            set(rig_utils.pose_control_name(control) for control in controls))
+        self._save_index()
+
+    def delete_control_set(self, name):
+        if self.index['control_sets'].pop(name, None) is not None:
+            self._save_index()
+
+    # Loading ----------------------------------------------------------#
+    def _requested_controls(self, controls, control_set):
+        if control_set is not None:
+            return set(self.index['control_sets'][control_set])
+        if controls is not None:
+            return set(rig_utils.pose_control_name(control) for control in controls)
+        return None
+
+    def load_pose(self, name, controls=None, control_set=None):
+        """
+        Reads a pose, or only the controls asked for.
+
+        Args:
+            name (str): Pose name.
+            controls (list[str]): Control names to read.
+            control_set (str): Saved control set to read.  Overrides controls.
+
+        Returns:
+            (tuple): The [name, uuid, attributes, offset] entries that were read
+                and their values, in the same form as rig_utils.read_rig_pose.
+
+        """
+        pose = self.index['poses'][name]
+        requested = self._requested_controls(controls, control_set)
+        reader = self._reader(pose['blob'], pose['offset'])
+
+        pose_controls = []
+        value_slices = []
+        offset = 0
+        for control_name, uuid, attrs, value_offset in self.index['layouts'][pose['layout']]:
+            if requested is not None and control_name not in requested:
+                continue
+            pose_controls.append([control_name, uuid, attrs, offset])
+            value_slices.append(reader.values(value_offset, len(attrs)))
+            offset += len(attrs)
+
+        if not value_slices:
+            return pose_controls, np.empty(0, dtype=np.float32)
+        return pose_controls, np.concatenate(value_slices)
+
+    def apply_pose(self, name, root=None, controls=None, control_set=None, match_by='name'):
+        pose_controls, values = self.load_pose(name, controls=controls, control_set=control_set)
+        plugs, indices, integer_mask = rig_utils.resolve_pose_plugs(
+            pose_controls, root=root, match_by=match_by)
+        rig_utils.apply_pose_values(plugs, values[indices], integer_mask)
+        return len(plugs)
+
+    def blender(self, names, root=None, controls=None, control_set=None, match_by='name'):
+        return PoseBlender(self, names, root=root, controls=controls,
+                           control_set=control_set, match_by=match_by)
+
+
+class PoseBlender(object):
+    """
+    Blends two or more library poses onto a rig.  The poses are read and the
+    rig plugs resolved once when the blender is made, leaving each blend() a
+    single matrix product over the packed values and one batched write, cheap
+    enough to run from a slider's valueChanged signal.
+
+    Values a pose does not store are taken from the rig as it was when the
+    blender was created.
+
+    Example:
+        blender = library.blender(['relaxed', 'fist'], root='hero_RIG', control_set='L_hand')
+        slider.valueChanged.connect(lambda value: blender.lerp(value / 100.0))
+
+    """
+
+    def __init__(self, library, names, root=None, controls=None, control_set=None,
+                 match_by='name'):
+        if len(names) < 2:
+            raise ValueError('At least two poses are needed to blend!')
+        self.names = list(names)
+
+        # Union of every pose's controls and attributes
+        union_controls = {}
+        loaded = []
+        for name in self.names:
+            pose_controls, values = library.load_pose(name, controls=controls,
+                                                      control_set=control_set)
+            loaded.append((pose_controls, values))
+            for control_name, uuid, attrs, _ in pose_controls:
+                union_attrs = union_controls.setdefault(control_name, [uuid, []])[1]
+                union_attrs.extend(attr for attr in attrs if attr not in union_attrs)
+
+        pose_controls = []
+        columns = {}
+        for control_name, (uuid, attrs) in union_controls.items():
+            pose_controls.append([control_name, uuid, attrs, len(columns)])
+            for attr in attrs:
+                columns[(control_name, attr)] = len(columns)
+
+        pose_values = np.full((len(self.names), len(columns)), np.nan, dtype=np.float32)
+        for row, (loaded_controls, values) in enumerate(loaded):
+            for control_name, _, attrs, offset in loaded_controls:
+                for index, attr in enumerate(attrs):
+                    pose_values[row, columns[(control_name, attr)]] = values[offset + index]
+
+        self.plugs, indices, self.integer_mask = rig_utils.resolve_pose_plugs(
+            pose_controls, root=root, match_by=match_by)
+        self.pose_values = pose_values[:, indices]
+        current = np.array([plug.asDouble() for plug in self.plugs], dtype=np.float32)
+        missing = np.isnan(self.pose_values)
+        self.pose_values[missing] = np.broadcast_to(current, self.pose_values.shape)[missing]
+
+        self._weights = None
+
+    def blend(self, weights):
+        """
+        Applies the weighted sum of the poses.  Weights are normalized, and a
+        call with unchanged weights does not write to the rig.
+
+        Args:
+            weights (list[float]): One weight per pose.
+
+        """
+        weights = np.asarray(weights, dtype=np.float32)
+        if weights.shape != (len(self.names),):
+            raise IndexError('Expected {} pose weights, got {}!'.format(len(self.names), weights.size))
+        total = weights.sum()
+        if total:
+            weights = weights / total
+        if self._weights is not None and np.array_equal(weights, self._weights):
+            return
+        self._weights = weights
+
+        rig_utils.apply_pose_values(self.plugs, weights.dot(self.pose_values), self.integer_mask)
+
+    def lerp(self, blend_value, first=0, second=1):
+        """
+        Linear blend between two of the poses, 0.0 being the first.
+        """
+        weights = np.zeros(len(self.names), dtype=np.float32)
+        weights[first] = 1.0 - blend_value
+        weights[second] += blend_value
+        self.blend(weights)
@@ -0,0 +1,277 @@
+import os
+
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+
+# Changes pushed through API modifiers from a script are not recorded on Maya's
+# undo queue by themselves.  Every helper here runs its modifier through do_it,
+# which hands it to the command of the api_undo plugin so the edit undoes with
+# the rest of an UndoBlock.
+UNDO_PLUGIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api_undo.py')
+UNDO_COMMAND = 'nloveApiUndo'
+
+_pending_operations = []
+
+
+def pop_pending_operation():
+    return _pending_operations.pop()
+
+
+def record_undo(operation):
+    """
+    Records an operation that has already run on Maya's undo queue.  The
+    operation is anything with doIt and undoIt methods, such as a modifier.
+    """
+    if not cmds.undoInfo(query=True, state=True):
+        return
+    if not cmds.pluginInfo(UNDO_PLUGIN, query=True, loaded=True):
+        cmds.loadPlugin(UNDO_PLUGIN, quiet=True)
+    _pending_operations.append(operation)
+    getattr(cmds, UNDO_COMMAND)()
+
+
+def do_it(modifier):
+    """
+    Runs a modifier and records it on Maya's undo queue.
+    """
+    modifier.doIt()
+    record_undo(modifier)
+
+
+class TransformEdit(object):
+    """
+    Transformation changes made through MFnTransform, kept so they can be
+    undone and redone like a modifier.
+    """
+
+    def __init__(self):
+        self._edits = []
+
+    def set_transformation(self, dag_path, transformation):
+        transform_fn = om.MFnTransform(dag_path)
+        self._edits.append((om.MDagPath(dag_path), transform_fn.transformation(), transformation))
+        transform_fn.setTransformation(transformation)
+
+    def doIt(self):
+        for dag_path, _, transformation in self._edits:
+            om.MFnTransform(dag_path).setTransformation(transformation)
+
+    def undoIt(self):
+        for dag_path, transformation, _ in reversed(self._edits):
+            om.MFnTransform(dag_path).setTransformation(transformation)
+
+
+
+def record_created_nodes(mobjects):
+    """
+    Records nodes made through function sets (MFn*.create), which Maya does not
+    undo by itself.  Undoing deletes them and redoing restores them, children
+    included, so only the top created nodes need to be given.
+    """
+    modifier = om.MDagModifier()
+    for mobject in mobjects:
+        modifier.deleteNode(mobject, includeParents=False)
+    record_undo(_InverseModifier(modifier))
+
+
+class _InverseModifier(object):
+
+    def __init__(self, modifier):
+        self._modifier = modifier
+
+    def doIt(self):
+        self._modifier.undoIt()
+
+    def undoIt(self):
+        self._modifier.doIt()
+
+
+def get_mobject(node):
+    selection = om.MSelectionList()
+    selection.add(node)
+    return selection.getDependNode(0)
+
+
+def get_dag_path(node):
+    selection = om.MSelectionList()
+    selection.add(node)
+    return selection.getDagPath(0)
+
+
+def get_plug(plug_name):
+    selection = om.MSelectionList()
+    selection.add(plug_name)
+    return selection.getPlug(0)
+
+
+def _get_mobjects(names, to_item=None):
+    """
+    Adds names (or what to_item makes of them) to one selection list in order
+    and returns the node each one matched, or None where it matched nothing.
+    Duplicates resolve to the same node rather than being merged away.
+    """
+    selection = om.MSelectionList()
+    found = {}
+    mobjects = []
+    for name in names:
+        if name not in found:
+            count = selection.length()
+            try:
+                selection.add(to_item(name) if to_item else name)
+            except (RuntimeError, ValueError):
+                pass
+            found[name] = selection.getDependNode(count) if selection.length() > count else None
+        mobjects.append(found[name])
+    return mobjects
+
+
+def get_uuids(nodes):
+    """
+    Returns the UUID string of each node, in order, from one selection list.
+    """
+    return [om.MFnDependencyNode(mobject).uuid().asString() if mobject is not None else None
+            for mobject in _get_mobjects(nodes)]
+
+
+def get_nodes_from_uuids(uuids, full_path=True):
+    """
+    Resolves each UUID string to its node name, in order, from one selection
+    list.  UUIDs with no node in the scene resolve to None.
+    """
+    return [get_name(mobject, full_path=full_path) if mobject is not None else None
+            for mobject in _get_mobjects(uuids, to_item=om.MUuid)]
+
+
+def get_name(mobject, full_path=False):
+    """
+    Returns the name of a node from its MObject.  DAG nodes are returned as
+    their shortest unique path unless full_path is set.
+    """
+    if mobject.hasFn(om.MFn.kDagNode):
+        dag_node = om.MFnDagNode(mobject)
+        return dag_node.fullPathName() if full_path else dag_node.partialPathName()
+    return om.MFnDependencyNode(mobject).name()
+
+
+_INTEGER_NUMERIC_TYPES = (
+    om.MFnNumericData.kBoolean,
+    om.MFnNumericData.kByte,
+    om.MFnNumericData.kChar,
+    om.MFnNumericData.kShort,
+    om.MFnNumericData.kInt,
+    om.MFnNumericData.kInt64,
+    om.MFnNumericData.kAddr,
+)
+
+
+def is_integer_plug(plug):
+    """
+    Returns True for plugs whose value has to be set as an int (bool, enum and
+    integer numeric attributes).
+    """
+    attribute = plug.attribute()
+    if attribute.hasFn(om.MFn.kEnumAttribute):
+        return True
+    if attribute.hasFn(om.MFn.kNumericAttribute):
+        return om.MFnNumericAttribute(attribute).numericType() in _INTEGER_NUMERIC_TYPES
+    return False
+
+
+def set_plug_value(modifier, plug, value):
+    """
+    Queues a plug value on a modifier.  Tuples/lists are spread over the
+    children of compound plugs.
+    """
+    if isinstance(value, (list, tuple)):
+        for index, child_value in enumerate(value):
+            set_plug_value(modifier, plug.child(index), child_value)
+    elif isinstance(value, (bool, int)):
+        modifier.newPlugValueInt(plug, int(value))
+    else:
+        modifier.newPlugValueDouble(plug, float(value))
+
+
+def set_plug_values(plug_values):
+    """
+    Sets any number of (plug_name, value) pairs in one MDGModifier pass.
+    """
+    modifier = om.MDGModifier()
+    for plug_name, value in plug_values:
+        set_plug_value(modifier, get_plug(plug_name), value)
+    do_it(modifier)
+
+
+def connect_plugs(connections):
+    """
+    Makes any number of (source_plug, destination_plug) connections in one
+    MDGModifier pass.
+    """
+    modifier = om.MDGModifier()
+    for source, destination in connections:
+        modifier.connect(get_plug(source), get_plug(destination))
+    do_it(modifier)
+
+
+def _resolve_parent(parent, created):
+    if parent is None or parent == '':
+        return om.MObject.kNullObj
+    if isinstance(parent, om.MObject):
+        return parent
+    if isinstance(parent, int):
+        if not 0 <= parent < len(created):
+            raise IndexError('Parent index {} has not been created yet!'.format(parent))
+        return created[parent]
+    return get_mobject(parent)
+
+
+def create_dag_nodes(node_type, names, parents=None):
+    """
+    Creates any number of DAG nodes, each directly under its parent, in a single
+    MDagModifier pass.
+
+    Args:
+        node_type (str) or (list[str]): Node type for every node, or one type
+            per name.
+        names (list[str]): Names for the new nodes.  Clashing names are made
+            unique by Maya.
+        parents (list): Parent for each node.  Entries may be a node name, an
+            MObject, None for world, or an int index of a node created earlier
+            in the same call.
+
+    Returns:
+        (list[MObject]): The created nodes, in the order of names.
+
+    """
+    if isinstance(node_type, str):
+        node_type = [node_type] * len(names)
+    parents = parents or [None] * len(names)
+
+    modifier = om.MDagModifier()
+    created = []
+    for node_type_name, name, parent in zip(node_type, names, parents):
+        mobject = modifier.createNode(node_type_name, _resolve_parent(parent, created))
+        modifier.renameNode(mobject, name)
+        created.append(mobject)
+    do_it(modifier)
+    return created
+
+
+def set_world_matrices(mobjects, matrices):
+    """
+    Places transforms at world space matrices.  Nodes must be ordered parents
+    first so each parent is in place before its children are solved.
+
+    Args:
+        mobjects (list[MObject]): Transform nodes to move.
+        matrices (list): A 16 float world matrix per node, or None to leave the
+            node where it is.
+
+    """
+    edit = TransformEdit()
+    for mobject, matrix in zip(mobjects, matrices):
+        if matrix is None:
+            continue
+        dag_path = om.MDagPath.getAPathTo(mobject)
+        local_matrix = om.MMatrix(matrix) * dag_path.exclusiveMatrixInverse()
+        edit.set_transformation(dag_path, om.MTransformationMatrix(local_matrix))
+    record_undo(edit)
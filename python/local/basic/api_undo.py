@@ -0,0 +1,47 @@
+"""
+Maya plugin behind api.do_it.  Modifiers run from a script never reach Maya's
+undo queue, so each one is handed to an nloveApiUndo command after it has run;
+the command undoes and redoes it with the rest of the queue.
+
+Loaded on demand by local.basic.api, there is no need to load it by hand.
+"""
+
+from local.basic import api
+
+import maya.api.OpenMaya as om
+
+
+def maya_useNewAPI():
+    pass
+
+
+class ApiUndoCommand(om.MPxCommand):
+
+    def __init__(self):
+        om.MPxCommand.__init__(self)
+        self.operation = None
+
+    @staticmethod
+    def creator():
+        return ApiUndoCommand()
+
+    def doIt(self, args):
+        # The operation has already run, the command only keeps it
+        self.operation = api.pop_pending_operation()
+
+    def redoIt(self):
+        self.operation.doIt()
+
+    def undoIt(self):
+        self.operation.undoIt()
+
+    def isUndoable(self):
+        return True
+
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin).registerCommand(api.UNDO_COMMAND, ApiUndoCommand.creator)
+
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(api.UNDO_COMMAND)
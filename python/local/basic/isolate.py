@@ -0,0 +1,240 @@
+from contextlib import contextmanager
+import codecs
+import json
+import os
+
+from local.basic import api
+from local.dataIO import json as json_io
+
+import maya.cmds as cmds
+
+PRESET_FILE_INFO_KEY = 'nloveIsolatePresets'
+PRESET_SIDECAR_SUFFIX = '_isolatePresets.json'
+
+
+class IsolateManager(object):
+    """
+    Caches the isolate set membership of each model panel and applies edits as
+    membership diffs straight onto the panel's view set.  Nothing is selected
+    and isolate is never toggled off, so the viewport only refreshes the nodes
+    that actually changed.
+
+    Edits made inside a batch() block are collected per panel and applied in
+    one pass when the outermost block exits.
+
+    Example:
+        with isolate_manager.batch():
+            isolate_manager.add(['pCube1'], panel='modelPanel4')
+            isolate_manager.remove(['pSphere1'], panel='modelPanel1')
+
+    """
+
+    def __init__(self):
+        self._members = {}
+        self._view_sets = {}
+        self._pending = {}
+        self._batch_depth = 0
+
+    def _sync(self, panel):
+        """
+        Refreshes the cached membership if the panel's view set has changed
+        since it was last read (isolate toggled, panel rebuilt, new scene).
+        """
+        if not cmds.isolateSelect(panel, query=True, state=True):
+            self._view_sets.pop(panel, None)
+            self._members[panel] = set()
+            return None
+
+        view_set = cmds.isolateSelect(panel, query=True, viewObjects=True)
+        if view_set != self._view_sets.get(panel) or panel not in self._members:
+            self._view_sets[panel] = view_set
+            self._members[panel] = set(
+                cmds.ls(cmds.sets(view_set, query=True) or [], long=True))
+        return view_set
+
+    def _desired(self, panel):
+        if panel in self._pending:
+            return self._pending[panel]
+        self._sync(panel)
+        return set(self._members[panel])
+
+    def _queue(self, panel, members):
+        self._pending[panel] = members
+        if not self._batch_depth:
+            self.flush()
+
+    def members(self, panel):
+        """
+        Returns the long names of the nodes isolated in the given panel,
+        including any edits still pending in an open batch.
+        """
+        return sorted(self._desired(panel))
+
+    def add(self, nodes, panel):
+        nodes = set(cmds.ls(nodes, long=True))
+        self._queue(panel, self._desired(panel) | nodes)
+
+    def remove(self, nodes, panel):
+        nodes = set(cmds.ls(nodes, long=True))
+        self._queue(panel, self._desired(panel) - nodes)
+
+    def set_members(self, nodes, panel):
+        self._queue(panel, set(cmds.ls(nodes, long=True)))
+
+    def flush(self):
+        """
+        Applies every pending membership edit.  Each panel gets at most one
+        sets add, one sets remove and one isolate update.
+        """
+        pending, self._pending = self._pending, {}
+        for panel, desired in pending.items():
+            view_set = self._sync(panel)
+            if view_set is None:
+                # Nothing is isolated, so only an edit that adds members has
+                # anything to apply
+                if not desired:
+                    continue
+                # Turning isolate on seeds the view set from the selection,
+                # the diff below corrects it to the requested members
+                cmds.isolateSelect(panel, state=True)
+                view_set = self._sync(panel)
+
+            current = self._members[panel]
+            added = desired - current
+            removed = current - desired
+            if not added and not removed:
+                continue
+
+            if added:
+                cmds.sets(list(added), add=view_set)
+            if removed:
+                cmds.sets(list(removed), remove=view_set)
+            cmds.isolateSelect(panel, update=True)
+            self._members[panel] = set(desired)
+
+    def invalidate(self, panel=None):
+        """
+        Drops the cached membership for a panel, or for every panel if none is
+        given.  Call after isolate is edited outside of the manager.
+        """
+        if panel is None:
+            self._members.clear()
+            self._view_sets.clear()
+        else:
+            self._members.pop(panel, None)
+            self._view_sets.pop(panel, None)
+
+    @contextmanager
+    def batch(self):
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+
+class IsolatePresets(object):
+    """
+    Named isolate sets stored with the scene.  Presets are kept as a small JSON
+    string in the scene's fileInfo and mirrored to a sidecar JSON file next to
+    the scene so they can be shared or recovered outside of Maya.
+
+    Members are stored by UUID (plus any component suffix), so renaming or
+    reparenting a node does not break the preset.  Saving and restoring each
+    resolve every member through one ordered selection list instead of
+    scanning names.  Nothing is read from the scene until a preset is first
+    queried.
+
+    """
+
+    def __init__(self, manager=None):
+        self.manager = manager or isolate_manager
+        self._presets = None
+
+    @staticmethod
+    def sidecar_path():
+        scene = cmds.file(query=True, sceneName=True)
+        if not scene:
+            return None
+        return os.path.splitext(scene)[0] + PRESET_SIDECAR_SUFFIX
+
+    def _load(self):
+        if self._presets is not None:
+            return self._presets
+
+        self._presets = {}
+        stored = cmds.fileInfo(PRESET_FILE_INFO_KEY, query=True)
+        if stored:
+            # fileInfo hands the string back with its quotes escaped
+            self._presets = json.loads(codecs.decode(stored[0], 'unicode_escape'))
+        else:
+            sidecar = self.sidecar_path()
+            if sidecar and os.path.isfile(sidecar):
+                self._presets = dict(json_io.load_from_json(sidecar))
+        return self._presets
+
+    def _write(self):
+        cmds.fileInfo(PRESET_FILE_INFO_KEY, json.dumps(self._presets))
+        sidecar = self.sidecar_path()
+        if sidecar:
+            json_io.save_to_json(self._presets, sidecar)
+
+    def reset(self):
+        """
+        Forgets the loaded presets, forcing the next query to read the scene
+        again.  Call after a new scene is opened.
+        """
+        self._presets = None
+
+    def names(self):
+        return sorted(self._load().keys())
+
+    def exists(self, name):
+        return name in self._load()
+
+    def save(self, name, nodes):
+        """
+        Stores the given nodes (or components) as a named preset, replacing any
+        preset that already uses the name.
+        """
+        split_nodes = [node.partition('.') for node in cmds.ls(nodes, long=True)]
+        node_names = list(set(node_name for node_name, _, _ in split_nodes))
+        uuids = dict(zip(node_names, api.get_uuids(node_names)))
+        members = [[uuids[node_name], '.' + component if component else '']
+                   for node_name, _, component in split_nodes]
+
+        self._load()[name] = members
+        self._write()
+        return name
+
+    def delete(self, name):
+        if self._load().pop(name, None) is not None:
+            self._write()
+
+    def nodes(self, name):
+        """
+        Resolves a preset to current long names.  Members whose node has been
+        deleted are dropped.
+        """
+        members = self._load().get(name)
+        if not members:
+            return []
+
+        resolved = api.get_nodes_from_uuids([uuid for uuid, _ in members])
+        return [node + component for node, (_, component) in zip(resolved, members)
+                if node is not None]
+
+    def restore(self, name, panel):
+        """
+        Switches the panel to the preset by applying only the membership
+        difference to its isolate set.
+        """
+        nodes = self.nodes(name)
+        self.manager.set_members(nodes, panel)
+        return nodes
+
+
+isolate_manager = IsolateManager()
+isolate_presets = IsolatePresets()
@@ -1,13 +1,15 @@
 # from functools import partial
-# import re
+import re
 
 from PySide2 import QtWidgets, QtCore, QtGui
 
 from local.widgets.common.splitter import SplitterLayout
 from local.constants import node_blueprints
 from local.decorators.undo import UndoBlock
+from local.basic import api
 
 # import maya.mel as mel
+import maya.api.OpenMaya as om
 import maya.cmds as cmds
 
 plugin_node_name_dictionary = {}
@@ -129,6 +131,137 @@ def duplicate_node_connections(find, replace, nodes=[]):
                     cmds.connectAttr(sourceAttr, targetAttr, force=True)
 
 
+def get_node_type(node_key):
+    """
+    Returns the Maya node type created by a NODE_DICTIONARY key.  Custom nodes
+    built by a function (FTT) have no single type and raise a KeyError.
+    """
+    try:
+        creator = node_blueprints.NODE_DICTIONARY[node_blueprints.NODE_NAME_DICTIONARY[node_key]]
+        return creator.args[0]
+    except (KeyError, AttributeError):
+        raise KeyError('Node type ({}) cannot be used in a node graph!'.format(node_key))
+
+
+def get_maya_api_version():
+    return int(cmds.about(apiVersion=True))
+
+
+def _plug_node_and_attr(plug):
+    node, _, attr = plug.partition('.')
+    return node[1:-1], attr
+
+
+class NodeGraphTemplate(object):
+    """
+    A utility node network described once and built any number of times.
+
+    Plugs are written as '{key}.attribute'.  A key is either one of the
+    template's nodes or one of its inputs, which are the scene nodes given per
+    instance when the graph is built.
+
+    Args:
+        nodes (list[tuple]): (key, node_key, name_format) for every node in the
+            network.  node_key must be a NODE_NAME_DICTIONARY key, and the
+            name_format is filled with the instance inputs and given the node
+            type suffix, as create_node does.
+        inputs (list[str]): Keys of the scene nodes each instance is given.
+        connections (list[tuple]): (source_plug, destination_plug) pairs.
+        values (list[tuple]): (plug, value) pairs set on template nodes.  Values
+            may be a number or a tuple for compound attributes.
+
+    Example:
+        template = NodeGraphTemplate(
+            nodes=[('rev', 'REV', '{driver}_flip')],
+            inputs=['driver', 'driven'],
+            connections=[('{driver}.tx', '{rev}.inputX'),
+                         ('{rev}.outputX', '{driven}.tx')])
+        template.build([{'driver': 'pCube1', 'driven': 'pCube2'}])
+
+    """
+
+    def __init__(self, nodes, inputs, connections=(), values=()):
+        self.nodes = list(nodes)
+        self.inputs = list(inputs)
+        self.connections = list(connections)
+        self.values = list(values)
+        self._validated = False
+
+    def validate(self):
+        """
+        Checks every node key is a known node type, and every attribute used on
+        a template node exists on that node type.
+        """
+        if self._validated:
+            return
+
+        node_types = {}
+        for key, node_key, _ in self.nodes:
+            if key in self.inputs or key in node_types:
+                raise KeyError('Template key "{}" is used more than once!'.format(key))
+            node_types[key] = get_node_type(node_key)
+
+        plugs = [plug for connection in self.connections for plug in connection]
+        plugs.extend(plug for plug, _ in self.values)
+        for plug in plugs:
+            key, attr = _plug_node_and_attr(plug)
+            if key in self.inputs:
+                continue
+            if key not in node_types:
+                raise KeyError('Unknown template key "{}" in plug: {}'.format(key, plug))
+            attr_name = re.split(r'[.\[]', attr)[0]
+            if not cmds.attributeQuery(attr_name, type=node_types[key], exists=True):
+                raise AttributeError('{} has no attribute "{}" (plug: {})'.format(
+                    node_types[key], attr_name, plug))
+
+        self._validated = True
+
+    def build(self, instances):
+        """
+        Builds the network once per instance in two modifier passes: every node
+        is created first, then every value and connection is applied.
+
+        Args:
+            instances (list[dict]): Scene node names for the template inputs,
+                one dictionary per network to build.
+
+        Returns:
+            (list[dict]): Names of the created nodes for each instance, keyed by
+                template key.
+
+        """
+        self.validate()
+
+        create_modifier = om.MDGModifier()
+        created = []
+        for instance in instances:
+            mobjects = {}
+            for key, node_key, name_format in self.nodes:
+                mobject = create_modifier.createNode(get_node_type(node_key))
+                create_modifier.renameNode(mobject, '{}_{}'.format(
+                    name_format.format(**instance),
+                    node_blueprints.NODE_NAME_DICTIONARY[node_key]))
+                mobjects[key] = mobject
+            created.append(mobjects)
+        api.do_it(create_modifier)
+
+        results = []
+        connect_modifier = om.MDGModifier()
+        for instance, mobjects in zip(instances, created):
+            names = dict(instance)
+            names.update((key, api.get_name(mobject)) for key, mobject in mobjects.items())
+
+            for plug, value in self.values:
+                api.set_plug_value(connect_modifier, api.get_plug(plug.format(**names)), value)
+            for source, destination in self.connections:
+                connect_modifier.connect(api.get_plug(source.format(**names)),
+                                         api.get_plug(destination.format(**names)))
+
+            results.append(dict((key, names[key]) for key in mobjects))
+        api.do_it(connect_modifier)
+        return results
+
+
 class NodeWidget(QtWidgets.QFrame):
 
     def __init__(self):
@@ -27,6 +27,45 @@ def get_long_name(name):
     return cmds.ls(name, long=True)[0]
 
 
+def get_alpha_index(index, upper_case=True):
+    """
+    Returns the letters for a 1-based index, continuing past 'Z' the way
+    spreadsheet columns do: 26 is 'Z', 27 is 'AA', 703 is 'AAA'.
+    """
+    if index < 1:
+        raise ValueError('Alphanumeric indexes start at 1, got {}.'.format(index))
+    letters = ''
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = LETTERS_INDEX[remainder + 1] + letters
+    return letters if upper_case else letters.lower()
+
+
+def format_index_name(new_name, index, numeric_index=True, upper_case=True):
+    """
+    Replaces the '#' padding of a name with an index, the way list_renamer
+    names each object.  Numeric indexes are zero padded to the number of '#'.
+
+    Args:
+        new_name (str): Name with at least one '#'.
+        index (int): Index to put in the name.
+        numeric_index (bool): Use a numeric index.  If false, uses letters.
+        upper_case (bool): Use uppercase letters.
+
+    Returns:
+        (str): The name.
+
+    """
+    padding = new_name.count('#')
+    if not padding:
+        raise KeyError('Could not find any "#" in name.')
+    if numeric_index:
+        label = str(index).zfill(padding)
+    else:
+        label = get_alpha_index(index, upper_case=upper_case)
+    return new_name.replace('#' * padding, label)
+
+
 # TODO: Kwargs: numeric_index, start_number?, upper_case, end_name,
 # TODO: name_list should be required and renamed
 def list_renamer(new_name, numeric_index=True, start_number=1,
@@ -67,61 +106,14 @@ def list_renamer(new_name, numeric_index=True, start_number=1,
         # Give this a proper error
         raise KeyError('Could not find any "#" in name.')
 
-    number_padding = new_name.count('#')
-
     new_name_list = []
-    # Numeric renaming
-    if numeric_index:
-        name_replace = new_name.replace(
-            ('#' * number_padding), '%0{pad}d'.format(pad=number_padding))
-        index = index_start
-
-        for i in name_list:
-            i.rename(name_replace % index)
-
-            new_name_list.append(i.name())
-            index += 1
-
-    # Alphanumeric renaming
-    else:
-        name_replace = new_name.replace(('#' * number_padding), '%s')
-        # If index is not 0, the index will be changed to start letters at
-        # appropriate alphanumeric count
-        if index_start > 0:
-            index = index_start
-        else:
-            index = 1
-
-        if name_list > 26:
-            pass
-
-            # index[27] == 'aa'
-        letter_index = None
-        overlap_count = 0
-        for i in name_list:
-            # Remainder division (not substitution)
-            continuous_index = index % 27
-
-            if continuous_index < index:
-                overlap_count = overlap_count + 1
-                letter_index = LETTERS_INDEX[overlap_count]
-                index = 1
-            if letter_index:
-                if upper_case:
-                    alpha_index = letter_index + LETTERS_INDEX[index]
-                else:
-                    alpha_index = letter_index.lower() \
-                                   + str(LETTERS_INDEX[index]).lower()
-
-            else:
-                if upper_case:
-                    alpha_index = LETTERS_INDEX[index]
-                else:
-                    alpha_index = str(LETTERS_INDEX[index]).lower()
-
-            i.rename(name_replace % alpha_index)
-            new_name_list.append(i.name())
-            index += 1
+    # Alphanumeric indexes start at 'A'
+    index = index_start if numeric_index else max(1, index_start)
+    for i in name_list:
+        i.rename(format_index_name(new_name, index, numeric_index=numeric_index,
+                                   upper_case=upper_case))
+        new_name_list.append(i.name())
+        index += 1
 
     # After indexes are all named, check if last object should be an 'end'
     if end_name:
@@ -3,9 +3,13 @@ from functools import partial
 from PySide2 import QtWidgets, QtCore, QtGui
 
 from local.decorators.undo import UndoBlock
+from local.basic import api
 from local.basic import renamer
+from local.basic.isolate import isolate_manager, isolate_presets
 
+import maya.api.OpenMaya as om
 import maya.cmds as cmds
+import numpy as np
 import pymel.core as pymel
 
 
@@ -16,12 +20,72 @@ def create_null(name='null', suffix='NULL'):
     return cmds.createNode('transform', name='{}_{}'.format(name, suffix))
 
 
-def create_pivot(name=None):
-    clst = cmds.cluster()
-    cmds.select(cl=True)
-    jnt = cmds.joint(name=name or 'pivotJoint1')
-    cmds.parentConstraint(clst, jnt, maintainOffset=False)
-    cmds.delete(clst)
+def create_nulls(names, parents=None, matrices=None, suffix=None):
+    """
+    Bulk version of create_null.  Every transform is created directly under its
+    parent in a single MDagModifier pass, then placed in world space.
+
+    Args:
+        names (list[str]): Names of the new transforms.
+        parents (list): Parent for each transform.  Entries may be a node name,
+            None for world, or an int index of a transform earlier in names.
+        matrices (list): A 16 float world matrix for each transform, or None to
+            leave it at its parent's origin.
+        suffix (str): Optional suffix added to every name, as in create_null.
+
+    Returns:
+        (list[str]): Names of the new transforms.
+
+    """
+    if suffix:
+        names = ['{}_{}'.format(name, suffix) for name in names]
+    nulls = api.create_dag_nodes('transform', names, parents=parents)
+    if matrices:
+        api.set_world_matrices(nulls, matrices)
+    return [api.get_name(null) for null in nulls]
+
+
+def _get_point_components(node):
+    shapes = cmds.listRelatives(node, shapes=True, noIntermediate=True, fullPath=True) or []
+    for shape in shapes:
+        shape_type = cmds.objectType(shape)
+        if shape_type == 'mesh':
+            return [shape + '.vtx[*]']
+        if shape_type in ('nurbsCurve', 'nurbsSurface'):
+            return [shape + '.cv[*]']
+        if shape_type == 'lattice':
+            return [shape + '.pt[*]']
+    return [node]
+
+
+def get_selection_centroid(selection=None):
+    """
+    Returns the world space centre of the bounding box around every point in
+    the selection.  Objects contribute all of their points, components their
+    own vertices, so the result matches the old cluster handle placement
+    without creating a deformer.
+    """
+    if not selection:
+        selection = cmds.ls(selection=True)
+    if not selection:
+        raise ValueError('Nothing selected to find a centroid for!')
+
+    components = []
+    for item in selection:
+        if '.' in item:
+            components.append(item)
+        else:
+            components.extend(_get_point_components(item))
+
+    points = np.array(cmds.xform(components, query=True, translation=True, worldSpace=True),
+                      dtype=float).reshape(-1, 3)
+    return ((points.min(axis=0) + points.max(axis=0)) * 0.5).tolist()
+
+
+def create_pivot(name=None, selection=None):
+    centroid = get_selection_centroid(selection)
+    jnt = cmds.createNode('joint', name=name or 'pivotJoint1', skipSelect=True)
+    cmds.xform(jnt, translation=centroid, worldSpace=True)
     return jnt
 
 
@@ -200,17 +264,36 @@ def offset_joint_hierarchy(joints):
     """
     Offsets a hierarchy of joints with SRT groups, detaching the visible bones
     """
-    # Add the new ensureArray function from the os wrapper when added to github
-    # Also consider option to just select hierarchy parent to run
-    for jnt in joints:
-        # jnt_parent = nUtil.get_parent(jnt)
-        jnt_parent = cmds.listRelatives(jnt, parent=True)[0]
-        ofs = create_offset(suffix='OFS', input_object=jnt)
-        create_offset(suffix='SRT', input_object=jnt)
-        if jnt_parent:
-            # parent to the above srt offset then clean the hierarchy children order
-            cmds.parent(ofs, jnt_parent + '_SRT')
-            cmds.reorder(ofs, front=True)
+    # Parents are built before children so every OFS can go straight under the
+    # SRT of its parent joint
+    joints = sorted(cmds.ls(joints, long=True), key=lambda jnt: jnt.count('|'))
+    joint_indices = {jnt: index for index, jnt in enumerate(joints)}
+
+    names = []
+    parents = []
+    matrices = []
+    for index, jnt in enumerate(joints):
+        jnt_parent = (cmds.listRelatives(jnt, parent=True, fullPath=True) or [None])[0]
+        if jnt_parent in joint_indices:
+            ofs_parent = joint_indices[jnt_parent] * 2 + 1
+        else:
+            ofs_parent = jnt_parent
+
+        transform = om.MTransformationMatrix(api.get_dag_path(jnt).inclusiveMatrix())
+        transform.setScale((1.0, 1.0, 1.0), om.MSpace.kTransform)
+        world_matrix = list(transform.asMatrix())
+
+        short_name = renamer.get_short_name(jnt)
+        names.extend([short_name + '_OFS', short_name + '_SRT'])
+        parents.extend([ofs_parent, index * 2])
+        matrices.extend([world_matrix, world_matrix])
+
+    offsets = create_nulls(names, parents=parents, matrices=matrices)
+
+    # Deepest joints move first so the long names still to be used stay valid
+    for index in reversed(range(len(joints))):
+        cmds.parent(joints[index], offsets[index * 2 + 1])
+        cmds.reorder(offsets[index * 2], front=True)
 
 
 # TODO: Make nodes required, do selections in widget command calls
@@ -271,6 +354,7 @@ def isolate_selection(state=True):
         cmds.isolateSelect(active_panel, state=state)
     except RuntimeError as err:
         print(err)
+    isolate_manager.invalidate(active_panel)
     return selection
 
 
@@ -282,8 +366,7 @@ def get_isolate_state():
 def get_isolated_nodes():
     if get_isolate_state():
         active_panel = get_active_model_panel() or DEFAULT_PANEL
-        isolate_selection_set = cmds.isolateSelect(active_panel, query=True, viewObjects=True)
-        return cmds.sets(isolate_selection_set, query=True)
+        return isolate_manager.members(active_panel)
     else:
         return None
 
@@ -298,11 +381,7 @@ def add_isolate_nodes(nodes=[], panel=''):
     if not panel:
         panel = get_active_model_panel() or DEFAULT_PANEL
 
-    cmds.select(nodes)
-    try:
-        cmds.isolateSelect(panel, addSelected=True)
-    except RuntimeError as err:
-        print(err)
+    isolate_manager.add(nodes, panel)
     return nodes
 
 
@@ -316,8 +395,7 @@ def remove_isolate_nodes(nodes=[], panel=''):
     if not panel:
         panel = get_active_model_panel() or DEFAULT_PANEL
 
-    cmds.select(nodes)
-    cmds.isolateSelect(panel, removeSelected=True)
+    isolate_manager.remove(nodes, panel)
     return nodes
 
 
@@ -331,10 +409,8 @@ def update_isolated_nodes(nodes=[], panel=''):
     if not panel:
         panel = get_active_model_panel() or DEFAULT_PANEL
 
-    cmds.isolateSelect(panel, state=False)
-    cmds.select(nodes)
-    cmds.isolateSelect(panel, state=True)
-    # cmds.isolateSelect(panel, addSelected=True)
+    # Only the membership difference is applied, isolate stays on
+    isolate_manager.set_members(nodes, panel)
     return nodes
 
 
@@ -571,6 +647,15 @@ class IsolateSelectionWidget(QtWidgets.QFrame):
         self.isolate_sets_list.currentItemChanged.connect(self._load_panel_objects)
         self.set_nodes_list.currentItemChanged.connect(self._select_isolated_node)
 
+        # Presets saved with the scene are listed, but only resolved on use
+        isolate_presets.reset()
+        self.isolate_sets_list.addItems(self._list_set_names())
+
+    def _get_set_nodes(self, set_name):
+        if set_name not in self.panel_items and isolate_presets.exists(set_name):
+            self.panel_items[set_name] = isolate_presets.nodes(set_name)
+        return self.panel_items[set_name]
+
     def create_isolate(self):
         # selected = cmds.ls(selection=True)
         set_name = str(self.set_name_line_edit.text()) or 'set{}'.format(self.isolate_sets_list.count() + 1)
@@ -590,7 +675,7 @@ class IsolateSelectionWidget(QtWidgets.QFrame):
             current_set = self.isolate_sets_list.currentItem().text()
         except AttributeError:
             return  # state changes when list is cleared, pass over when .clear() called
-        self.set_nodes_list.addItems(self.panel_items[current_set])
+        self.set_nodes_list.addItems(self._get_set_nodes(current_set))
 
     def _select_isolated_node(self):
         current_item = self.set_nodes_list.currentItem()
@@ -611,6 +696,8 @@ class IsolateSelectionWidget(QtWidgets.QFrame):
         self.set_nodes_list.clear()
         self.panel_items[isolate_set] = isolated_nodes
         self.set_nodes_list.addItems(isolated_nodes)
+        if isolate_presets.exists(isolate_set):
+            isolate_presets.save(isolate_set, isolated_nodes)
 
     def remove_from_isolate(self):
         isolate_set = self.isolate_sets_list.currentItem().text()
@@ -622,19 +709,31 @@ class IsolateSelectionWidget(QtWidgets.QFrame):
         self.set_nodes_list.clear()
         self.panel_items[isolate_set] = isolated_nodes
         self.set_nodes_list.addItems(isolated_nodes)
+        if isolate_presets.exists(isolate_set):
+            isolate_presets.save(isolate_set, isolated_nodes)
 
     def update_isolation_view(self):
         current_set = self.isolate_sets_list.currentItem().text()
+        if isolate_presets.exists(current_set):
+            panel = get_active_model_panel() or DEFAULT_PANEL
+            self.panel_items[current_set] = isolate_presets.restore(current_set, panel)
+            return
         nodes_to_isolate = self.panel_items[current_set]
         update_isolated_nodes(nodes=nodes_to_isolate)
 
+    def _list_set_names(self):
+        set_names = list(self.panel_items.keys())
+        set_names.extend(name for name in isolate_presets.names() if name not in self.panel_items)
+        return set_names
+
     def create_isolation_set(self):
         isolate_set_name = self.set_name_line_edit.text() or 'set{}'.format(self.isolate_sets_list.count())
         selected_nodes = cmds.ls(selection=True)
 
         self.isolate_sets_list.clear()
         self.panel_items[isolate_set_name] = selected_nodes
-        self.isolate_sets_list.addItems(list(self.panel_items.keys()))
+        isolate_presets.save(isolate_set_name, selected_nodes)
+        self.isolate_sets_list.addItems(self._list_set_names())
 
         item = self.isolate_sets_list.findItems(isolate_set_name, QtCore.Qt.MatchExactly)[0]
         self.isolate_sets_list.setCurrentItem(item)
@@ -643,7 +742,8 @@ class IsolateSelectionWidget(QtWidgets.QFrame):
         isolate_set_name = self.isolate_sets_list.currentItem().text()
 
         self.isolate_sets_list.clear()
-        del self.panel_items[isolate_set_name]
-        self.isolate_sets_list.addItems(list(self.panel_items.keys()))
+        self.panel_items.pop(isolate_set_name, None)
+        isolate_presets.delete(isolate_set_name)
+        self.isolate_sets_list.addItems(self._list_set_names())
 
         self.isolate_sets_list.setCurrentRow(0)
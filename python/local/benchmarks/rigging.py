@@ -0,0 +1,541 @@
+"""
+Rigging benchmarks.  Run from a Maya session or mayapy, each benchmark starts a
+new scene:
+
+    from local.benchmarks import rigging
+    rigging.benchmark_vector_aim_constraints()
+    rigging.benchmark_rivets()
+    rigging.benchmark_hands()
+    rigging.benchmark_finger_drivers()
+    rigging.benchmark_limb_chains()
+    rigging.benchmark_foot_roll()
+    rigging.verify_joint_engine()
+    rigging.benchmark_joint_engine()
+"""
+
+from local.basic import api
+from local.basic import attributes
+from local.basic import curve_builder
+from local.basic import renamer
+from local.basic import utils
+from local.decorators.dev_tools import isolate_print, timed_test
+from local.rigging.common import chains
+from local.rigging.common import utils as rig_utils
+from local.rigging.modules import fingers
+from local.rigging.modules import foot
+from local.rigging.modules import plans
+
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+import numpy as np
+
+
+def _create_aim_scene(count):
+    cmds.file(new=True, force=True)
+    sources = utils.create_nulls(['aimSource{}'.format(i) for i in range(count)])
+    targets = utils.create_nulls(['aimTarget{}'.format(i) for i in range(count)])
+    ups = utils.create_nulls(['aimUp{}'.format(i) for i in range(count)])
+    for index, source in enumerate(sources):
+        cmds.setAttr(source + '.t', index, 5, 0)
+        cmds.setAttr(ups[index] + '.t', 0, 1, 0)
+    return list(zip(sources, targets, ups))
+
+
+def benchmark_vector_aim_constraints(count=500):
+    """
+    Builds count aim setups one call at a time, in one batched build, and as
+    aimMatrix nodes where the Maya version supports them.
+    """
+    with isolate_print():
+        aim_setups = _create_aim_scene(count)
+        with timed_test('{} vector aim constraints, one call each'.format(count)):
+            for source, target, up in aim_setups:
+                rig_utils.vector_aim_constraint(source, target, up)
+
+        aim_setups = _create_aim_scene(count)
+        with timed_test('{} vector aim constraints, batched'.format(count)):
+            rig_utils.vector_aim_constraints(aim_setups)
+
+        if cmds.about(apiVersion=True) >= rig_utils.AIM_MATRIX_API_VERSION:
+            aim_setups = _create_aim_scene(count)
+            with timed_test('{} vector aim constraints, aimMatrix'.format(count)):
+                rig_utils.vector_aim_constraints(aim_setups, use_aim_matrix=True)
+
+
+def _create_rivet_scene(count):
+    """
+    Returns a plane with an edge pair across each of its first count faces.
+    """
+    cmds.file(new=True, force=True)
+    size = int(count ** 0.5) + 1
+    plane = cmds.polyPlane(name='rivetPlane', subdivisionsX=size, subdivisionsY=size)[0]
+
+    edge_pairs = []
+    face_iter = om.MItMeshPolygon(api.get_dag_path(plane))
+    while not face_iter.isDone() and len(edge_pairs) < count:
+        edges = face_iter.getEdges()
+        edge_pairs.append(['{}.e[{}]'.format(plane, edges[0]),
+                           '{}.e[{}]'.format(plane, edges[2])])
+        face_iter.next()
+    return plane, edge_pairs
+
+
+def _time_rivet_evaluation(plane, rivets, description, frames=20):
+    """
+    Moves the mesh and pulls every rivet's world matrix, so each frame
+    evaluates the whole rivet network.
+    """
+    plugs = [rivet + '.worldMatrix[0]' for rivet in rivets]
+    with timed_test(description):
+        for frame in range(frames):
+            cmds.setAttr(plane + '.ty', frame * 0.1)
+            cmds.dgeval(plugs)
+
+
+def benchmark_rivets(count=300):
+    """
+    Compares the build and DG evaluation time of count rivets made one call at
+    a time (two curveFromMeshEdge nodes and a loft each), in one batched build
+    sharing curves and lofts, and as a single uvPin where supported.
+    """
+    with isolate_print():
+        plane, edge_pairs = _create_rivet_scene(count)
+        with timed_test('{} rivets, one call each'.format(count)):
+            rivets = [rig_utils.create_rivet(edges) for edges in edge_pairs]
+        _time_rivet_evaluation(plane, rivets, '{} rivets, one call each, evaluation'.format(count))
+
+        plane, edge_pairs = _create_rivet_scene(count)
+        with timed_test('{} rivets, batched'.format(count)):
+            rivets = rig_utils.create_rivets(edge_pairs)
+        _time_rivet_evaluation(plane, rivets, '{} rivets, batched, evaluation'.format(count))
+
+        if cmds.about(apiVersion=True) >= rig_utils.OFFSET_PARENT_MATRIX_API_VERSION:
+            plane, edge_pairs = _create_rivet_scene(count)
+            with timed_test('{} rivets, uvPin'.format(count)):
+                rivets = rig_utils.create_rivets(edge_pairs, use_uv_pin=True)
+            _time_rivet_evaluation(plane, rivets, '{} rivets, uvPin, evaluation'.format(count))
+
+
+def _build_hand_per_segment(plan):
+    """
+    Stand-in for the old HandModule build: a spaceLocator, joint, control
+    stack and parentConstraint per segment, each placed with its own move,
+    xform and setAttr calls, then the per-segment finger drivers.
+    """
+    cmds.spaceLocator(name=plan.hand_locator.name)
+    for locator in plan.locators:
+        cmds.spaceLocator(name=locator.name)
+        cmds.parent(locator.name, locator.parent)
+        cmds.setAttr(locator.name + '.t', *locator.translate)
+        cmds.setAttr(locator.name + '.r', *locator.rotate)
+
+    cmds.select(clear=True)
+    hand_joint = cmds.joint(name=plan.hand_joint.name)
+    for finger in plan.fingers:
+        cmds.select(clear=True)
+        for index, segment in enumerate(finger.segments):
+            position = cmds.getAttr(segment + '_POS.worldPosition[0]')[0]
+            finger_joint = cmds.joint(name=segment + '_BONE', position=position)
+            if not index:
+                cmds.parent(finger_joint, hand_joint)
+    for joint in plan.joints:
+        rotation = cmds.getAttr(joint.name[:-len('_BONE')] + '_POS.r')[0]
+        cmds.setAttr(joint.name + '.jointOrient', rotation[0], rotation[1] * plan.inverse,
+                     rotation[2] * plan.inverse)
+
+    hand_control = cmds.group(empty=True, name=plan.hand_control.ctl)
+    curve_builder.add_curve_shape(shape_choice=plan.hand_shape, transform_node=hand_control)
+    for attr in plan.attributes:
+        options = dict(attr.options)
+        if 'enum_names' in options:
+            options['enum_names'] = list(options['enum_names'])
+        attributes.create_attr(attribute_name=attr.name, attribute_type=attr.type,
+                               input_object=hand_control, **options)
+
+    for control in plan.controls:
+        bone = control.segment + '_BONE'
+        if control.ctl:
+            cmds.group(empty=True, name=control.ctl)
+            curve_builder.add_curve_shape(shape_choice=plan.shape_type, transform_node=control.ctl)
+            cmds.group(control.ctl, name=control.srt)
+        else:
+            cmds.group(empty=True, name=control.srt)
+        cmds.group(control.srt, name=control.ofs)
+        cmds.setAttr(control.ofs + '.t', *cmds.xform(bone, query=True, translation=True,
+                                                     worldSpace=True))
+        cmds.setAttr(control.ofs + '.r', *cmds.xform(bone, query=True, rotation=True,
+                                                     worldSpace=True))
+        if control.parent:
+            cmds.parent(control.ofs, control.parent)
+        if control.ctl:
+            if plan.limit_attrs:
+                attributes.lock_hide(1, 1, 1, 0, 0, 0, 1, 1, 1, 1, objects=[control.ctl])
+            cmds.parentConstraint(control.ctl, bone, maintainOffset=True)
+
+    for finger in plan.fingers:
+        cmds.connectAttr('{}.{}_Vis'.format(hand_control, finger.label),
+                         finger.segments[0] + '_OFS.v')
+    _build_per_segment_drivers([plan])
+
+
+def benchmark_hands(count=10, finger_count=4, segment_count=4):
+    """
+    Builds count hands of finger_count fingers and a thumb, node by node as
+    the old HandModule did and then all in one batched build.
+    """
+    sides = ['L{:02}'.format(index) for index in range(count)]
+    hand_plans = [plans.plan_hand(side, finger_count, segment_count) for side in sides]
+    with isolate_print():
+        cmds.file(new=True, force=True)
+        with timed_test('{} hands, per-segment commands'.format(count)):
+            for plan in hand_plans:
+                _build_hand_per_segment(plan)
+
+        cmds.file(new=True, force=True)
+        with timed_test('{} hands, planned'.format(count)):
+            hand_plans = [plans.plan_hand(side, finger_count, segment_count) for side in sides]
+        with timed_test('{} hands, batched'.format(count)):
+            fingers.build_hands(hand_plans)
+
+
+def _build_per_segment_drivers(hand_plans):
+    """
+    Stand-in for the old finger drivers: an offset multiplyDivide and
+    condition per finger, and a plusMinusAverage and multDoubleLinear per
+    segment.
+    """
+    for plan in hand_plans:
+        hand = plan.hand_control.ctl
+        offset_factor = 0
+        reverse_factor = len(plan.fingers) - 2
+        for finger in plan.fingers:
+            finger_mult = None
+            if not finger.is_thumb:
+                finger_mult = cmds.createNode('multiplyDivide')
+                finger_cnd = cmds.createNode('condition')
+                cmds.setAttr(finger_cnd + '.colorIfFalseR', reverse_factor)
+                cmds.setAttr(finger_cnd + '.colorIfTrueR', offset_factor)
+                cmds.setAttr(finger_cnd + '.operation', 1)
+                cmds.connectAttr(finger_cnd + '.outColorR', finger_mult + '.input2X')
+                cmds.connectAttr(hand + '.offsetFavor', finger_cnd + '.firstTerm')
+                cmds.connectAttr(hand + '.offset', finger_mult + '.input1X')
+            offset_factor += 1
+            reverse_factor -= 1
+            for segment in finger.driven:
+                finger_attr = '{}.{}'.format(hand, '_'.join(segment.split('_')[2:]))
+                inverse = cmds.createNode('multDoubleLinear')
+                cmds.setAttr(inverse + '.input2', plan.inverse)
+                cmds.connectAttr(inverse + '.output', segment + '_SRT.rz')
+                if finger_mult is None:
+                    cmds.connectAttr(finger_attr, inverse + '.input1')
+                    continue
+                total = cmds.createNode('plusMinusAverage')
+                cmds.connectAttr(hand + '.masterRotation', total + '.input1D[0]')
+                cmds.connectAttr(finger_mult + '.outputX', total + '.input1D[1]')
+                cmds.connectAttr(finger_attr, total + '.input1D[2]')
+                cmds.connectAttr(total + '.output1D', inverse + '.input1')
+
+
+def _create_driver_scene(count, finger_count, segment_count):
+    cmds.file(new=True, force=True)
+    hand_plans = [plans.plan_hand('{}{:02}'.format(side, index), finger_count, segment_count,
+                                  inverse=side == 'R')
+                  for index in range(count // 2 + count % 2) for side in 'LR'][:count]
+    fingers.create_hand_locators(hand_plans)
+    hand_plans = fingers.create_hand_joints(hand_plans)
+    fingers.create_hand_controls(hand_plans)
+    return hand_plans
+
+
+def _time_finger_drivers(hand_plans, build, description, frames=20):
+    utility_types = ['multiplyDivide', 'multDoubleLinear', 'plusMinusAverage', 'condition']
+    node_count = len(cmds.ls(type=utility_types))
+    with timed_test('{}, build'.format(description)):
+        build(hand_plans)
+    print('{} utility nodes'.format(len(cmds.ls(type=utility_types)) - node_count))
+
+    hands = [plan.hand_control.ctl for plan in hand_plans]
+    plugs = [control.srt + '.r' for plan in hand_plans for control in plan.controls]
+    with timed_test('{}, {} frames'.format(description, frames)):
+        for frame in range(frames):
+            for hand in hands:
+                cmds.setAttr(hand + '.masterRotation', frame)
+            cmds.dgeval(plugs)
+
+
+def benchmark_finger_drivers(count=20, finger_count=4, segment_count=4):
+    """
+    Builds the finger curl drivers of count hands, half of them mirrored, as
+    per-segment utility nodes and as packed driver graphs, then counts the
+    utility nodes made and times their evaluation.
+    """
+    with isolate_print():
+        hand_plans = _create_driver_scene(count, finger_count, segment_count)
+        _time_finger_drivers(hand_plans, _build_per_segment_drivers,
+                             '{} hands, per-segment drivers'.format(count))
+
+        hand_plans = _create_driver_scene(count, finger_count, segment_count)
+        _time_finger_drivers(hand_plans, fingers.build_hand_drivers,
+                             '{} hands, packed drivers'.format(count))
+
+
+def _limb_chain_layouts(characters, limbs, extra_joints=2):
+    """
+    Returns (prefix, bone positions, pivot positions, aim target) for every
+    limb, pivots spaced along X with a slight bend at the middle pivot.
+    """
+    layouts = []
+    for character in range(characters):
+        for limb in range(limbs):
+            prefix = 'c{:02}_limb{}'.format(character, limb)
+            origin = (character * 10.0, limb * 4.0 + 2.0, 0.0)
+            pivots = [(origin[0] + x, origin[1], origin[2] + z)
+                      for x, z in ((0.0, 0.0), (4.0, -0.5), (8.0, 0.0))]
+            bones = []
+            for start, end in zip(pivots[:-1], pivots[1:]):
+                for step in range(extra_joints + 1):
+                    factor = step / float(extra_joints + 1)
+                    bones.append(tuple(a + (b - a) * factor for a, b in zip(start, end)))
+            bones.append(pivots[-1])
+            layouts.append((prefix, bones, pivots, (pivots[-1][0] + 2.0, origin[1], 0.0)))
+    return layouts
+
+
+def _build_limb_chains_per_joint(layouts):
+    """
+    Stand-in for the old limb chains: cmds.joint per joint, orient passes, and
+    an IK chain duplicated and renamed from the FK chain.
+    """
+    for prefix, bones, pivots, aim_target in layouts:
+        for suffix, positions in (('BONE', bones), ('FK_JNT', pivots)):
+            cmds.select(clear=True)
+            joints = [cmds.joint(name='{}_{:02}_{}'.format(prefix, index, suffix), position=position)
+                      for index, position in enumerate(list(positions) + [aim_target])]
+            cmds.joint(joints[0], edit=True, orientJoint='xzy', secondaryAxisOrient='yup',
+                       children=True)
+            if suffix == 'FK_JNT':
+                ik_joints = renamer.search_replace_name(
+                    search_input='FK', replace_output='IK',
+                    input_objects=cmds.duplicate(joints[0], renameChildren=True))
+                ik_joints = [renamer.clear_end_digits(input_objects=[joint])[0]
+                             for joint in ik_joints]
+                cmds.delete(ik_joints[-1])
+            cmds.delete(joints[-1])
+
+
+def _build_limb_chains(layouts):
+    specs = []
+    for prefix, bones, pivots, aim_target in layouts:
+        specs.append(chains.chain_spec(['{}_{:02}_BONE'.format(prefix, index)
+                                        for index in range(len(bones))],
+                                       bones, aim_target=aim_target))
+        for suffix in ('FK_JNT', 'IK_JNT'):
+            specs.append(chains.chain_spec(['{}_{:02}_{}'.format(prefix, index, suffix)
+                                            for index in range(len(pivots))],
+                                           pivots, aim_target=aim_target))
+    chains.create_chains(specs)
+
+
+def benchmark_limb_chains(characters=50, limbs=4):
+    """
+    Builds the bind, FK and IK chains of limbs * characters limbs with
+    per-joint commands and orient passes, and with the analytic chain builder.
+    """
+    layouts = _limb_chain_layouts(characters, limbs)
+    with isolate_print():
+        cmds.file(new=True, force=True)
+        with timed_test('{} limbs x {} characters, per-joint chains'.format(limbs, characters)):
+            _build_limb_chains_per_joint(layouts)
+
+        cmds.file(new=True, force=True)
+        with timed_test('{} limbs x {} characters, analytic chains'.format(limbs, characters)):
+            _build_limb_chains(layouts)
+
+
+def _build_per_attribute_foot_roll(foot_plans, foot_controls):
+    """
+    Stand-in for the old roll network: a plusMinusAverage per reverse joint
+    summing its control with its roll and swivel, and a condition splitting
+    the bank.
+    """
+    for plan, foot_control in zip(foot_plans, foot_controls):
+        pivots = dict((pivot.part, pivot.node) for pivot in plan.pivots)
+        for reverse in plan.reverse_controls:
+            rotation_sum = cmds.createNode('plusMinusAverage',
+                                           name=reverse.ctl.replace('CTRL', 'rotation_PMA'))
+            cmds.connectAttr(reverse.ctl + '.r', rotation_sum + '.input3D[0]')
+            cmds.connectAttr('{}.{}Roll'.format(foot_control, reverse.segment),
+                             rotation_sum + '.input3D[1].input3Dx')
+            cmds.connectAttr('{}.{}Swivel'.format(foot_control, reverse.segment),
+                             rotation_sum + '.input3D[1].input3Dy')
+            cmds.connectAttr(rotation_sum + '.output3D', pivots[reverse.segment] + '.r')
+        bank = cmds.createNode('condition', name=plan.prefix + '_footRoll_CND')
+        for plug in ('firstTerm', 'colorIfTrueR', 'colorIfFalseG'):
+            cmds.connectAttr(foot_control + '.footBank', '{}.{}'.format(bank, plug))
+        cmds.setAttr(bank + '.operation', 3)
+        cmds.connectAttr(bank + '.outColorR', pivots['bank_in'] + '.rz')
+        cmds.connectAttr(bank + '.outColorG', pivots['bank_out'] + '.rz')
+
+
+def _time_foot_roll(count, build, description, frames=20):
+    cmds.file(new=True, force=True)
+    foot_plans = [plans.plan_foot('c{:03}'.format(index)) for index in range(count)]
+    foot.create_foot_locators(foot_plans)
+    foot_plans = foot.create_driver_foot_joints(foot_plans)
+    foot_controls = foot.create_foot_controls(foot_plans)
+
+    utility_types = ['plusMinusAverage', 'condition', 'clamp', 'unitConversion']
+    node_count = len(cmds.ls(type=utility_types))
+    with timed_test('{}, build'.format(description)):
+        build(foot_plans, foot_controls)
+    print('{} utility nodes'.format(len(cmds.ls(type=utility_types)) - node_count))
+
+    plugs = [pivot.node + '.worldMatrix' for plan in foot_plans for pivot in plan.pivots]
+    with timed_test('{}, {} frames'.format(description, frames)):
+        for frame in range(frames):
+            for foot_control in foot_controls:
+                cmds.setAttr(foot_control + '.heelRoll', frame)
+                cmds.setAttr(foot_control + '.footBank', frame - frames / 2.0)
+            cmds.dgeval(plugs)
+
+
+def benchmark_foot_roll(count=200):
+    """
+    Builds the roll, swivel and bank network of count feet as per-attribute
+    utility nodes and from the shared roll template, then counts the utility
+    nodes made and times their evaluation.
+
+    The template makes one clamp per foot where the old network made three
+    plusMinusAverage nodes and a condition.  Roll and swivel move onto a group
+    above each reverse joint instead; those three transforms per foot are made
+    with the driver joints in both runs, so they are not in the count.  The
+    unit conversions Maya inserts on the angle connections remain in both.
+    """
+    with isolate_print():
+        _time_foot_roll(count, _build_per_attribute_foot_roll,
+                        '{} feet, per-attribute roll'.format(count))
+        _time_foot_roll(count, foot.connect_feet, '{} feet, roll template'.format(count))
+
+
+def _create_bent_chains(count, joints, side='L'):
+    """
+    Creates count chains of joints on the +X side, bent in Y and Z so no two
+    joints share an orientation, and oriented by Maya.
+    """
+    roots = []
+    for chain in range(count):
+        cmds.select(clear=True)
+        names = []
+        for index in range(joints):
+            names.append(cmds.joint(name='{}_chain{:03}_{:02}_JNT'.format(side, chain, index),
+                                    position=(1.0 + index, chain * 0.5 + 0.2 * (index % 3),
+                                              0.3 * index * index * 0.1 - chain * 0.1)))
+        cmds.joint(names[0], edit=True, orientJoint='xzy', secondaryAxisOrient='yup',
+                   children=True, zeroScaleOrient=True)
+        roots.append(names[0])
+    cmds.select(clear=True)
+    return roots
+
+
+def _world_rotations(joints):
+    matrices = np.array([list(api.get_dag_path(joint).inclusiveMatrix()) for joint in joints])
+    matrices = matrices.reshape(-1, 4, 4)
+    return matrices[:, :3, :3], matrices[:, 3, :3]
+
+
+def _hierarchy(root):
+    return [root] + list(reversed(cmds.listRelatives(root, allDescendents=True, type='joint',
+                                                       fullPath=True) or []))
+
+
+def _compare(description, joints, expected):
+    rotations, positions = _world_rotations(joints)
+    expected_rotations, expected_positions = _world_rotations(expected)
+    rotation_error = np.abs(rotations - expected_rotations).max()
+    position_error = np.abs(positions - expected_positions).max()
+    passed = rotation_error < 1e-4 and position_error < 1e-4
+    print('{}: {} (rotation error {:.2e}, position error {:.2e})'.format(
+        description, 'ok' if passed else 'FAILED', rotation_error, position_error))
+    return passed
+
+
+def verify_joint_engine():
+    """
+    Checks the batch joint engine against known orients and against Maya's own
+    mirrorJoint and orientJoint on bent chains.
+
+    Returns:
+        (bool): Whether every check passed.
+
+    """
+    results = []
+    with isolate_print():
+        # A chain straight down +X, unrotated: behavior mirroring reverses every
+        # axis, orientation mirroring keeps them
+        cmds.file(new=True, force=True)
+        cmds.select(clear=True)
+        root = cmds.joint(name='L_known_00_JNT', position=(1, 0, 0))
+        cmds.joint(name='L_known_01_JNT', position=(3, 0, 0))
+        for mode, expected in (('behavior', np.diag([1.0, -1.0, -1.0])),
+                               ('orientation', np.identity(3))):
+            mirrored = chains.mirror_joints([root], mode=mode)
+            rotations, positions = _world_rotations(mirrored)
+            passed = (np.allclose(rotations, expected, atol=1e-6)
+                      and np.allclose(positions, [(-1, 0, 0), (-3, 0, 0)], atol=1e-6)
+                      and mirrored[0] == 'R_known_00_JNT')
+            print('known {} mirror: {}'.format(mode, 'ok' if passed else 'FAILED'))
+            results.append(passed)
+            cmds.delete(mirrored[0])
+
+        for mode in chains.MIRROR_MODES:
+            cmds.file(new=True, force=True)
+            root, = _create_bent_chains(1, 6)
+            reference = cmds.mirrorJoint(root, mirrorYZ=True, mirrorBehavior=mode == 'behavior',
+                                         searchReplace=('L_', 'X_'))
+            reference = [name for name in reference if cmds.nodeType(name) == 'joint']
+            mirrored = chains.mirror_joints([root], mode=mode)
+            results.append(_compare('{} mirror against mirrorJoint'.format(mode),
+                                    mirrored, reference))
+
+        cmds.file(new=True, force=True)
+        root, = _create_bent_chains(1, 6)
+        reference = cmds.duplicate(root, name='X_chain_00_JNT')[0]
+        # Scramble the orients without moving the joints
+        cmds.joint(root, edit=True, orientJoint='yzx', secondaryAxisOrient='zdown',
+                   children=True, zeroScaleOrient=True)
+        chains.orient_joints([root], orient='xzy', up_vector=(0, 1, 0))
+        results.append(_compare('orient against orientJoint', _hierarchy(root),
+                                _hierarchy(reference)))
+    return all(results)
+
+
+def benchmark_joint_engine(count=100, joints=10):
+    """
+    Mirrors and re-orients count chains of joints (1,000 joints by default)
+    chain by chain with mirrorJoint and orientJoint, and in one batch.
+    """
+    total = count * joints
+    with isolate_print():
+        cmds.file(new=True, force=True)
+        roots = _create_bent_chains(count, joints)
+        with timed_test('{} joints, mirrorJoint per chain'.format(total)):
+            for root in roots:
+                cmds.mirrorJoint(root, mirrorYZ=True, mirrorBehavior=True,
+                                 searchReplace=('L_', 'R_'))
+
+        cmds.file(new=True, force=True)
+        roots = _create_bent_chains(count, joints)
+        with timed_test('{} joints, batch mirror'.format(total)):
+            chains.mirror_joints(roots)
+
+        cmds.file(new=True, force=True)
+        roots = _create_bent_chains(count, joints)
+        with timed_test('{} joints, orientJoint per chain'.format(total)):
+            for root in roots:
+                cmds.joint(root, edit=True, orientJoint='xzy', secondaryAxisOrient='yup',
+                           children=True, zeroScaleOrient=True)
+
+        cmds.file(new=True, force=True)
+        roots = _create_bent_chains(count, joints)
+        with timed_test('{} joints, batch orient'.format(total)):
+            chains.orient_joints(roots)
@@ -0,0 +1,68 @@
+"""
+Widget benchmarks.  Run from an interactive Maya session:
+
+    from local.benchmarks import widgets
+    widgets.benchmark_tdbuddy_startup()
+"""
+
+import importlib
+import sys
+import time
+
+from local.decorators.dev_tools import isolate_print, timed_test
+
+from PySide2 import QtWidgets
+
+# Cold-open budget of the TD Buddy window, in seconds
+TDBUDDY_OPEN_TARGET = 0.2
+
+_TDBUDDY_MODULE = 'local.widgets.TDBuddy.TDBuddy'
+
+
+def _open_tdbuddy(tdbuddy):
+    """
+    Opens a TD Buddy window, returning it with the seconds taken to show it and
+    the seconds taken to then load its open sections.
+    """
+    start = time.time()
+    window = tdbuddy.TDBuddy()
+    window.show()
+    open_time = time.time() - start
+
+    start = time.time()
+    QtWidgets.QApplication.processEvents()
+    return window, open_time, time.time() - start
+
+
+def benchmark_tdbuddy_startup(runs=5):
+    """
+    Times importing the TD Buddy module fresh and opening the window, checks
+    the open against TDBUDDY_OPEN_TARGET, then times loading every section and
+    reports the import time of each tool module.
+    """
+    with isolate_print():
+        sys.modules.pop(_TDBUDDY_MODULE, None)
+        with timed_test('TD Buddy module import'):
+            tdbuddy = importlib.import_module(_TDBUDDY_MODULE)
+
+        open_times = []
+        for run in range(runs):
+            window, open_time, load_time = _open_tdbuddy(tdbuddy)
+            open_times.append(open_time)
+            if not run:
+                print('TD Buddy open sections loaded in {:.1f} ms'.format(load_time * 1000))
+            window.close()
+        print('TD Buddy open: first {:.1f} ms, best {:.1f} ms of {} ({})'.format(
+            open_times[0] * 1000, min(open_times) * 1000, runs,
+            'within target' if open_times[0] <= TDBUDDY_OPEN_TARGET else 'OVER TARGET'))
+
+        window, _, _ = _open_tdbuddy(tdbuddy)
+        with timed_test('TD Buddy, every section loaded'):
+            for section in window.sections:
+                section.set_expanded(True)
+            QtWidgets.QApplication.processEvents()
+        window.close()
+
+        for module_name, seconds in sorted(tdbuddy.import_times.items(),
+                                           key=lambda item: -item[1]):
+            print('{:>8.1f} ms  {}'.format(seconds * 1000, module_name))
@@ -9,6 +9,7 @@ from functools import partial
 
 NODE_DICTIONARY = {
     'ADL': partial(cmds.createNode, 'addDoubleLinear'),
+    'AIMM': partial(cmds.createNode, 'aimMatrix'),
     'blendROT': partial(cmds.createNode, 'animBlendNodeAdditiveRotation'),
     'BLC': partial(cmds.createNode, 'blendColors'),
     'BTA': partial(cmds.createNode, 'blendTwoAttr'),
@@ -27,6 +28,7 @@ NODE_DICTIONARY = {
     'MDL': partial(cmds.createNode, 'multDoubleLinear'),
     'MM': partial(cmds.createNode, 'multMatrix'),
     'PMA': partial(cmds.createNode, 'plusMinusAverage'),
+    'PKM': partial(cmds.createNode, 'pickMatrix'),
     'PMM': partial(cmds.createNode, 'pointMatrixMult'),
     'POCI': partial(cmds.createNode, 'pointOnCurveInfo'),
     'POSI': partial(cmds.createNode, 'pointOnSurfaceInfo'),
@@ -34,6 +36,7 @@ NODE_DICTIONARY = {
     'RMPV': partial(cmds.createNode, 'remapValue'),
     'SR': partial(cmds.createNode, 'setRange'),
     'UC': partial(cmds.createNode, 'unitConversion'),
+    'UVP': partial(cmds.createNode, 'uvPin'),
     'VP': partial(cmds.createNode, 'vectorProduct'),
     'WAM': partial(cmds.createNode, 'wtAddMatrix')
 }
@@ -52,6 +55,8 @@ ARK_NODE_DICTIONARY = {
 NODE_NAME_DICTIONARY = {
     'addDoubleLinear': 'ADL',
     'ADL': 'ADL',
+    'aimMatrix': 'AIMM',
+    'AIMM': 'AIMM',
     'animBlendNodeAdditiveRotation': 'blendROT',
     'blendROT': 'blendROT',
     'blendColors': 'BLC',
@@ -90,6 +95,8 @@ NODE_NAME_DICTIONARY = {
     'MM': 'MM',
     'plusMinusAverage': 'PMA',
     'PMA': 'PMA',
+    'pickMatrix': 'PKM',
+    'PKM': 'PKM',
     'pointMatrixMult': 'PMM',
     'PMM': 'PMM',
     'pointOnCurveInfo': 'POCI',
@@ -104,6 +111,8 @@ NODE_NAME_DICTIONARY = {
     'SR': 'SR',
     'unitConversion': 'UC',
     'UC': 'UC',
+    'uvPin': 'UVP',
+    'UVP': 'UVP',
     'vectorProduct': 'VP',
     'VECP': 'VP',
     'VP': 'VP',
@@ -0,0 +1,134 @@
+import json
+import mmap
+import struct
+
+import numpy as np
+
+# Record layout, all little endian:
+#   magic (4 bytes) | format version (uint16) | reserved (uint16)
+#   header length (uint32) | value count (uint32)
+#   JSON header, space padded to a 4 byte boundary
+#   value count float32 values
+MAGIC = b'NLPK'
+FORMAT_VERSION = 1
+VALUE_DTYPE = np.dtype('<f4')
+
+_PREFIX = struct.Struct('<4sHHII')
+
+
+def pack(header, values):
+	"""
+	Packs a JSON serializable header and a flat list of values into one record.
+
+	Args:
+		header (dict): Description of the values.
+		values (list[float]) or (np.ndarray): Values, stored as float32.
+
+	Returns:
+		(bytes): The packed record.
+
+	"""
+	values = np.asarray(values, dtype=VALUE_DTYPE).ravel()
+	header_data = json.dumps(header, separators=(',', ':')).encode('utf-8')
+	header_data += b' ' * (-len(header_data) % 4)
+	prefix = _PREFIX.pack(MAGIC, FORMAT_VERSION, 0, len(header_data), values.size)
+	return prefix + header_data + values.tobytes()
+
+
+def write_packed(header, values, filepath):
+	with open(filepath, 'wb') as f:
+		f.write(pack(header, values))
+
+
+def append_packed(header, values, filepath):
+	"""
+	Appends a record to a pooled file of records.
+
+	Returns:
+		(tuple): Byte offset and size of the new record in the file.
+
+	"""
+	record = pack(header, values)
+	with open(filepath, 'ab') as f:
+		f.seek(0, 2)
+		offset = f.tell()
+		f.write(record)
+	return offset, len(record)
+
+
+def open_map(filepath):
+	"""
+	Read only memory map of a packed file, for sharing between the readers of a
+	pooled file's records.
+	"""
+	with open(filepath, 'rb') as f:
+		return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PackedReader(object):
+	"""
+	Memory maps a packed file and reads one record from it.  Only the header is
+	parsed up front; values are read from the map on request, so asking for a
+	few values out of a large record only touches the pages that hold them.
+
+	Args:
+		filepath (str): Packed file, or pooled file of records.
+		offset (int): Byte offset of the record in the file.
+		shared_map (mmap.mmap): Map from open_map to read from.  The reader
+			leaves closing it to the caller.
+
+	Example:
+		with PackedReader(filepath) as reader:
+			values = reader.values(reader.header['offset'], 10)
+
+	"""
+
+	def __init__(self, filepath, offset=0, shared_map=None):
+		self.filepath = filepath
+		self.offset = offset
+		self._owns_map = shared_map is None
+		self._map = open_map(filepath) if shared_map is None else shared_map
+
+		magic, version, _, header_length, self.count = _PREFIX.unpack_from(self._map, offset)
+		if magic != MAGIC:
+			self.close()
+			raise IOError('{} is not a packed file (offset {})!'.format(filepath, offset))
+		if version > FORMAT_VERSION:
+			self.close()
+			raise IOError('{} uses packed format version {}, newer than supported ({})!'.format(
+				filepath, version, FORMAT_VERSION))
+
+		header_start = offset + _PREFIX.size
+		self._values_start = header_start + header_length
+		self.header = json.loads(self._map[header_start:self._values_start].decode('utf-8'))
+
+	@property
+	def size(self):
+		return self._values_start - self.offset + self.count * VALUE_DTYPE.itemsize
+
+	def values(self, start=0, count=None):
+		"""
+		Returns a copy of count values from the record, starting at value index
+		start.  Reads the whole block if count is not given.
+		"""
+		if count is None:
+			count = self.count - start
+		if start < 0 or start + count > self.count:
+			raise IndexError('Values {}-{} are outside the record ({} values)!'.format(
+				start, start + count, self.count))
+		return np.frombuffer(
+			self._map,
+			dtype=VALUE_DTYPE,
+			count=count,
+			offset=self._values_start + start * VALUE_DTYPE.itemsize).copy()
+
+	def close(self):
+		if self._map is not None and self._owns_map:
+			self._map.close()
+		self._map = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
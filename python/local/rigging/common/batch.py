@@ -0,0 +1,257 @@
+"""
+Batch rig builds across a pool of headless mayapy workers.
+
+Each worker is a long running mayapy process (see batch_worker) that builds
+one asset spec at a time, so Maya, its plugins and the rigging modules are only
+loaded once per worker.  Jobs and results travel as JSON lines over the
+worker's stdin/stdout, and anything the build prints comes back over stderr as
+log lines.
+
+Asset specs are dictionaries:
+
+    {
+        'name': 'crowdMale_042',                   # unique job name
+        'rig_name': 'crowdMale_042',               # defaults to name
+        'scene': '/assets/crowdMale_042/model.ma',  # optional scene to open
+        'output': '/assets/crowdMale_042/rig.ma',   # optional scene to save
+        'plugins': ['matrixNodes'],                 # optional plugins to load
+        'hierarchy_spec': None,                     # optional, see simple_rig_setup
+        'steps': [                                  # optional extra build steps
+            {'function': 'local.rigging.modules.limb.create_limb_system', 'kwargs': {}}
+        ]
+    }
+
+From a shell:
+
+    python -m local.rigging.common.batch specs.json --workers 8 --report report.json
+"""
+
+from collections import deque
+import argparse
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+from local.dataIO import json as json_io
+
+WORKER_MODULE = 'local.rigging.common.batch_worker'
+
+
+def get_mayapy():
+    """
+    Returns the mayapy executable of the Maya install in MAYA_LOCATION, or
+    'mayapy' from the PATH.
+    """
+    maya_location = os.environ.get('MAYA_LOCATION')
+    if maya_location:
+        executable = 'mayapy.exe' if sys.platform == 'win32' else 'mayapy'
+        return os.path.join(maya_location, 'bin', executable)
+    return 'mayapy'
+
+
+class _Worker(object):
+
+    def __init__(self, index, mayapy, events):
+        self.index = index
+        self.job = None
+        self.ready = False
+        self._events = events
+
+        # Workers import the local package from the same place as the driver
+        python_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__)))))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            path for path in (python_root, env.get('PYTHONPATH')) if path)
+
+        try:
+            self.process = subprocess.Popen(
+                [mayapy, '-u', '-m', WORKER_MODULE],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=env,
+                universal_newlines=True)
+        except OSError as err:
+            # A missing or broken mayapy reports like a worker that never started
+            self.process = None
+            self._events.put((self, {'type': 'exit', 'code': None, 'error': str(err)}))
+            return
+
+        threading.Thread(target=self._read_messages, daemon=True).start()
+        threading.Thread(target=self._read_logs, daemon=True).start()
+
+    def _read_messages(self):
+        for line in self.process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                message = {'type': 'log', 'message': line.rstrip()}
+            self._events.put((self, message))
+        self._events.put((self, {'type': 'exit', 'code': self.process.wait()}))
+
+    def _read_logs(self):
+        for line in self.process.stderr:
+            self._events.put((self, {'type': 'log', 'message': line.rstrip()}))
+
+    def send(self, job):
+        self.job = job
+        self.process.stdin.write(json.dumps(job) + '\n')
+        self.process.stdin.flush()
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+            except (IOError, OSError):
+                pass
+
+
+class BatchRigBuilder(object):
+    """
+    Builds rigs for any number of asset specs across a pool of mayapy workers.
+    Failed assets are retried, on any free worker, up to the retry count.  A
+    worker that dies is replaced and its asset counts as a failed attempt.
+
+    Args:
+        specs (list[dict]): Asset build specs, see the module docstring.
+        workers (int): Number of worker processes.
+        retries (int): Extra attempts for an asset that fails.
+        mayapy (str): mayapy executable.  Defaults to get_mayapy().
+        log (function): Called with every progress and log line.
+
+    Example:
+        builder = BatchRigBuilder(specs, workers=8)
+        results = builder.run()
+
+    """
+
+    def __init__(self, specs, workers=4, retries=1, mayapy=None, log=print):
+        self.specs = list(specs)
+        self.worker_count = max(1, min(workers, len(self.specs)))
+        self.retries = retries
+        self.mayapy = mayapy or get_mayapy()
+        self.log = log
+        self.results = {}
+
+    def _log(self, worker, message, name=None):
+        prefix = '[worker {}]'.format(worker.index)
+        if name:
+            prefix += ' [{}]'.format(name)
+        self.log('{} {}'.format(prefix, message))
+
+    def run(self):
+        """
+        Builds every spec and blocks until all are done.
+
+        Returns:
+            (dict): Result per asset name, with its status, attempt count,
+                error and per phase timing.
+
+        """
+        events = queue.Queue()
+        pending = deque(dict(spec, name=spec.get('name') or spec['rig_name'])
+                        for spec in self.specs)
+        attempts = {}
+        start = time.time()
+
+        workers = [_Worker(index, self.mayapy, events) for index in range(self.worker_count)]
+
+        def dispatch(worker):
+            if not pending:
+                worker.stop()
+                return
+            job = pending.popleft()
+            attempts[job['name']] = attempts.get(job['name'], 0) + 1
+            self._log(worker, 'building (attempt {})'.format(attempts[job['name']]), job['name'])
+            worker.send(job)
+
+        def finish(job, result):
+            name = job['name']
+            if result['status'] != 'ok' and attempts[name] <= self.retries:
+                pending.append(job)
+                return
+            result['attempts'] = attempts[name]
+            self.results[name] = result
+            self.log('{}/{} done: {} ({})'.format(
+                len(self.results), len(self.specs), name, result['status']))
+
+        live = len(workers)
+        while live:
+            worker, message = events.get()
+            message_type = message.get('type')
+
+            if message_type == 'ready':
+                worker.ready = True
+                dispatch(worker)
+            elif message_type == 'log':
+                self._log(worker, message['message'], worker.job and worker.job['name'])
+            elif message_type == 'progress':
+                self._log(worker, message['message'], message.get('name'))
+            elif message_type == 'result':
+                job, worker.job = worker.job, None
+                if message['status'] != 'ok':
+                    self._log(worker, 'failed: {}'.format(message.get('error')), job['name'])
+                finish(job, message)
+                dispatch(worker)
+            elif message_type == 'exit':
+                live -= 1
+                job, worker.job = worker.job, None
+                if job is None and (worker.ready or message['code'] == 0):
+                    continue
+                self._log(worker, message.get('error')
+                          or 'exited with code {}'.format(message['code']))
+                if job is not None:
+                    finish(job, {'name': job['name'], 'status': 'error',
+                                 'error': 'Worker exited with code {}'.format(message['code']),
+                                 'timing': {}})
+                if pending and worker.ready:
+                    replacement = _Worker(worker.index, self.mayapy, events)
+                    workers[worker.index] = replacement
+                    live += 1
+                elif not worker.ready:
+                    self.log('[worker {}] failed to start, check the mayapy path: {}'.format(
+                        worker.index, self.mayapy))
+
+            # Nothing left to hand out once every live worker is idle
+            if not pending and all(w.job is None for w in workers):
+                for w in workers:
+                    w.stop()
+
+        # Anything never attempted (no worker could start) is reported as failed
+        for job in pending:
+            self.results.setdefault(job['name'], {
+                'name': job['name'], 'status': 'error', 'attempts': attempts.get(job['name'], 0),
+                'error': 'No worker available', 'timing': {}})
+
+        self.log('Built {} of {} assets in {:.1f} seconds'.format(
+            len([r for r in self.results.values() if r['status'] == 'ok']),
+            len(self.specs), time.time() - start))
+        return self.results
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Batch build rigs in mayapy workers.')
+    parser.add_argument('specs', help='JSON file with a list of asset build specs')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--retries', type=int, default=1)
+    parser.add_argument('--mayapy', default=None)
+    parser.add_argument('--report', default=None, help='JSON file to write the results to')
+    options = parser.parse_args(args)
+
+    builder = BatchRigBuilder(json_io.load_from_json(options.specs),
+                              workers=options.workers,
+                              retries=options.retries,
+                              mayapy=options.mayapy)
+    results = builder.run()
+    if options.report:
+        json_io.save_backup_to_json(json.dumps(results, indent=4, sort_keys=True), options.report)
+    return 0 if all(result['status'] == 'ok' for result in results.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+mayapy worker for batch.BatchRigBuilder.  Initializes Maya once, then builds one
+asset spec per JSON line read from stdin until stdin closes.  Protocol messages
+go to stdout; everything else printed during a build is sent to stderr, which
+the driver forwards as log lines.
+
+    mayapy -m local.rigging.common.batch_worker
+"""
+
+import importlib
+import json
+import sys
+import time
+import traceback
+
+_protocol = sys.stdout
+_loaded_plugins = set()
+
+
+def _send(message_type, **kwargs):
+    kwargs['type'] = message_type
+    _protocol.write(json.dumps(kwargs) + '\n')
+    _protocol.flush()
+
+
+def _resolve_function(path):
+    module_name, _, function_name = path.rpartition('.')
+    # Modules stay in sys.modules, so later jobs reuse them
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def build_asset(spec):
+    """
+    Builds one asset spec in the running Maya session.
+
+    Returns:
+        (dict): Seconds spent in each build phase.
+
+    """
+    import maya.cmds as cmds
+    from local.rigging.common import setup
+
+    timing = {}
+    name = spec['name']
+
+    def phase(label, start):
+        timing[label] = round(time.time() - start, 4)
+        _send('progress', name=name, message='{} ({:.2f}s)'.format(label, timing[label]))
+
+    start = time.time()
+    for plugin in spec.get('plugins', []):
+        if plugin not in _loaded_plugins:
+            cmds.loadPlugin(plugin, quiet=True)
+            _loaded_plugins.add(plugin)
+    if spec.get('scene'):
+        cmds.file(spec['scene'], open=True, force=True)
+    else:
+        cmds.file(new=True, force=True)
+    phase('open', start)
+
+    start = time.time()
+    setup.simple_rig_setup(spec.get('rig_name') or name,
+                           hierarchy_spec=spec.get('hierarchy_spec'))
+    phase('rig setup', start)
+
+    for step in spec.get('steps', []):
+        start = time.time()
+        _resolve_function(step['function'])(*step.get('args', []), **step.get('kwargs', {}))
+        phase(step['function'], start)
+
+    if spec.get('output'):
+        start = time.time()
+        cmds.file(rename=spec['output'])
+        file_type = 'mayaBinary' if spec['output'].endswith('.mb') else 'mayaAscii'
+        cmds.file(save=True, type=file_type, force=True)
+        phase('save', start)
+
+    return timing
+
+
+def main():
+    # Keep stray prints (Maya included) off the protocol stream
+    sys.stdout = sys.stderr
+
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+    _send('ready')
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        spec = json.loads(line)
+        start = time.time()
+        try:
+            timing = build_asset(spec)
+        except Exception as err:
+            traceback.print_exc()
+            _send('result', name=spec['name'], status='error', error=str(err),
+                  timing={'total': round(time.time() - start, 4)})
+        else:
+            timing['total'] = round(time.time() - start, 4)
+            _send('result', name=spec['name'], status='ok', timing=timing)
+
+    maya.standalone.uninitialize()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,493 @@
+"""
+Joint chains built straight from guide positions.  Joint orients are solved in
+NumPy the way 'joint -orientJoint' would solve them (primary axis down the
+bone, secondary axis towards an up vector), and every joint is created through
+MFnIkJoint with its translate and orient already set, so no selection state,
+orient pass, duplicate or rename is involved.
+
+Existing chains are edited the same way: insert_joints splits any number of
+parent-child joint pairs in one pass, and mirror_joints and orient_joints read
+every selected hierarchy in one query and write the results in one pass.
+
+Example:
+    spec = chains.chain_spec(['L_shoulder_FK_JNT', 'L_elbow_FK_JNT', 'L_wrist_FK_JNT'],
+                             positions, aim_target=hand_position)
+    fk_joints, = chains.create_chains([spec])
+
+    chains.insert_joints([('L_shoulder_FK_JNT', 'L_elbow_FK_JNT')], 3)
+"""
+
+from collections import namedtuple
+
+from local.basic import api
+from local.basic import renamer
+
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+import numpy as np
+
+AXES = {'x': 0, 'y': 1, 'z': 2}
+# Axis orders whose primary, secondary, tertiary axes are right handed as given
+_EVEN_ORDERS = ('xyz', 'yzx', 'zxy')
+# Below this, a bone is treated as parallel to the up vector
+_PARALLEL_TOLERANCE = 1e-6
+
+MIRROR_MODES = ('behavior', 'orientation')
+# World axis each mirror plane flips
+MIRROR_PLANES = {'YZ': 0, 'XZ': 1, 'XY': 2}
+# Name parts swapped on mirrored joints, matched between underscores
+MIRROR_TOKENS = (('L', 'R'), ('Lf', 'Rt'), ('left', 'right'), ('Left', 'Right'))
+
+ChainSpec = namedtuple('ChainSpec', 'names positions parents aim_target up_vector root')
+
+
+def chain_spec(names, positions, parents=None, aim_target=None, up_vector=(0.0, 1.0, 0.0),
+               root=None):
+    """
+    Describes one chain to build.
+
+    Args:
+        names (list[str]): Joint names, in chain order.
+        positions (list[tuple]): World position of each joint.
+        parents (list[int]): Index of each joint's parent in names, or None for
+            the chain root.  Defaults to a straight chain.  Orients always
+            follow the order of names, so a joint can aim at the next joint
+            while being parented elsewhere.
+        aim_target (tuple): World position the last joint aims at.  Without
+            one the last joint keeps the orientation of the joint before it.
+        up_vector (tuple): World direction of the secondary axis.
+        root (str): Existing node to build the chain under.
+
+    Returns:
+        (ChainSpec): The chain spec.
+
+    """
+    if parents is None:
+        parents = [None] + list(range(len(names) - 1))
+    return ChainSpec(list(names), np.asarray(positions, dtype=np.float64).reshape(-1, 3),
+                     list(parents), aim_target, up_vector, root)
+
+
+def _normalize(vectors):
+    lengths = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(lengths < _PARALLEL_TOLERANCE, 1.0, lengths)
+
+
+def get_aim_orientations(aims, up_vector=(0.0, 1.0, 0.0), orient='xzy'):
+    """
+    Solves the world orientation of any number of joints from their aim
+    directions.
+
+    Args:
+        aims (np.ndarray): (n, 3) direction of each joint's primary axis.
+        up_vector (tuple): World direction of the secondary axis.
+        orient (str): Primary, secondary and tertiary axes, as in
+            'joint -orientJoint'.
+
+    Returns:
+        (np.ndarray): (n, 3, 3) rotation matrices, one row per joint axis.
+
+    """
+    aims = _normalize(np.asarray(aims, dtype=np.float64))
+    count = len(aims)
+
+    up = np.asarray(up_vector, dtype=np.float64)
+    ups = up - aims * aims.dot(up)[:, np.newaxis]
+    # Bones along the up vector fall back to the previous joint's secondary
+    # axis, or the next world axis for the first joint
+    parallel = np.linalg.norm(ups, axis=1) < _PARALLEL_TOLERANCE
+    if parallel.any():
+        fallback = np.roll(up, 1)
+        for index in np.flatnonzero(parallel):
+            previous = ups[index - 1] if index else fallback
+            ups[index] = previous - aims[index] * aims[index].dot(previous)
+    ups = _normalize(ups)
+
+    primary, secondary, tertiary = [AXES[axis] for axis in orient]
+    rotations = np.empty((count, 3, 3))
+    rotations[:, primary] = aims
+    rotations[:, secondary] = ups
+    if orient in _EVEN_ORDERS:
+        rotations[:, tertiary] = np.cross(aims, ups)
+    else:
+        rotations[:, tertiary] = np.cross(ups, aims)
+    return rotations
+
+
+def get_chain_orientations(positions, aim_target=None, up_vector=(0.0, 1.0, 0.0), orient='xzy'):
+    """
+    Solves the world orientation of every joint in a chain.
+
+    Args:
+        positions (np.ndarray): (n, 3) world joint positions.
+        aim_target (tuple): World position the last joint aims at.
+        up_vector (tuple): World direction of the secondary axis.
+        orient (str): Primary, secondary and tertiary axes, as in
+            'joint -orientJoint'.
+
+    Returns:
+        (np.ndarray): (n, 3, 3) rotation matrices, one row per joint axis.
+
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    count = len(positions)
+    targets = np.empty_like(positions)
+    targets[:-1] = positions[1:]
+    targets[-1] = aim_target if aim_target is not None else positions[-1]
+
+    aims = _normalize(targets - positions)
+    if aim_target is None:
+        aims[-1] = aims[-2] if count > 1 else (1.0, 0.0, 0.0)
+    return get_aim_orientations(aims, up_vector=up_vector, orient=orient)
+
+
+def matrices_to_euler(rotations):
+    """
+    XYZ Euler angles, in radians, of (n, 3, 3) rotation matrices.
+    """
+    sin_y = np.clip(-rotations[:, 0, 2], -1.0, 1.0)
+    rotate_y = np.arcsin(sin_y)
+    locked = np.abs(sin_y) > 0.999999
+    rotate_x = np.where(locked,
+                        np.arctan2(rotations[:, 1, 0] * sin_y, rotations[:, 1, 1]),
+                        np.arctan2(rotations[:, 1, 2], rotations[:, 2, 2]))
+    rotate_z = np.where(locked, 0.0, np.arctan2(rotations[:, 0, 1], rotations[:, 0, 0]))
+    return np.stack([rotate_x, rotate_y, rotate_z], axis=1)
+
+
+def get_chain_locals(positions, rotations, parents, root_matrix=None):
+    """
+    Converts world joint positions and orientations into the translate and
+    joint orient of each joint under its parent.
+
+    Args:
+        positions (np.ndarray): (n, 3) world positions.
+        rotations (np.ndarray): (n, 3, 3) world orientations.
+        parents (list[int]): Parent index of each joint, None for the root.
+        root_matrix (np.ndarray): 4x4 world matrix the chain root sits under,
+            or (n, 4, 4) with one per joint for joints without a parent.
+
+    Returns:
+        (tuple): (n, 3) translates and (n, 3) joint orients in radians.
+
+    """
+    count = len(positions)
+    if not count:
+        return np.zeros((0, 3)), np.zeros((0, 3))
+    worlds = np.zeros((count, 4, 4))
+    worlds[:, :3, :3] = rotations
+    worlds[:, 3, :3] = positions
+    worlds[:, 3, 3] = 1.0
+
+    root_matrix = np.identity(4) if root_matrix is None else np.asarray(root_matrix)
+    root_matrices = np.broadcast_to(root_matrix, (count, 4, 4))
+    parent_matrices = np.array([root_matrices[index] if parent is None else worlds[parent]
+                                for index, parent in enumerate(parents)])
+    locals_ = np.matmul(worlds, np.linalg.inv(parent_matrices))
+    # Strip any scale inherited from the root
+    local_rotations = _normalize(locals_[:, :3, :3])
+    return locals_[:, 3, :3], matrices_to_euler(local_rotations)
+
+
+def create_chains(chains, orient='xzy'):
+    """
+    Builds any number of joint chains with their orients solved up front.
+
+    Args:
+        chains (list[ChainSpec]): Chains to build, see chain_spec.
+        orient (str): Primary, secondary and tertiary axes of every joint.
+
+    Returns:
+        (list[list[str]]): The joint names of each chain.
+
+    """
+    joint_fn = oma.MFnIkJoint()
+    built = []
+    chain_roots = []
+    for chain in chains:
+        rotations = get_chain_orientations(chain.positions, aim_target=chain.aim_target,
+                                           up_vector=chain.up_vector, orient=orient)
+        root = api.get_mobject(chain.root) if chain.root else om.MObject.kNullObj
+        root_matrix = None
+        if chain.root:
+            root_matrix = np.array(list(api.get_dag_path(chain.root).inclusiveMatrix())).reshape(4, 4)
+        translates, orients = get_chain_locals(chain.positions, rotations, chain.parents,
+                                               root_matrix=root_matrix)
+
+        joints = []
+        names = []
+        for name, parent, translate, joint_orient in zip(chain.names, chain.parents,
+                                                         translates.tolist(), orients.tolist()):
+            joint = joint_fn.create(root if parent is None else joints[parent])
+            names.append(joint_fn.setName(name))
+            joint_fn.setTranslation(om.MVector(translate), om.MSpace.kTransform)
+            joint_fn.setOrientation(om.MEulerRotation(joint_orient))
+            joints.append(joint)
+        chain_roots.extend(joint for joint, parent in zip(joints, chain.parents) if parent is None)
+        built.append(names)
+    api.record_created_nodes(chain_roots)
+    return built
+
+
+def get_inserted_translates(child_translates, joint_count):
+    """
+    Local translates of joints inserted evenly between parent-child pairs.
+
+    Inserted joints take their parent's orientation, so every step down the
+    bone is the same fraction of the child's translate in the parent's space.
+
+    Args:
+        child_translates (np.ndarray): (n, 3) translate of each child joint
+            under its parent.
+        joint_count (int): Joints to insert in each pair.
+
+    Returns:
+        (np.ndarray): (n, 3) translate of every inserted joint, and of each
+            child once it is moved under the last inserted joint.
+
+    """
+    return np.asarray(child_translates, dtype=np.float64) / (joint_count + 1)
+
+
+def insert_joints(pairs, joint_count, new_name='{parent}_#', numeric_index=False,
+                  upper_case=True):
+    """
+    Inserts evenly spaced joints between any number of parent-child joint
+    pairs.  Every new joint is created in one DAG modifier pass, the children
+    are moved under the last new joint of their pair in a second, and all
+    translates are set in one batched write.  New joints keep their parent's
+    orientation, so the children keep their world placement.
+
+    Args:
+        pairs (list[tuple]): (parent, child) joints, the child directly under
+            the parent.
+        joint_count (int): Joints to insert in each pair.
+        new_name (str): Name of the new joints.  '{parent}' is the short name
+            of the pair's parent, and the '#' padding is replaced with each
+            joint's index, as in renamer.list_renamer.
+        numeric_index (bool): Index with numbers rather than letters.
+        upper_case (bool): Index with uppercase letters.
+
+    Returns:
+        (list[list[str]]): The new joints of each pair, parent to child.
+
+    """
+    if joint_count < 1 or not pairs:
+        return [[] for _ in pairs]
+
+    selection = om.MSelectionList()
+    for parent, child in pairs:
+        selection.add(parent)
+        selection.add(child)
+    paths = [selection.getDagPath(index) for index in range(selection.length())]
+    parents, children = paths[::2], paths[1::2]
+    for parent, child in zip(parents, children):
+        if om.MDagPath(child).pop() != parent:
+            raise ValueError('{} is not a child of {}!'.format(child.partialPathName(),
+                                                               parent.partialPathName()))
+
+    translates = get_inserted_translates(
+        [list(om.MFnTransform(child).translation(om.MSpace.kTransform)) for child in children],
+        joint_count).tolist()
+
+    names = []
+    node_parents = []
+    for parent in parents:
+        short_name = renamer.get_short_name(parent.partialPathName())
+        for index in range(joint_count):
+            names.append(renamer.format_index_name(new_name.format(parent=short_name),
+                                                   index + 1, numeric_index=numeric_index,
+                                                   upper_case=upper_case))
+            node_parents.append(parent.node() if index == 0 else len(names) - 2)
+    joints = api.create_dag_nodes('joint', names, parents=node_parents)
+
+    modifier = om.MDagModifier()
+    for pair_index, child in enumerate(children):
+        modifier.reparentNode(child.node(), joints[pair_index * joint_count + joint_count - 1])
+    api.do_it(modifier)
+
+    plug_values = []
+    inserted = []
+    for pair_index, (parent, child) in enumerate(zip(parents, children)):
+        pair_joints = [api.get_name(joint) for joint in
+                       joints[pair_index * joint_count:(pair_index + 1) * joint_count]]
+        radius = om.MFnDependencyNode(parent.node()).findPlug('radius', False).asDouble()
+        for joint in pair_joints:
+            plug_values.append((joint + '.t', tuple(translates[pair_index])))
+            plug_values.append((joint + '.radius', radius))
+        plug_values.append((om.MFnDagNode(child.node()).fullPathName() + '.t',
+                            tuple(translates[pair_index])))
+        inserted.append(pair_joints)
+    api.set_plug_values(plug_values)
+    return inserted
+
+
+def mirror_name(name, tokens=MIRROR_TOKENS):
+    """
+    Swaps the side tokens of a name, matching whole underscore separated parts
+    so that 'L_ball_JNT' becomes 'R_ball_JNT' and 'BALL' is left alone.
+
+    Args:
+        name (str): Name to mirror.
+        tokens (list[tuple]): Pairs of tokens to swap both ways.  The first
+            pair a token appears in wins.
+
+    """
+    swaps = {}
+    for left, right in tokens:
+        swaps.setdefault(left, right)
+        swaps.setdefault(right, left)
+    return '_'.join(swaps.get(part, part) for part in name.split('_'))
+
+
+def read_joint_hierarchies(roots):
+    """
+    Reads every joint under any number of roots in one pass, parents first.
+    Roots that sit under another root are only read once.
+
+    Returns:
+        (tuple): Joint dag paths, parent index of each joint (None when its
+            parent was not read), (n, 4, 4) world matrices, and (n, 4, 4)
+            parent world matrices.
+
+    """
+    iterator = om.MItDag(om.MItDag.kDepthFirst, om.MFn.kJoint)
+    paths = []
+    parents = []
+    indexes = {}
+    for root in roots:
+        iterator.reset(api.get_dag_path(root), om.MItDag.kDepthFirst, om.MFn.kJoint)
+        while not iterator.isDone():
+            path = iterator.getPath()
+            key = path.fullPathName()
+            if key not in indexes:
+                indexes[key] = len(paths)
+                paths.append(path)
+                parents.append(indexes.get(om.MDagPath(path).pop().fullPathName()))
+            iterator.next()
+
+    worlds = np.array([list(path.inclusiveMatrix()) for path in paths]).reshape(-1, 4, 4)
+    parent_worlds = np.array([list(path.exclusiveMatrix()) for path in paths]).reshape(-1, 4, 4)
+    return paths, parents, worlds, parent_worlds
+
+
+def get_mirrored_transforms(worlds, mode='behavior', plane='YZ'):
+    """
+    Mirrors world joint matrices across a plane through the origin.
+
+    In behavior mode every axis is reflected and reversed, so matching
+    rotations on both sides move the joints symmetrically.  In orientation
+    mode the joints keep the world orientation of the originals.
+
+    Args:
+        worlds (np.ndarray): (n, 4, 4) world matrices.
+        mode (str): 'behavior' or 'orientation'.
+        plane (str): 'YZ', 'XZ' or 'XY'.
+
+    Returns:
+        (tuple): (n, 3) mirrored positions and (n, 3, 3) mirrored rotations.
+
+    """
+    if mode not in MIRROR_MODES:
+        raise ValueError('Mirror mode must be one of {}, got {}!'.format(MIRROR_MODES, mode))
+    flip = np.ones(3)
+    flip[MIRROR_PLANES[plane]] = -1.0
+
+    positions = worlds[:, 3, :3] * flip
+    rotations = _normalize(worlds[:, :3, :3])
+    if mode == 'behavior':
+        rotations = -(rotations * flip)
+    return positions, rotations
+
+
+def mirror_joints(roots, mode='behavior', plane='YZ', tokens=MIRROR_TOKENS):
+    """
+    Mirrors any number of joint hierarchies.  All joints are read in one query,
+    mirrored in one vectorized pass, created in one DAG modifier pass and
+    placed in one batched write.  Mirrored roots go under their original's
+    parent.
+
+    Args:
+        roots (list[str]): Root joint of each hierarchy.
+        mode (str): 'behavior' or 'orientation', see get_mirrored_transforms.
+        plane (str): Mirror plane, 'YZ', 'XZ' or 'XY'.
+        tokens (list[tuple]): Side tokens swapped in the new names, see
+            mirror_name.
+
+    Returns:
+        (list[str]): The new joints, parents first.
+
+    """
+    if not roots:
+        return []
+    paths, parents, worlds, parent_worlds = read_joint_hierarchies(roots)
+    positions, rotations = get_mirrored_transforms(worlds, mode=mode, plane=plane)
+    translates, orients = get_chain_locals(positions, rotations, parents,
+                                           root_matrix=parent_worlds)
+
+    names = [mirror_name(renamer.get_short_name(path.partialPathName()), tokens=tokens)
+             for path in paths]
+    node_parents = [om.MDagPath(path).pop().node() if parent is None and path.length() > 1
+                    else parent for path, parent in zip(paths, parents)]
+    joints = [api.get_name(joint) for joint in
+              api.create_dag_nodes('joint', names, parents=node_parents)]
+
+    plug_values = []
+    for joint, path, translate, joint_orient in zip(joints, paths, translates.tolist(),
+                                                   orients.tolist()):
+        plug_values.append((joint + '.t', tuple(translate)))
+        plug_values.append((joint + '.jointOrient', tuple(joint_orient)))
+        plug_values.append((joint + '.radius', om.MFnDependencyNode(path.node()).findPlug(
+            'radius', False).asDouble()))
+    api.set_plug_values(plug_values)
+    return joints
+
+
+def orient_joints(roots, orient='xzy', up_vector=(0.0, 1.0, 0.0)):
+    """
+    Re-orients any number of joint hierarchies the way 'joint -orientJoint'
+    with children does, without moving any joint: each joint aims its primary
+    axis at its first child, end joints take their parent's aim, and rotates
+    are zeroed into the joint orients.  All joints are read in one query,
+    solved in one vectorized pass and written in one batched write.
+
+    Args:
+        roots (list[str]): Root joint of each hierarchy.
+        orient (str): Primary, secondary and tertiary axes.
+        up_vector (tuple): World direction of the secondary axis.
+
+    Returns:
+        (list[str]): The re-oriented joints, parents first.
+
+    """
+    if not roots:
+        return []
+    paths, parents, worlds, parent_worlds = read_joint_hierarchies(roots)
+    positions = worlds[:, 3, :3]
+
+    first_children = {}
+    for index, parent in enumerate(parents):
+        if parent is not None:
+            first_children.setdefault(parent, index)
+    targets = np.array([first_children.get(index, index) for index in range(len(paths))])
+    aims = positions[targets] - positions
+    # End joints and joints sitting on their child follow their parent, or
+    # keep their own primary axis without one
+    ends = np.linalg.norm(aims, axis=1) < _PARALLEL_TOLERANCE
+    for index in np.flatnonzero(ends):
+        parent = parents[index]
+        aims[index] = (aims[parent] if parent is not None
+                       else worlds[index, AXES[orient[0]], :3])
+
+    rotations = get_aim_orientations(aims, up_vector=up_vector, orient=orient)
+    translates, orients = get_chain_locals(positions, rotations, parents,
+                                           root_matrix=parent_worlds)
+
+    joints = [path.fullPathName() for path in paths]
+    plug_values = []
+    for joint, translate, joint_orient in zip(joints, translates.tolist(), orients.tolist()):
+        plug_values.append((joint + '.t', tuple(translate)))
+        plug_values.append((joint + '.r', (0.0, 0.0, 0.0)))
+        plug_values.append((joint + '.jointOrient', tuple(joint_orient)))
+    api.set_plug_values(plug_values)
+    return joints
@@ -0,0 +1,170 @@
+"""
+Guide placement engine shared by the rig modules.  A module describes its
+guides as (name, parent, translate, rotate) entries, parents first, and the
+whole set is created in one pass.  Placed guides are read back as one snapshot
+of world matrices, which can be saved to a packed file and restored onto the
+guides later, or handed straight to a build step so a rig can be built from a
+guide file without any guides in the scene.
+
+Example:
+    layout = guides.snapshot_guides(guide_names)
+    layout.save('/assets/hero/guides/L_arm.guides')
+
+    layout = guides.GuideLayout.load('/assets/hero/guides/L_arm.guides')
+    guides.restore_guides(layout)
+"""
+
+from collections import namedtuple
+
+from local.basic import api
+from local.dataIO import packed
+
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+import numpy as np
+
+GUIDE_FILE_TYPE = 'guides'
+GUIDE_FILE_VERSION = 1
+
+# Rotations are XYZ Euler angles in degrees, translate and rotate are local to
+# the parent (world space without one)
+Guide = namedtuple('Guide', 'name parent translate rotate')
+
+
+def create_guides(guides, shape_type='locator', plug_values=None):
+    """
+    Creates a set of guides in one pass: transforms and shapes through two
+    modifier passes and every placement and display value in one batched write.
+
+    Args:
+        guides (list[Guide]): Guides to create, parents first.  Parents may be
+            guides of the same call or existing nodes.
+        shape_type (str): Shape node type added under every guide, or None for
+            bare transforms.
+        plug_values (list[tuple]): Extra (plug_name, value) pairs to set with
+            the placements, such as locator scale or display colors.
+
+    Returns:
+        (list[str]): Names of the created guides.
+
+    """
+    index = dict((guide.name, i) for i, guide in enumerate(guides))
+    mobjects = api.create_dag_nodes(
+        'transform', [guide.name for guide in guides],
+        parents=[index.get(guide.parent, guide.parent) for guide in guides])
+    if shape_type:
+        api.create_dag_nodes(shape_type, [guide.name + 'Shape' for guide in guides],
+                             parents=mobjects)
+
+    values = []
+    for guide in guides:
+        values.append((guide.name + '.t', tuple(guide.translate)))
+        # Angle plugs set through the API take radians
+        values.append((guide.name + '.r', tuple(om.MAngle(value, om.MAngle.kDegrees).asRadians()
+                                                for value in guide.rotate)))
+    values.extend(plug_values or [])
+    api.set_plug_values(values)
+    return [api.get_name(mobject) for mobject in mobjects]
+
+
+def snapshot_guides(names, module=None):
+    """
+    Reads the world matrices of any number of guides in one pass.
+
+    Args:
+        names (list[str]): Guides to read, parents first if the layout is to be
+            restored.
+        module (str): Name of the module the guides belong to, kept with the
+            layout.
+
+    Returns:
+        (GuideLayout): The guide layout.
+
+    """
+    selection = om.MSelectionList()
+    for name in names:
+        selection.add(name)
+    matrices = np.array([list(selection.getDagPath(index).inclusiveMatrix())
+                         for index in range(len(names))], dtype=np.float64)
+    return GuideLayout(names, matrices.reshape(-1, 16), module=module)
+
+
+def restore_guides(layout, names=None):
+    """
+    Places existing guides at the world matrices of a layout.  Guides missing
+    from the scene are skipped.
+
+    Args:
+        layout (GuideLayout): Layout to restore.
+        names (list[str]): Only restore these guides.
+
+    Returns:
+        (list[str]): Names of the guides that were placed.
+
+    """
+    wanted = set(layout.names if names is None else names)
+    restored = [name for name in layout.names if name in wanted and cmds.objExists(name)]
+    api.set_world_matrices([api.get_mobject(name) for name in restored],
+                           [layout.matrix_list(name) for name in restored])
+    return restored
+
+
+class GuideLayout(object):
+    """
+    World matrices of a set of guides, in the order they were read.
+
+    Args:
+        names (list[str]): Guide names.
+        matrices (np.ndarray): One flattened 4x4 world matrix per guide.
+        module (str): Name of the module the guides belong to.
+
+    """
+
+    def __init__(self, names, matrices, module=None):
+        self.names = list(names)
+        self.matrices = np.asarray(matrices, dtype=np.float64).reshape(len(self.names), 16)
+        self.module = module
+        self._index = dict((name, index) for index, name in enumerate(self.names))
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __len__(self):
+        return len(self.names)
+
+    def matrix_list(self, name):
+        return self.matrices[self._index[name]].tolist()
+
+    def matrix(self, name):
+        """
+        Returns a guide's world matrix as 4 row tuples.
+        """
+        return tuple(tuple(row) for row in self.matrices[self._index[name]].reshape(4, 4).tolist())
+
+    def position(self, name):
+        return tuple(self.matrices[self._index[name], 12:15].tolist())
+
+    def to_dict(self, names=None):
+        """
+        Returns guide name to 4 row world matrix, for the guides asked for that
+        are in the layout.
+        """
+        return dict((name, self.matrix(name)) for name in (names or self.names)
+                    if name in self._index)
+
+    def save(self, filepath):
+        header = {'type': GUIDE_FILE_TYPE, 'version': GUIDE_FILE_VERSION,
+                  'module': self.module, 'names': self.names}
+        packed.write_packed(header, self.matrices, filepath)
+        return filepath
+
+    @classmethod
+    def load(cls, filepath):
+        with packed.PackedReader(filepath) as reader:
+            header = reader.header
+            if header.get('type') != GUIDE_FILE_TYPE:
+                raise IOError('{} is not a guide file!'.format(filepath))
+            if header.get('version', 0) > GUIDE_FILE_VERSION:
+                raise IOError('{} uses guide file version {}, newer than supported ({})!'.format(
+                    filepath, header['version'], GUIDE_FILE_VERSION))
+            return cls(header['names'], reader.values(), module=header.get('module'))
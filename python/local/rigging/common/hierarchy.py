@@ -1,12 +1,191 @@
-# from collections import OrderedDict
+from collections import OrderedDict
+import copy
 
 from PySide2 import QtWidgets, QtCore, QtGui
 
 from local.constants import node_blueprints
+from local.basic import api
+from local.dataIO import json as json_io
 
+import maya.api.OpenMaya as om
 import maya.cmds as cmds
 
 
+def _add_entry(entries, name, parent_index):
+    path = name if parent_index is None else '{}|{}'.format(entries[parent_index][0], name)
+    entries.append((path, name, parent_index))
+    return len(entries) - 1
+
+
+def _flatten(spec, parent_index, entries):
+    if isinstance(spec, str):
+        _add_entry(entries, spec, parent_index)
+    elif isinstance(spec, TransformNode):
+        index = _add_entry(entries, spec.name(), parent_index)
+        for child in spec.children():
+            _flatten(child, index, entries)
+    elif isinstance(spec, dict):
+        for name, children in spec.items():
+            index = _add_entry(entries, name, parent_index)
+            if children:
+                _flatten(children, index, entries)
+    elif isinstance(spec, (list, tuple)):
+        latest_index = None
+        for item in spec:
+            if isinstance(item, (list, tuple)):
+                if latest_index is None:
+                    raise ValueError('Hierarchy children given before their parent: {}'.format(item))
+                _flatten(item, latest_index, entries)
+            elif isinstance(item, str):
+                latest_index = _add_entry(entries, item, parent_index)
+            else:
+                _flatten(item, parent_index, entries)
+    else:
+        raise TypeError('Unsupported hierarchy entry: {}'.format(spec))
+
+
+def flatten_hierarchy(spec):
+    """
+    Flattens a hierarchy spec into a parent ordered list.
+
+    Specs can be nested lists (a list after a name holds that name's children,
+    as in DEFAULT_RIG_HIERARCHY), dictionaries of name to children (None for
+    none), TransformNode trees, or any mix of them.
+
+    Returns:
+        (list[tuple]): (path, name, parent_index) per node, where path is the
+            '|' joined spec names from the top of the spec.
+
+    """
+    entries = []
+    _flatten(spec, None, entries)
+    return entries
+
+
+def build_hierarchy(spec, parent=None, name_function=None):
+    """
+    Creates a whole hierarchy of transforms in one MDagModifier pass, every
+    node directly under its parent.  Nothing is looked up by name, so existing
+    nodes with the same names do not break the build (Maya makes the new names
+    unique).
+
+    Args:
+        spec (list) or (dict) or (TransformNode): Hierarchy to build, see
+            flatten_hierarchy.
+        parent (str): Existing node to build the hierarchy under.
+        name_function (function): Maps each spec name to the node name to
+            create.  Spec names are used as they are if not given.
+
+    Returns:
+        (OrderedDict): Spec path to MObject for every created node, parents
+            first.
+
+    """
+    entries = flatten_hierarchy(spec)
+    names = [name_function(name) if name_function else name for _, name, _ in entries]
+    parents = [parent if parent_index is None else parent_index
+               for _, _, parent_index in entries]
+    mobjects = api.create_dag_nodes('transform', names, parents=parents)
+    return OrderedDict((path, mobject) for (path, _, _), mobject in zip(entries, mobjects))
+
+
+def _strip_clash_suffix(name):
+    # GLOBAL_MOVE_GRP1 -> GLOBAL_MOVE_GRP, as left behind by Maya renaming a clash
+    return name.rstrip('0123456789') or name
+
+
+def reconcile_hierarchy(spec, parent=None, name_function=None):
+    """
+    Patches the scene to match a hierarchy spec instead of building it again.
+    The existing hierarchy under each top level spec node is read with one
+    listing, and only the differences are applied, in a single MDagModifier
+    pass: missing nodes are created, misplaced nodes reparented, and nodes
+    found under their spec name, or a clash renamed copy (GLOBAL_MOVE_GRP1)
+    sitting under the expected parent, are renamed.  Scene nodes the spec does
+    not mention are left alone.
+
+    Running it again on an up to date scene changes nothing.
+
+    Args:
+        spec (list) or (dict) or (TransformNode): Hierarchy to match, see
+            flatten_hierarchy.
+        parent (str): Existing node the hierarchy should live under.
+        name_function (function): Maps each spec name to its node name.
+
+    Returns:
+        (tuple): The spec path to MObject map, as build_hierarchy returns, and
+            a dict of the 'created', 'reparented' and 'renamed' spec paths.
+
+    """
+    entries = flatten_hierarchy(spec)
+    names = [name_function(name) if name_function else name for _, name, _ in entries]
+    parent_path = cmds.ls(parent, long=True)[0] if parent else ''
+    parent_mobject = api.get_mobject(parent_path) if parent else om.MObject.kNullObj
+
+    # Snapshot of every existing node below the top level spec nodes
+    scene_nodes = {}
+    for (_, _, parent_index), name in zip(entries, names):
+        if parent_index is not None:
+            continue
+        existing = cmds.ls('{}|{}'.format(parent_path, name) if parent else '|' + name, long=True)
+        if not existing:
+            continue
+        tree = HierarchyTree.from_scene(existing[0])
+        scene_root = existing[0].rpartition('|')[0]
+        for path in tree.paths:
+            scene_nodes['{}|{}'.format(scene_root, path)] = path.rpartition('|')[2]
+
+    candidates = {}
+    clash_copies = {}
+    for long_name, leaf in scene_nodes.items():
+        candidates.setdefault(leaf, []).append(long_name)
+        if _strip_clash_suffix(leaf) != leaf:
+            clash_copies.setdefault((long_name.rpartition('|')[0], _strip_clash_suffix(leaf)),
+                                    []).append(long_name)
+
+    modifier = om.MDagModifier()
+    changes = {'created': [], 'reparented': [], 'renamed': []}
+    matched = []
+    mobjects = []
+    used = set()
+    for (path, spec_name, parent_index), name in zip(entries, names):
+        desired_parent = parent_path if parent_index is None else matched[parent_index]
+        new_parent = parent_mobject if parent_index is None else mobjects[parent_index]
+
+        options = [long_name for key in (name, spec_name)
+                   for long_name in candidates.get(key, []) if long_name not in used]
+        if not options and desired_parent:
+            # A clash renamed copy only stands in for a missing node where Maya
+            # would have made it, directly under the expected parent
+            options = [long_name for long_name in clash_copies.get((desired_parent, name), [])
+                       if long_name not in used]
+        if options:
+            # Prefer a node that is already in place
+            in_place = [long_name for long_name in options
+                        if long_name.rpartition('|')[0] == desired_parent]
+            long_name = (in_place or options)[0]
+            used.add(long_name)
+            mobject = api.get_mobject(long_name)
+            if long_name.rpartition('|')[0] != desired_parent:
+                modifier.reparentNode(mobject, new_parent)
+                changes['reparented'].append(path)
+            if scene_nodes[long_name] != name:
+                modifier.renameNode(mobject, name)
+                changes['renamed'].append(path)
+        else:
+            long_name = None
+            mobject = modifier.createNode('transform', new_parent)
+            modifier.renameNode(mobject, name)
+            changes['created'].append(path)
+
+        matched.append(long_name)
+        mobjects.append(mobject)
+
+    api.do_it(modifier)
+    nodes = OrderedDict((path, mobject) for (path, _, _), mobject in zip(entries, mobjects))
+    return nodes, changes
+
+
 class Hierarchy(object):
     """
     Example Hiearchy:
@@ -24,31 +203,18 @@ class Hierarchy(object):
     ]
     """
 
-    defaultHierarchy = node_blueprints.DEFAULT_RIG_HIERARCHY[:]
+    defaultHierarchy = node_blueprints.DEFAULT_RIG_HIERARCHY
 
     def __init__(self, hierarchy, value_type='string'):
         self.hierarchy = hierarchy
         self.objectHierarchy = []
+        self.nodes = OrderedDict()
 
         if value_type == 'string':
             self.create_hierarchy()
         elif value_type == 'object':
             self.create_object_hierarchy()
 
-    def recurse_build(self, contents, parent_node):
-        latest_node = None
-        for node in contents:
-            if isinstance(node, str):
-                latest_node = cmds.createNode('transform', name=node)
-                if parent_node is not None:
-                    cmds.parent(node, parent_node)
-            elif isinstance(node, (list, tuple)):
-                self.recurse_build(node, latest_node)
-            elif isinstance(node, dict):
-                node_tuples = node.items()
-                for nodeTuple in node_tuples:
-                    self.recurse_build(nodeTuple, latest_node)
-
     def recurse_object_build(self, contents, parent_node):
         latest_node = None
         row = []
@@ -56,32 +222,30 @@ class Hierarchy(object):
             if isinstance(node, str):
                 latest_node = TransformNode(name=node)
                 if parent_node is not None:
-                    latest_node._parent = parent_node
+                    parent_node.append_child(latest_node)
                 row.append(latest_node)
             elif isinstance(node, (list, tuple)):
-                children = self.recurse_object_build(node, latest_node)
-                latest_node._children = children
+                self.recurse_object_build(node, latest_node)
         return row
 
     def create_hierarchy(self):
         """
         Builds the hierarchy based on input
 
-        - if self.hierarchy is a list type, recurse_build will run normally
+        - if self.hierarchy is a list, dict or TransformNode, it is built as given
         - if self.hierarchy is a string, presume rig hierarchy and use input as the root node name
-        - if self.hierarchy is a dict, runs similar to list but messier and does not maintain order
+
+        The created nodes are kept in self.nodes, keyed by spec path.
 
         """
-        if isinstance(self.hierarchy, (list, tuple)):
-            self.recurse_build(self.hierarchy, None)
-        elif isinstance(self.hierarchy, str):
+        if isinstance(self.hierarchy, str):
             # Copy default rig hierarchy
-            contents = self.defaultHierarchy
+            contents = copy.deepcopy(self.defaultHierarchy)
             contents[0] = self.hierarchy
-            self.recurse_build(contents, None)
-        elif isinstance(self.hierarchy, dict):
-            contents = self.hierarchy.items()
-            self.recurse_build(contents, None)
+        else:
+            contents = self.hierarchy
+        self.nodes = build_hierarchy(contents)
+        return self.nodes
 
     def create_object_hierarchy(self):
         tree = self.recurse_object_build(self.hierarchy, None)
@@ -89,11 +253,20 @@ class Hierarchy(object):
 
 
 class TransformNode(object):
+    """
+    A node of an in-memory transform tree.  Children are also indexed by name,
+    so get_child_by_name does not scan the children.
+    """
+
+    __slots__ = ('_name', '_parent', '_children', '_child_index')
 
     def __init__(self, name='', parent=None):
-        self._parent = parent
+        self._parent = None
         self._name = name
         self._children = []
+        self._child_index = {}
+        if parent is not None:
+            parent.append_child(self)
 
     def children(self):
         return self._children
@@ -105,18 +278,39 @@ class TransformNode(object):
         return self._name
 
     def set_name(self, name):
+        if self._parent is not None:
+            self._parent._unindex_child(self)
         self._name = name
+        if self._parent is not None:
+            self._parent._child_index.setdefault(name, self)
+
+    def _unindex_child(self, child):
+        if self._child_index.get(child.name()) is child:
+            del self._child_index[child.name()]
+            # Another child may share the name
+            for sibling in self._children:
+                if sibling is not child and sibling.name() == child.name():
+                    self._child_index[child.name()] = sibling
+                    break
+
+    def append_child(self, child):
+        return self.insert_child(len(self._children), child)
 
     def insert_child(self, position, child):
-        if 0 <= position < len(self._children):
+        if 0 <= position <= len(self._children):
+            if child._parent is not None:
+                child._parent.remove_child(child._parent.children().index(child))
             self._children.insert(position, child)
+            self._child_index.setdefault(child.name(), child)
             child._parent = self
             return True
         return False
 
     def remove_child(self, position):
         if 0 <= position < len(self._children):
-            child = self._children.pop(position)
+            child = self._children[position]
+            self._unindex_child(child)
+            self._children.pop(position)
             child._parent = None
             return True
         return False
@@ -128,18 +322,237 @@ class TransformNode(object):
             raise IndexError('Invalid index!')
 
     def get_child_by_name(self, name):
-        for child in self._children:
-            if child.name() == name:
-                return child
+        return self._child_index.get(name)
+
+
+class HierarchyTree(object):
+    """
+    Array backed transform tree for large rig outlines.  Nodes are int ids into
+    flat name and parent arrays, with hash indices from path and from name to
+    id, so lookups never walk the tree.
+
+    Paths are '|' joined names from the top of the tree, as in DAG paths.  When
+    siblings share a name, the path index points at the first of them.
+
+    Example:
+        tree = HierarchyTree.from_spec(node_blueprints.DEFAULT_RIG_HIERARCHY)
+        tree.find('RigRootName|GLOBAL_MOVE|JNT')
+
+    """
+
+    __slots__ = ('names', 'parents', '_children', '_rows', 'paths', '_path_index', '_name_index')
+
+    def __init__(self):
+        self.names = []
+        self.parents = []
+        self.paths = []
+        self._children = {-1: []}
+        self._rows = []
+        self._path_index = {}
+        self._name_index = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, parent=-1):
+        """
+        Adds a node under the parent id (-1 for a top level node) and returns
+        its id.
+        """
+        node_id = len(self.names)
+        path = name if parent == -1 else '{}|{}'.format(self.paths[parent], name)
+        siblings = self._children[parent]
+
+        self.names.append(name)
+        self.parents.append(parent)
+        self.paths.append(path)
+        self._rows.append(len(siblings))
+        siblings.append(node_id)
+        self._children[node_id] = []
+        self._path_index.setdefault(path, node_id)
+        self._name_index.setdefault(name, []).append(node_id)
+        return node_id
+
+    # Construction -----------------------------------------------------#
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        Builds a tree from (name, parent_index) pairs in parent order, such as
+        the output of flatten_hierarchy.
+        """
+        tree = cls()
+        for name, parent_index in entries:
+            tree.add(name, -1 if parent_index is None else parent_index)
+        return tree
+
+    @classmethod
+    def from_spec(cls, spec):
+        """
+        Builds a tree from any hierarchy spec flatten_hierarchy accepts.
+        """
+        return cls.from_entries((name, parent_index)
+                                for _, name, parent_index in flatten_hierarchy(spec))
+
+    @classmethod
+    def from_scene(cls, root):
+        """
+        Snapshots the transforms under (and including) a scene node with one
+        listRelatives call.
+        """
+        root_path = cmds.ls(root, long=True)[0]
+        descendants = cmds.listRelatives(root_path, allDescendents=True, type='transform',
+                                         fullPath=True) or []
+        # Long names sort parents before their children
+        long_names = [root_path] + sorted(descendants, key=lambda node: node.count('|'))
+        ids = {}
+        tree = cls()
+        for long_name in long_names:
+            parent_path, _, name = long_name.rpartition('|')
+            ids[long_name] = tree.add(name, ids.get(parent_path, -1))
+        return tree
+
+    # Queries ----------------------------------------------------------#
+    def find(self, path):
+        return self._path_index.get(path)
+
+    def find_name(self, name):
+        return list(self._name_index.get(name, []))
+
+    def children(self, node_id=-1):
+        return self._children[node_id]
+
+    def parent(self, node_id):
+        return self.parents[node_id]
+
+    def row(self, node_id):
+        return self._rows[node_id]
+
+    def to_spec(self, node_id=-1):
+        """
+        Returns the tree as a nested list spec, as in DEFAULT_RIG_HIERARCHY.
+        """
+        spec = []
+        for child_id in self._children[node_id]:
+            spec.append(self.names[child_id])
+            if self._children[child_id]:
+                spec.append(self.to_spec(child_id))
+        return spec
+
+    def diff(self, other):
+        """
+        Compares this tree to another by path.  Nodes whose name is unique in
+        both trees but whose path changed are reported as moved rather than
+        added and removed.
+
+        Returns:
+            (dict): 'added' and 'removed' paths, parents first, and 'moved'
+                (old_path, new_path) pairs.  Nodes that only moved along with
+                a moved parent are left out.
+
+        """
+        added = [path for path in other.paths if path not in self._path_index]
+        removed = [path for path in self.paths if path not in other._path_index]
+
+        removed_by_name = {}
+        for path in removed:
+            name = path.rpartition('|')[2]
+            if len(self._name_index[name]) == 1 and len(other._name_index.get(name, ())) == 1:
+                removed_by_name[name] = path
+        all_moves = [(removed_by_name[path.rpartition('|')[2]], path) for path in added
+                     if path.rpartition('|')[2] in removed_by_name]
+
+        # Descendants that only followed a moved parent are not moves of their own
+        moved = []
+        moved_parents = {}
+        for old_path, new_path in all_moves:
+            moved_parents[old_path] = new_path
+            if moved_parents.get(old_path.rpartition('|')[0]) != new_path.rpartition('|')[0]:
+                moved.append((old_path, new_path))
+
+        moved_from = set(old_path for old_path, _ in all_moves)
+        moved_to = set(new_path for _, new_path in all_moves)
+        return {'added': [path for path in added if path not in moved_to],
+                'removed': [path for path in removed if path not in moved_from],
+                'moved': moved}
+
+    # Serialization ----------------------------------------------------#
+    def to_data(self):
+        return {'names': list(self.names), 'parents': list(self.parents)}
+
+    @classmethod
+    def from_data(cls, data):
+        return cls.from_entries(
+            (name, None if parent == -1 else parent)
+            for name, parent in zip(data['names'], data['parents']))
+
+    def save(self, filepath):
+        json_io.save_to_json(self.to_data(), filepath)
+
+    @classmethod
+    def load(cls, filepath):
+        return cls.from_data(json_io.load_from_json(filepath))
+
+
+class HierarchyTreeModel(QtCore.QAbstractItemModel):
+    """
+    Read only item model over a HierarchyTree.  Nothing is built up front; the
+    view only asks for the rows it shows, so large outlines open and expand
+    without creating an item per node.
+    """
+
+    def __init__(self, tree, parent=None):
+        QtCore.QAbstractItemModel.__init__(self, parent)
+        self.tree = tree
+
+    def _node_id(self, index):
+        if not index.isValid():
+            return -1
+        # Indices carry the node id itself, so siblings sharing a name stay apart
+        return index.internalId()
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        children = self.tree.children(self._node_id(parent))
+        if column != 0 or not 0 <= row < len(children):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column, children[row])
+
+    def parent(self, index):
+        node_id = self._node_id(index)
+        if node_id == -1:
+            return QtCore.QModelIndex()
+        parent_id = self.tree.parent(node_id)
+        if parent_id == -1:
+            return QtCore.QModelIndex()
+        return self.createIndex(self.tree.row(parent_id), 0, parent_id)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.tree.children(self._node_id(parent)))
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        return bool(self.tree.children(self._node_id(parent)))
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node_id = self._node_id(index)
+        if role == QtCore.Qt.DisplayRole:
+            return self.tree.names[node_id]
+        if role == QtCore.Qt.ToolTipRole:
+            return self.tree.paths[node_id]
         return None
 
 
 class HierarchyTreeWidget(QtWidgets.QFrame):
 
-    # Should have a dropdown of defaults/saved hierarchy builds
-    defaultTree = Hierarchy(hierarchy=node_blueprints.DEFAULT_RIG_HIERARCHY, value_type='object')
+    # Outlines up to this size open fully expanded
+    EXPAND_ALL_LIMIT = 500
 
-    def __init__(self):
+    def __init__(self, tree=None):
         QtWidgets.QFrame.__init__(self)
 
         self.setWindowFlags(QtCore.Qt.WindowStaysOnTopHint)
@@ -161,41 +574,21 @@ class HierarchyTreeWidget(QtWidgets.QFrame):
 
         hierarchy_widget.layout().addLayout(tree_layout)
 
-        # ---------------
-        self.treeData = {}
-
         # ---------------
         self.tree_widget = QtWidgets.QTreeView()
-        model = QtGui.QStandardItemModel()
-        self.tree_widget.setModel(model)
-        self.rootItem = model.invisibleRootItem()
-
-        self.addFromTree(self.defaultTree.objectHierarchy)
+        self.tree_widget.setHeaderHidden(True)
+        self.tree_widget.setUniformRowHeights(True)
         tree_layout.addWidget(self.tree_widget)
 
-        self.tree_widget.expandAll()
+        # Should have a dropdown of defaults/saved hierarchy builds
+        self.set_tree(tree or HierarchyTree.from_spec(node_blueprints.DEFAULT_RIG_HIERARCHY))
+
+    def set_tree(self, tree):
+        self.tree = tree
+        self.model = HierarchyTreeModel(tree, self.tree_widget)
+        self.tree_widget.setModel(self.model)
 
-    def addItem(self, item, parent=''):
-        tree_item = QtGui.QStandardItem(item.name())
-        # tree_item.setData(item)
-        if parent:
-            parent_item = self.treeData[parent]
-            parent_item.appendRow(tree_item)
+        if len(tree) <= self.EXPAND_ALL_LIMIT:
+            self.tree_widget.expandAll()
         else:
-            self.rootItem.appendRow(tree_item)
-            self.treeData[item.name()] = tree_item
-
-    def addChildrenFromTree(self, parent, children):
-        for child in children:
-            tree_item = QtGui.QStandardItem(child.name())
-            parent.appendRow(tree_item)
-            if child.children():
-                self.addChildrenFromTree(tree_item, child.children())
-
-    def addFromTree(self, tree):
-        root = tree[0]
-        tree_item = QtGui.QStandardItem(root.name())
-        children = root.children()
-
-        self.rootItem.appendRow(tree_item)
-        self.addChildrenFromTree(tree_item, children)
+            self.tree_widget.expandToDepth(0)
@@ -1,4 +1,5 @@
 from collections import OrderedDict
+import copy
 
 from PySide2 import QtWidgets, QtCore, QtGui
 
@@ -6,7 +7,8 @@ from local.widgets.common import frame
 from local.basic import curve_builder
 from local.basic import attributes
 from local.basic import node_builder
-from local.basic import utils
+from local.basic import api
+from local.rigging.common import hierarchy
 from local.decorators.undo import UndoBlock
 
 import maya.cmds as cmds
@@ -57,103 +59,147 @@ def construct_hierarchy_dict():
     return hierarchy_dict
 
 
-def simple_rig_setup(rig_name):
-    hierarchy_dict = construct_hierarchy_dict()
-
-    root_node = cmds.createNode('transform', name=rig_name)
-    base_children = []
-    for base, sub_one in hierarchy_dict.items():
-        base_node = utils.create_null(name=base, suffix='GRP')
-        if sub_one:
-            sub_one_children = []
-            for one, sub_two in sub_one.items():
-                sub_one_node = utils.create_null(name=one, suffix='GRP')
-                if sub_two:
-                    sub_two_children = []
-                    for two, sub_three in sub_two.items():
-                        sub_two_node = utils.create_null(name=two, suffix='GRP')
-                        sub_two_children.append(sub_two_node)
-                    cmds.parent(sub_two_children, sub_one_node)
-                sub_one_children.append(sub_one_node)
-            cmds.parent(sub_one_children, base_node)
-        base_children.append(base_node)
-    cmds.parent(base_children, root_node)
-
-    cmds.rename('Local_CTL_GRP', 'Local_CTL')
-    cmds.rename('Global_CTL_GRP', 'Global_CTL')
-
-    curve_builder.add_curve_shape('rounded_square', transform_node='Local_CTL', color='orange')
-    curve_builder.add_curve_shape('master_move', transform_node='Global_CTL', color='yellow')
-
-    # connecting global move parts to the matrix of the master controllers
-    global_matrix = node_builder.create_node('DCPM', name='GLOBAL')
-    cmds.connectAttr('Local_CTL.worldMatrix',
-                     global_matrix + '.inputMatrix')
-    cmds.connectAttr(global_matrix + '.outputTranslate',
-                     'GLOBAL_MOVE_GRP.translate')
-    cmds.connectAttr(global_matrix + '.outputRotate', 'GLOBAL_MOVE_GRP.rotate')
-    cmds.connectAttr(global_matrix + '.outputScale', 'GLOBAL_MOVE_GRP.scale')
-    # set geo grp to reference by default
-    cmds.setAttr('GEO_GRP.overrideEnabled', 1)
-    cmds.setAttr('GEO_GRP.overrideDisplayType', 2)
-
-    # add attrs to global and local + set connections
-    attributes.create_attr(
+def _rig_hierarchy_spec(rig_name, hierarchy_spec=None):
+    if hierarchy_spec is None:
+        return [rig_name, construct_hierarchy_dict()]
+    if (isinstance(hierarchy_spec, (list, tuple)) and len(hierarchy_spec) == 2
+            and isinstance(hierarchy_spec[0], str)):
+        # Root and children, as in DEFAULT_RIG_HIERARCHY
+        return [rig_name, copy.deepcopy(hierarchy_spec[1])]
+    return [rig_name, hierarchy_spec]
+
+
+def _create_attr(attribute_name, input_object, **kwargs):
+    if not cmds.attributeQuery(attribute_name, node=input_object, exists=True):
+        attributes.create_attr(attribute_name=attribute_name, input_object=input_object,
+                               **kwargs)
+
+
+def _get_connected_node(plug, node_type):
+    nodes = cmds.listConnections(plug, source=False, destination=True, type=node_type) or []
+    return nodes[0] if nodes else None
+
+
+def _connect(source, destination):
+    if cmds.isConnected(source, destination):
+        return
+    # Locked channels (the control scales) are relocked at the end of the setup
+    cmds.setAttr(destination, lock=False)
+    cmds.connectAttr(source, destination, force=True)
+
+
+def simple_rig_setup(rig_name, hierarchy_spec=None, reconcile=True):
+    """
+    Builds the base rig hierarchy with the Global/Local controls wired to the
+    global move group.
+
+    Args:
+        rig_name (str): Name of the rig root.
+        hierarchy_spec (list) or (dict): Hierarchy under the root.  Defaults to
+            construct_hierarchy_dict(); DEFAULT_RIG_HIERARCHY style specs have
+            their root replaced by rig_name.
+        reconcile (bool): Patch an existing rig of the same name to match the
+            spec instead of building a second copy.  Rerunning is then
+            incremental and leaves an up to date rig unchanged.
+
+    """
+    spec = _rig_hierarchy_spec(rig_name, hierarchy_spec)
+
+    def name_function(name):
+        # Control transforms keep their name, everything else is a group
+        if name == rig_name or name.endswith('_CTL'):
+            return name
+        return '{}_GRP'.format(name)
+
+    if reconcile:
+        nodes, _ = hierarchy.reconcile_hierarchy(spec, name_function=name_function)
+    else:
+        nodes = hierarchy.build_hierarchy(spec, name_function=name_function)
+    node_names = dict((path.split('|')[-1], api.get_name(mobject))
+                      for path, mobject in nodes.items())
+    local_ctl = node_names['Local_CTL']
+    global_ctl = node_names['Global_CTL']
+    global_move_grp = node_names['GLOBAL_MOVE']
+    geo_grp = node_names['GEO']
+
+    if not cmds.listRelatives(local_ctl, shapes=True):
+        curve_builder.add_curve_shape('rounded_square', transform_node=local_ctl, color='orange')
+    if not cmds.listRelatives(global_ctl, shapes=True):
+        curve_builder.add_curve_shape('master_move', transform_node=global_ctl, color='yellow')
+
+    # Every attribute and connection is checked on its own, so a rerun wires
+    # up any node reconcile had to recreate and leaves the rest alone
+    _create_attr(
         attribute_name='localScale',
         attribute_type='double',
-        input_object='Local_CTL',
+        input_object=local_ctl,
         default_value=1,
         min_value=0.01)
-    attributes.create_attr(
+    _create_attr(
         attribute_name='globalScale',
         attribute_type='double',
-        input_object='Global_CTL',
+        input_object=global_ctl,
         default_value=1,
         min_value=0.01)
-    attributes.create_attr(
+    _create_attr(
         attribute_name='GEO',
         attribute_type='enum',
-        input_object='Global_CTL',
+        input_object=global_ctl,
         enum_names=['-------'],
         keyable=False,
         channelbox=True)
-    attributes.create_attr(
+    _create_attr(
         attribute_name='geoSelectable',
         attribute_type='enum',
-        input_object='Global_CTL',
+        input_object=global_ctl,
         enum_names=['Normal', 'Template', 'Reference'],
         keyable=False,
         channelbox=True)
-    attributes.create_attr(
+    _create_attr(
         attribute_name='geoVis',
         attribute_type='enum',
-        input_object='Global_CTL',
+        input_object=global_ctl,
         enum_names=['Proxy', 'Render'],
         keyable=False,
         channelbox=True)
 
+    # connecting global move parts to the matrix of the master controllers
+    global_matrix = _get_connected_node(local_ctl + '.worldMatrix[0]', 'decomposeMatrix')
+    if not global_matrix:
+        global_matrix = node_builder.create_node('DCPM', name='GLOBAL')
+    _connect(local_ctl + '.worldMatrix[0]', global_matrix + '.inputMatrix')
+    _connect(global_matrix + '.outputTranslate', global_move_grp + '.translate')
+    _connect(global_matrix + '.outputRotate', global_move_grp + '.rotate')
+    _connect(global_matrix + '.outputScale', global_move_grp + '.scale')
+
+    # set geo grp to reference by default
+    cmds.setAttr(geo_grp + '.overrideEnabled', 1)
+    if not cmds.listConnections(geo_grp + '.overrideDisplayType', source=True,
+                                destination=False):
+        cmds.setAttr(geo_grp + '.overrideDisplayType', 2)
+
     # Geo Selectable connections
-    cmds.connectAttr('Global_CTL.geoSelectable', 'GEO_GRP.overrideDisplayType')
+    _connect(global_ctl + '.geoSelectable', geo_grp + '.overrideDisplayType')
 
     # Geo Vis connections
-    reverse_vis = node_builder.create_node('REV', name='Global_geoVis')
-    cmds.connectAttr('Global_CTL.geoVis', 'RENDER_GRP.visibility')
-    cmds.connectAttr('Global_CTL.geoVis', reverse_vis + '.inputX')
-    cmds.connectAttr(reverse_vis + '.outputX', 'ANIM_PROXY_GRP.visibility')
+    reverse_vis = _get_connected_node(global_ctl + '.geoVis', 'reverse')
+    if not reverse_vis:
+        reverse_vis = node_builder.create_node('REV', name='Global_geoVis')
+    _connect(global_ctl + '.geoVis', node_names['RENDER'] + '.visibility')
+    _connect(global_ctl + '.geoVis', reverse_vis + '.inputX')
+    _connect(reverse_vis + '.outputX', node_names['ANIM_PROXY'] + '.visibility')
 
     for s in ['X', 'Y', 'Z']:
-        cmds.connectAttr('Local_CTL' + '.localScale',
-                         'Local_CTL' + '.scale' + s)
-        cmds.connectAttr('Global_CTL' + '.globalScale',
-                         'Global_CTL' + '.scale' + s)
+        _connect(local_ctl + '.localScale', local_ctl + '.scale' + s)
+        _connect(global_ctl + '.globalScale', global_ctl + '.scale' + s)
 
     attributes.lock_attrs(
-        nodes=['Local_CTL', 'Global_CTL'],
+        nodes=[local_ctl, global_ctl],
         attrs=['sx', 'sy', 'sz', 'v'],
         hide=True)
 
     # TODO: What is this returning for?
-    return 'Global_CTL', 'Local_CTL'
+    return global_ctl, local_ctl
 
 
 class CreateRigWidget(frame.MayaFrameWidget):
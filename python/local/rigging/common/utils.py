@@ -7,129 +7,555 @@ from local.basic import curve_builder
 from local.basic import attributes
 from local.basic import node_builder
 from local.basic import utils
+from local.basic import api
+from local.dataIO import packed
 from local.decorators.undo import UndoBlock
 
+import maya.api.OpenMaya as om
 import maya.cmds as cmds
+import numpy as np
 import pymel.core as pm
 
 
-def export_rig_pose(filepath):
-    pass
-
-
-def import_rig_pose(filepath):
-    pass
-
-
-def vector_aim_constraint(source, target, up_position, aim_vector='x', up_vector='y'):
-    if isinstance(up_position, list) or isinstance(up_position, tuple):
-        if len(up_position) != 3:
-            raise IndexError('Incorrect number of position coordinates given! Must be 3 (xyz)')
-        up_vector_null = utils.create_null(name='{}_UPVEC'.format(target))
-    elif isinstance(up_position, str) or isinstance(up_position, six.string_types):
-        up_vector_null = up_position
+POSE_FILE_TYPE = 'rigPose'
+POSE_FILE_VERSION = 1
+
+
+def pose_control_name(node):
+    # Short name without namespace, so poses move between rig references
+    return node.split('|')[-1].split(':')[-1]
+
+
+def get_rig_controls(root):
+    """
+    Returns the long names of every curve control under (and including) the
+    rig root.
+    """
+    shapes = cmds.listRelatives(root, allDescendents=True, type='nurbsCurve', fullPath=True) or []
+    shapes.extend(cmds.listRelatives(root, shapes=True, type='nurbsCurve', fullPath=True) or [])
+    return list(dict.fromkeys(cmds.listRelatives(shapes, parent=True, fullPath=True) or []))
+
+
+def read_rig_pose(root):
+    """
+    Reads every keyable, unlocked value on the rig's controls.  The plugs of
+    all controls are listed in one listAnimatable query and read from one
+    selection list.
+
+    Returns:
+        (tuple): The pose description, a [name, uuid, attributes, offset] entry
+            per control, and the flat float32 array of values the offsets index.
+
+    """
+    controls = get_rig_controls(root)
+    if not controls:
+        return [], np.array([], dtype=np.float32)
+    uuids = api.get_uuids(controls)
+
+    selection = om.MSelectionList()
+    for plug_name in cmds.listAnimatable(controls) or []:
+        selection.add(plug_name)
+
+    # Shape plugs are listed too; only the controls' own plugs are kept
+    control_plugs = dict((uuid, []) for uuid in uuids)
+    for index in range(selection.length()):
+        plug = selection.getPlug(index)
+        if plug.isLocked:
+            continue
+        uuid = om.MFnDependencyNode(plug.node()).uuid().asString()
+        if uuid in control_plugs:
+            control_plugs[uuid].append(plug)
+
+    pose_controls = []
+    values = []
+    for control, uuid in zip(controls, uuids):
+        plugs = control_plugs[uuid]
+        if not plugs:
+            continue
+        pose_controls.append([pose_control_name(control), uuid,
+                              [plug.partialName(useLongNames=True) for plug in plugs],
+                              len(values)])
+        values.extend(plug.asDouble() for plug in plugs)
+    return pose_controls, np.array(values, dtype=np.float32)
+
+
+def resolve_pose_plugs(pose_controls, root=None, match_by='name'):
+    """
+    Finds the scene plugs for a pose description.  Controls and attributes
+    missing from the scene are skipped.
+
+    Args:
+        pose_controls (list): [name, uuid, attributes, offset] per control.
+        root (str): Rig root to match control names under.
+        match_by (str): 'name' or 'uuid'.
+
+    Returns:
+        (tuple): Plugs, the index of each plug's value in the pose values, and
+            a boolean mask of the plugs that take integer values.
+
+    """
+    if match_by == 'uuid':
+        uuids = [uuid for _, uuid, _, _ in pose_controls]
+        nodes = dict((uuid, node) for uuid, node in zip(uuids, api.get_nodes_from_uuids(uuids))
+                     if node is not None)
+        keys = uuids
+    elif match_by == 'name':
+        if not root:
+            raise ValueError('A rig root is needed to match pose controls by name!')
+        nodes = dict((pose_control_name(control), control) for control in get_rig_controls(root))
+        keys = [name for name, _, _, _ in pose_controls]
     else:
-        raise Exception('Incorrect input given for parameter: up_position={}'.format(up_position))
-
-    # Source nodes:
-    sourcePMM = node_builder.create_node('PMM', name=source + '_aimSource')
-    sourceCMPM = node_builder.create_node('CMPM', name=source + '_aimSource')
-
-    # Target nodes:
-    targetPMM = node_builder.create_node('PMM', name=target + '_aimTarget')
-    targetCMPM = node_builder.create_node('CMPM', name=target + '_aimTarget')
-    targetINVM = node_builder.create_node('INVM', name=target + '_aimTarget')
-
-    # Vector nodes:
-    vectorMM = node_builder.create_node('MM', name=target + '_aimVector')
-    vectorDCPM = node_builder.create_node('DCPM', name=target + '_aimVector')
-
-    vectorNormVP = node_builder.create_node('VP', name=target + '_normalizedAimVector')
-    upVectorVP = node_builder.create_node('VP', name=target + '_upVector')
-    sideVectorVP = node_builder.create_node('VP', name=target + '_sideVector')
-
-    # Matrix nodes:
-    compiled4x4M = node_builder.create_node('4x4M', name=target + '_compiledVectors')
-    dcpm4x4M = node_builder.create_node('DCPM', name=target + '_compiledVectors')
-
-    # How it works:
-    # vectorNormVP gives the normalized aim vector
-    #  - plug the normalized xyz into the n0, n1, n2 for desired direction
-    #    * where n = [x=0, y=1, z=2]
-    # upVectorVP gives normalized vector crossProduct'd with the axis direction (null/obj)
-    #  - plug upVec into n0, n1, n2 for desired direction (see above)
-    # sideVectorVP gives the vector for the leftover plane of rotation
-    #  - plug sideVec into whichever vector is still available in the 4x4 (3x3) matrix node
-    # Resulting matrix gives only rotations, aiming the target at the source
-
-    # Source connections:
-    cmds.connectAttr(source + '.t', sourcePMM + '.inPoint')
-    cmds.connectAttr(source + '.parentMatrix[0]', sourcePMM + '.inMatrix')
-    cmds.connectAttr(sourcePMM + '.output', sourceCMPM + '.inputTranslate')
-    cmds.connectAttr(sourceCMPM + '.outputMatrix', vectorMM + '.matrixIn[0]')
-
-    # Target connections:
-    cmds.connectAttr(target + '.t', targetPMM + '.inPoint')
-    cmds.connectAttr(target + '.parentMatrix[0]', targetPMM + '.inMatrix')
-    cmds.connectAttr(targetPMM + '.output', targetCMPM + '.inputTranslate')
-    cmds.connectAttr(targetCMPM + '.outputMatrix', targetINVM + '.inputMatrix')
-    cmds.connectAttr(targetINVM + '.outputMatrix', vectorMM + '.matrixIn[1]')
-
-    cmds.connectAttr(vectorMM + '.matrixSum', vectorDCPM + '.inputMatrix')
-    cmds.connectAttr(vectorDCPM + '.outputTranslate', vectorNormVP + '.input1')
-
-    # Assigning which vectors to assign to the 4x4 matrix plugs
-    vector2directionPlugs = {
-        'x': 0,
-        'y': 1,
-        'z': 2
-    }
-    compiled4x4Plugs = ['{}0', '{}1', '{}2']
-    aimPlugs = lambda axis: [plug.format(vector2directionPlugs[axis]) for plug in compiled4x4Plugs]
-
-    # Retrieve the unused axis to apply as the side axis
-    axes = ['x', 'y', 'z']
-    for used in (aim_vector, up_vector):
-        axes.remove(used)
-
-    aimDirectionPlugs = aimPlugs(aim_vector)    # Default X
-    upDirectionPlugs = aimPlugs(up_vector)      # Default Y
-    sideDirectionPlugs = aimPlugs(axes[0])      # Default Z
-
-    # Normalized vector
-    cmds.setAttr(vectorNormVP + '.operation', 0)  # no operation
-    cmds.setAttr(vectorNormVP + '.normalizeOutput', 1)
-
-    # Up vector
-    cmds.setAttr(vectorNormVP + '.operation', 2)  # cross product
-    cmds.setAttr(vectorNormVP + '.normalizeOutput', 0)
-    cmds.connectAttr(vectorNormVP + '.output', upVectorVP + '.input1')
-    cmds.connectAttr(up_vector_null + '.t', upVectorVP + '.input2')
+        raise ValueError('Unknown pose match type: {}'.format(match_by))
+
+    plugs = []
+    indices = []
+    for key, (_, _, attrs, offset) in zip(keys, pose_controls):
+        if key not in nodes:
+            continue
+        node_fn = om.MFnDependencyNode(api.get_mobject(nodes[key]))
+        for index, attr in enumerate(attrs):
+            if not node_fn.hasAttribute(attr):
+                continue
+            plug = node_fn.findPlug(attr, False)
+            if plug.isLocked:
+                continue
+            plugs.append(plug)
+            indices.append(offset + index)
+
+    integer_mask = np.array([api.is_integer_plug(plug) for plug in plugs], dtype=bool)
+    return plugs, np.array(indices, dtype=np.int64), integer_mask
+
+
+def apply_pose_values(plugs, values, integer_mask):
+    """
+    Writes pose values onto resolved plugs in one MDGModifier pass.
+    """
+    modifier = om.MDGModifier()
+    for plug, value, is_integer in zip(plugs, values.tolist(), integer_mask.tolist()):
+        if is_integer:
+            modifier.newPlugValueInt(plug, int(round(value)))
+        else:
+            modifier.newPlugValueDouble(plug, value)
+    api.do_it(modifier)
 
-    # Side vector
-    cmds.setAttr(vectorNormVP + '.operation', 2)  # cross product
-    cmds.setAttr(vectorNormVP + '.normalizeOutput', 0)
-    cmds.connectAttr(upVectorVP + '.output', sideVectorVP + '.input1')
-    cmds.connectAttr(vectorNormVP + '.output', sideVectorVP + '.input2')
 
-    vectorOuts = ('outputX', 'outputY', 'outputZ')
-    for output, plug in zip(vectorOuts, aimDirectionPlugs):
-        cmds.connectAttr('{}.{}'.format(vectorNormVP, output), '{}.in{}'.format(compiled4x4M, plug))
+def export_rig_pose(filepath, root=None):
+    """
+    Saves the rig's current pose as a JSON header and a packed float32 block.
 
-    for output, plug in zip(vectorOuts, upDirectionPlugs):
-        cmds.connectAttr('{}.{}'.format(upVectorVP, output), '{}.in{}'.format(compiled4x4M, plug))
+    Args:
+        filepath (str): Pose file to write.
+        root (str): Rig root.  Uses the selection if not given.
 
-    for output, plug in zip(vectorOuts, sideDirectionPlugs):
-        cmds.connectAttr('{}.{}'.format(sideVectorVP, output), '{}.in{}'.format(compiled4x4M, plug))
+    Returns:
+        (dict): The written pose header.
 
-    cmds.connectAttr(compiled4x4M + '.output', dcpm4x4M + '.inputMatrix')
-    cmds.connectAttr(dcpm4x4M + '.outputRotate', target + '.r')
+    """
+    root = root or cmds.ls(selection=True)[0]
+    pose_controls, values = read_rig_pose(root)
+    header = {
+        'type': POSE_FILE_TYPE,
+        'version': POSE_FILE_VERSION,
+        'root': pose_control_name(root),
+        'controls': pose_controls,
+    }
+    packed.write_packed(header, values, filepath)
+    return header
+
+
+def import_rig_pose(filepath, root=None, controls=None, match_by='name'):
+    """
+    Applies a saved pose to a rig in one batched write.  The file is memory
+    mapped and only the values of the requested controls are read.
+
+    Args:
+        filepath (str): Pose file to read.
+        root (str): Rig root to match control names under.  Uses the selection,
+            then the root saved in the pose, if not given.
+        controls (list[str]): Control names to load.  Loads every control in
+            the pose if not given.
+        match_by (str): Match controls by 'name' or 'uuid'.
+
+    Returns:
+        (int): Number of values applied.
+
+    """
+    with packed.PackedReader(filepath) as reader:
+        header = reader.header
+        if header.get('type') != POSE_FILE_TYPE:
+            raise IOError('{} is not a rig pose file!'.format(filepath))
+        if header.get('version', 0) > POSE_FILE_VERSION:
+            raise IOError('{} uses pose version {}, newer than supported ({})!'.format(
+                filepath, header['version'], POSE_FILE_VERSION))
+
+        pose_controls = header['controls']
+        if controls is not None:
+            controls = set(pose_control_name(control) for control in controls)
+            pose_controls = [entry for entry in pose_controls if entry[0] in controls]
+
+        if match_by == 'name' and not root:
+            root = (cmds.ls(selection=True) or [header.get('root')])[0]
+        plugs, indices, integer_mask = resolve_pose_plugs(pose_controls, root, match_by)
+        if not plugs:
+            return 0
+
+        # Read each control's slice rather than the whole block
+        values = np.empty(len(indices), dtype=np.float32)
+        for _, _, attrs, offset in pose_controls:
+            start, end = np.searchsorted(indices, [offset, offset + len(attrs)])
+            if start == end:
+                continue
+            values[start:end] = reader.values(offset, len(attrs))[indices[start:end] - offset]
+
+    apply_pose_values(plugs, values, integer_mask)
+    return len(plugs)
+
+
+AXIS_INDEX = {
+    'x': 0,
+    'y': 1,
+    'z': 2
+}
+AXIS_VECTOR = {
+    'x': (1, 0, 0),
+    'y': (0, 1, 0),
+    'z': (0, 0, 1)
+}
+# First Maya version shipping the aimMatrix node
+AIM_MATRIX_API_VERSION = 20200000
+
+_aim_templates = {}
+
+
+def _get_vector_aim_template(aim_vector, up_vector):
+    """
+    Builds (once per axis combination) the vector product network that aims a
+    target at a source.
+
+    How it works:
+    aimVP gives the normalized aim vector, sideVP the normalized cross product
+    of the aim and up vectors, and upVP crosses those two back to get an up
+    vector orthogonal to the aim.  The three vectors fill the rows of a 4x4
+    matrix whose decomposed rotation aims the target at the source.
+
+    """
+    if (aim_vector, up_vector) in _aim_templates:
+        return _aim_templates[(aim_vector, up_vector)]
+
+    if aim_vector == up_vector:
+        raise ValueError('Aim and up vectors must use different axes!')
+    side_vector = [axis for axis in 'xyz' if axis not in (aim_vector, up_vector)][0]
+
+    # Keep the resulting matrix right handed for either axis ordering
+    if (AXIS_INDEX[up_vector] - AXIS_INDEX[aim_vector]) % 3 == 1:
+        side_inputs = ('{aimVP}.output', '{up}.t')
+        up_inputs = ('{sideVP}.output', '{aimVP}.output')
+    else:
+        side_inputs = ('{up}.t', '{aimVP}.output')
+        up_inputs = ('{aimVP}.output', '{sideVP}.output')
+
+    connections = [
+        # Source connections
+        ('{source}.t', '{sourcePMM}.inPoint'),
+        ('{source}.parentMatrix[0]', '{sourcePMM}.inMatrix'),
+        ('{sourcePMM}.output', '{sourceCMPM}.inputTranslate'),
+        ('{sourceCMPM}.outputMatrix', '{vectorMM}.matrixIn[0]'),
+        # Target connections
+        ('{target}.t', '{targetPMM}.inPoint'),
+        ('{target}.parentMatrix[0]', '{targetPMM}.inMatrix'),
+        ('{targetPMM}.output', '{targetCMPM}.inputTranslate'),
+        ('{targetCMPM}.outputMatrix', '{targetINVM}.inputMatrix'),
+        ('{targetINVM}.outputMatrix', '{vectorMM}.matrixIn[1]'),
+        # Vectors
+        ('{vectorMM}.matrixSum', '{vectorDCPM}.inputMatrix'),
+        ('{vectorDCPM}.outputTranslate', '{aimVP}.input1'),
+        (side_inputs[0], '{sideVP}.input1'),
+        (side_inputs[1], '{sideVP}.input2'),
+        (up_inputs[0], '{upVP}.input1'),
+        (up_inputs[1], '{upVP}.input2'),
+        ('{compiled4x4M}.output', '{compiledDCPM}.inputMatrix'),
+        ('{compiledDCPM}.outputRotate', '{target}.r'),
+    ]
+    for vector_key, axis in (('aimVP', aim_vector), ('upVP', up_vector), ('sideVP', side_vector)):
+        for column, output in enumerate(('outputX', 'outputY', 'outputZ')):
+            connections.append((
+                '{{{}}}.{}'.format(vector_key, output),
+                '{{compiled4x4M}}.in{}{}'.format(AXIS_INDEX[axis], column)))
+
+    template = node_builder.NodeGraphTemplate(
+        nodes=[
+            ('sourcePMM', 'PMM', '{source}_aimSource'),
+            ('sourceCMPM', 'CMPM', '{source}_aimSource'),
+            ('targetPMM', 'PMM', '{target}_aimTarget'),
+            ('targetCMPM', 'CMPM', '{target}_aimTarget'),
+            ('targetINVM', 'INVM', '{target}_aimTarget'),
+            ('vectorMM', 'MM', '{target}_aimVector'),
+            ('vectorDCPM', 'DCPM', '{target}_aimVector'),
+            ('aimVP', 'VP', '{target}_normalizedAimVector'),
+            ('upVP', 'VP', '{target}_upVector'),
+            ('sideVP', 'VP', '{target}_sideVector'),
+            ('compiled4x4M', '4x4M', '{target}_compiledVectors'),
+            ('compiledDCPM', 'DCPM', '{target}_compiledVectors'),
+        ],
+        inputs=['source', 'target', 'up'],
+        connections=connections,
+        values=[
+            ('{aimVP}.operation', 0),  # no operation
+            ('{aimVP}.normalizeOutput', 1),
+            ('{sideVP}.operation', 2),  # cross product
+            ('{sideVP}.normalizeOutput', 1),
+            ('{upVP}.operation', 2),  # cross product
+            ('{upVP}.normalizeOutput', 1),
+        ])
+    _aim_templates[(aim_vector, up_vector)] = template
+    return template
+
+
+def _get_aim_matrix_template(aim_vector, up_vector):
+    """
+    Same behaviour as the vector product network, collapsed onto an aimMatrix
+    node (Maya 2020+).
+    """
+    key = ('aimMatrix', aim_vector, up_vector)
+    if key in _aim_templates:
+        return _aim_templates[key]
+
+    if aim_vector == up_vector:
+        raise ValueError('Aim and up vectors must use different axes!')
+
+    template = node_builder.NodeGraphTemplate(
+        nodes=[
+            ('targetPMM', 'PMM', '{target}_aimTarget'),
+            ('targetCMPM', 'CMPM', '{target}_aimTarget'),
+            ('aimAIMM', 'AIMM', '{target}_aim'),
+            ('aimDCPM', 'DCPM', '{target}_aim'),
+        ],
+        inputs=['source', 'target', 'up'],
+        connections=[
+            ('{target}.t', '{targetPMM}.inPoint'),
+            ('{target}.parentMatrix[0]', '{targetPMM}.inMatrix'),
+            ('{targetPMM}.output', '{targetCMPM}.inputTranslate'),
+            ('{targetCMPM}.outputMatrix', '{aimAIMM}.inputMatrix'),
+            ('{source}.worldMatrix[0]', '{aimAIMM}.primaryTargetMatrix'),
+            ('{up}.t', '{aimAIMM}.secondaryTargetVector'),
+            ('{aimAIMM}.outputMatrix', '{aimDCPM}.inputMatrix'),
+            ('{aimDCPM}.outputRotate', '{target}.r'),
+        ],
+        values=[
+            ('{aimAIMM}.primaryInputAxis', AXIS_VECTOR[aim_vector]),
+            ('{aimAIMM}.secondaryInputAxis', AXIS_VECTOR[up_vector]),
+            ('{aimAIMM}.secondaryMode', 2),  # align
+        ])
+    _aim_templates[key] = template
+    return template
+
+
+def vector_aim_constraints(aim_setups, aim_vector='x', up_vector='y', use_aim_matrix=False):
+    """
+    Builds vector aim constraints for any number of source/target pairs in one
+    batched graph build.
+
+    Args:
+        aim_setups (list[tuple]): (source, target, up_position) for each
+            constraint.  up_position is either an existing node whose translate
+            gives the up vector, or 3 values for a new up vector null.
+        aim_vector (str): Target axis pointed at the source.
+        up_vector (str): Target axis aligned to the up vector.
+        use_aim_matrix (bool): Use a single aimMatrix node per constraint
+            instead of the vector product network.  Needs Maya 2020+.
+
+    Returns:
+        (list[dict]): Names of the created nodes for each constraint.
+
+    """
+    new_up_nulls = {}
+    for index, (source, target, up_position) in enumerate(aim_setups):
+        if isinstance(up_position, (list, tuple)):
+            if len(up_position) != 3:
+                raise IndexError('Incorrect number of position coordinates given! Must be 3 (xyz)')
+            new_up_nulls[index] = up_position
+        elif not isinstance(up_position, six.string_types):
+            raise Exception('Incorrect input given for parameter: up_position={}'.format(up_position))
+
+    up_nodes = [up_position for _, _, up_position in aim_setups]
+    if new_up_nulls:
+        indices = sorted(new_up_nulls)
+        up_nulls = utils.create_nulls(
+            ['{}_UPVEC'.format(aim_setups[index][1]) for index in indices],
+            matrices=[[1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0] + list(new_up_nulls[index]) + [1]
+                      for index in indices])
+        for index, up_null in zip(indices, up_nulls):
+            up_nodes[index] = up_null
+
+    if use_aim_matrix:
+        if node_builder.get_maya_api_version() < AIM_MATRIX_API_VERSION:
+            raise RuntimeError('aimMatrix nodes need Maya 2020 or newer!')
+        template = _get_aim_matrix_template(aim_vector, up_vector)
+    else:
+        template = _get_vector_aim_template(aim_vector, up_vector)
+
+    return template.build([
+        {'source': source, 'target': target, 'up': up_node}
+        for (source, target, _), up_node in zip(aim_setups, up_nodes)])
+
+
+def vector_aim_constraint(source, target, up_position, aim_vector='x', up_vector='y',
+                          use_aim_matrix=False):
+    return vector_aim_constraints([(source, target, up_position)],
+                                  aim_vector=aim_vector,
+                                  up_vector=up_vector,
+                                  use_aim_matrix=use_aim_matrix)[0]
+
+
+# First Maya version with offsetParentMatrix on every transform
+OFFSET_PARENT_MATRIX_API_VERSION = 20200000
+
+_MATRIX_PRODUCT_TEMPLATE = node_builder.NodeGraphTemplate(
+    nodes=[('product', 'MM', '{source}')],
+    inputs=['source', 'source_matrix', 'inverse'],
+    connections=[
+        ('{source_matrix}', '{product}.matrixIn[0]'),
+        ('{inverse}.worldInverseMatrix[0]', '{product}.matrixIn[1]'),
+    ])
+
+_DECOMPOSE_TEMPLATE = node_builder.NodeGraphTemplate(
+    nodes=[('decompose', 'DCPM', '{source}')],
+    inputs=['source', 'matrix'],
+    connections=[('{matrix}', '{decompose}.inputMatrix')])
+
+_pick_templates = {}
+
+
+def _get_pick_template(position, orientation, scale):
+    key = (bool(position), bool(orientation), bool(scale))
+    if key not in _pick_templates:
+        _pick_templates[key] = node_builder.NodeGraphTemplate(
+            nodes=[('pick', 'PKM', '{source}')],
+            inputs=['source', 'matrix'],
+            connections=[('{matrix}', '{pick}.inputMatrix')],
+            values=[
+                ('{pick}.useTranslate', key[0]),
+                ('{pick}.useRotate', key[1]),
+                ('{pick}.useScale', key[2]),
+                ('{pick}.useShear', key[2]),
+            ])
+    return _pick_templates[key]
+
+
+def _build_shared(template, keys, instance_builder):
+    """
+    Builds the template once per unique key and returns the created node names
+    keyed the same way.
+    """
+    keys = list(dict.fromkeys(keys))
+    return dict(zip(keys, template.build([instance_builder(key) for key in keys])))
+
+
+def matrix_constraints(constraints, position=True, orientation=True, scale=False,
+                       offset_parent_matrix=None):
+    """
+    Matrix constrains any number of targets in one batched build.  Targets that
+    share a source and inverse parent share one multMatrix, so a whole control
+    layer under the same group costs one product node per driver.
+
+    Where offsetParentMatrix is available the product drives it directly, with
+    a single pickMatrix per product when only some channels are constrained,
+    and no decompose node is made.  The constrained channels on the target are
+    zeroed so the offset parent matrix alone places it.  Otherwise one shared
+    decomposeMatrix per product drives translate, rotate and scale, and the
+    joint orient of rotation constrained joints is zeroed so the decomposed
+    rotation is not applied on top of it.
+
+    Args:
+        constraints (list[tuple]): (source, target) or (source, inverse, target)
+            for each constraint.  The source may be a node (its world matrix is
+            used) or a matrix plug.  The inverse parent defaults to the target's
+            parent, and None means world space (no multMatrix is needed).
+        position (bool): Constrain translation.
+        orientation (bool): Constrain rotation.
+        scale (bool): Constrain scale and shear.
+        offset_parent_matrix (bool): Force or disable the offsetParentMatrix
+            connection.  Defaults to using it when Maya supports it.
+
+    Returns:
+        (list[str]): The matrix plug driving each target.
+
+    """
+    if offset_parent_matrix is None:
+        offset_parent_matrix = (node_builder.get_maya_api_version()
+                                >= OFFSET_PARENT_MATRIX_API_VERSION)
+
+    setups = []
+    for constraint in constraints:
+        if len(constraint) == 2:
+            source, target = constraint
+            inverse = (cmds.listRelatives(target, parent=True) or [None])[0]
+        else:
+            source, inverse, target = constraint
+        source_matrix = source if '.' in source else source + '.worldMatrix[0]'
+        setups.append((source_matrix, inverse or None, target))
+
+    products = _build_shared(
+        _MATRIX_PRODUCT_TEMPLATE,
+        [(source_matrix, inverse) for source_matrix, inverse, _ in setups if inverse],
+        lambda key: {'source': key[0].split('.')[0],
+                     'source_matrix': key[0],
+                     'inverse': key[1]})
+
+    matrices = []
+    for source_matrix, inverse, _ in setups:
+        if inverse:
+            matrices.append(products[(source_matrix, inverse)]['product'] + '.matrixSum')
+        else:
+            matrices.append(source_matrix)
+
+    connections = []
+    reset_values = []
+    if offset_parent_matrix:
+        if not (position and orientation and scale):
+            picks = _build_shared(
+                _get_pick_template(position, orientation, scale),
+                matrices,
+                lambda matrix: {'source': matrix.split('.')[0], 'matrix': matrix})
+            matrices = [picks[matrix]['pick'] + '.outputMatrix' for matrix in matrices]
+
+        for matrix, (_, _, target) in zip(matrices, setups):
+            connections.append((matrix, target + '.offsetParentMatrix'))
+            if position:
+                reset_values.append((target + '.t', (0, 0, 0)))
+            if orientation:
+                reset_values.append((target + '.r', (0, 0, 0)))
+                if cmds.objectType(target, isAType='joint'):
+                    reset_values.append((target + '.jointOrient', (0, 0, 0)))
+            if scale:
+                reset_values.append((target + '.s', (1, 1, 1)))
+                reset_values.append((target + '.shear', (0, 0, 0)))
+    else:
+        decomposes = _build_shared(
+            _DECOMPOSE_TEMPLATE,
+            matrices,
+            lambda matrix: {'source': matrix.split('.')[0], 'matrix': matrix})
+
+        for matrix, (_, _, target) in zip(matrices, setups):
+            decompose = decomposes[matrix]['decompose']
+            if position:
+                connections.append((decompose + '.outputTranslate', target + '.t'))
+            if orientation:
+                connections.append((decompose + '.outputRotate', target + '.r'))
+                if cmds.objectType(target, isAType='joint'):
+                    reset_values.append((target + '.jointOrient', (0, 0, 0)))
+            if scale:
+                connections.append((decompose + '.outputScale', target + '.s'))
+
+    api.set_plug_values(reset_values)
+    api.connect_plugs(connections)
+    return matrices
 
 
 # Matrix stuff needs major field testing.  Try out at work
 def simple_matrix_constraint(target=None, source=None, position=True,
                              orientation=True, scale=False,
-                             maintain_offset=True):
+                             maintain_offset=True, offset_parent_matrix=False):
 
     if not target:
         try:
@@ -143,43 +569,23 @@ def simple_matrix_constraint(target=None, source=None, position=True,
         except Exception as err:
             raise err
 
-    decompose_node = node_builder.create_node(
-        node_key='DCPM',
-        name='{}_matrixSRT'.format(target))
-
     if maintain_offset:
-        cmds.connectAttr(source + '.matrix', decompose_node + '.inputMatrix')
-    else:
-        cmds.connectAttr(source + '.worldMatrix[0]', decompose_node + '.inputMatrix')
-
-    if position:
-        cmds.connectAttr(decompose_node + '.outputTranslate', target + '.t')
-    if orientation:
-        cmds.connectAttr(decompose_node + '.outputRotate', target + '.r')
-    if scale:
-        cmds.connectAttr(decompose_node + '.outputScale', target + '.s')
-
+        source = source + '.matrix'
 
-# Complete beta, no applicable testing, might be rewritten entirely
-def matrix_constraint(source, inverse, target, position=True, orientation=True, scale=False):
-    mult_matrix_node = node_builder.create_node(
-        node_key='MM',
-        name=source)
+    return matrix_constraints([(source, None, target)],
+                              position=position,
+                              orientation=orientation,
+                              scale=scale,
+                              offset_parent_matrix=offset_parent_matrix)[0]
 
-    decompose_node = node_builder.create_node(
-        node_key='DCPM',
-        name=source)
 
-    cmds.connectAttr(source + '.worldMatrix[0]', mult_matrix_node + '.matrixIn[0]', f=True)
-    cmds.connectAttr(inverse + '.worldInverseMatrix[0]', mult_matrix_node + '.matrixIn[1]', f=True)
-    cmds.connectAttr(mult_matrix_node + '.matrixSum', decompose_node + '.inputMatrix', f=True)
-
-    if position:
-        cmds.connectAttr(decompose_node + '.outputTranslate', target + '.t')
-    if orientation:
-        cmds.connectAttr(decompose_node + '.outputRotate', target + '.r')
-    if scale:
-        cmds.connectAttr(decompose_node + '.outputScale', target + '.s')
+def matrix_constraint(source, inverse, target, position=True, orientation=True, scale=False,
+                      offset_parent_matrix=False):
+    return matrix_constraints([(source, inverse, target)],
+                              position=position,
+                              orientation=orientation,
+                              scale=scale,
+                              offset_parent_matrix=offset_parent_matrix)[0]
 
 
 def get_index_from_component(component):
@@ -188,79 +594,262 @@ def get_index_from_component(component):
     return int(component.split('[')[-1][:-1])
 
 
-def create_rivet(input_edges, target=None, name=''):
+_EDGE_CURVE_TEMPLATE = node_builder.NodeGraphTemplate(
+    nodes=[('curve', 'CFME', '{mesh}_edge_{index}')],
+    inputs=['mesh', 'shape', 'index'],
+    connections=[('{shape}.worldMesh[0]', '{curve}.inputMesh')])
+
+_EDGE_LOFT_TEMPLATE = node_builder.NodeGraphTemplate(
+    nodes=[
+        ('loft', 'LOFT', '{mesh}_{name}_edgeLoft'),
+        ('point', 'POSI', '{mesh}_{name}_loftPoint'),
+    ],
+    inputs=['mesh', 'name', 'curve_a', 'curve_b'],
+    connections=[
+        ('{curve_a}.outputCurve', '{loft}.inputCurve[0]'),
+        ('{curve_b}.outputCurve', '{loft}.inputCurve[1]'),
+        ('{loft}.outputSurface', '{point}.inputSurface'),
+    ],
+    values=[
+        ('{point}.turnOnPercentage', 1),
+        ('{point}.parameterU', 0.5),
+        ('{point}.parameterV', 0.5),
+    ])
+
+_UV_PIN_TEMPLATE = node_builder.NodeGraphTemplate(
+    nodes=[('pin', 'UVP', '{mesh}_rivets')],
+    inputs=['mesh', 'shape'],
+    connections=[('{shape}.worldMesh[0]', '{pin}.deformedGeometry')])
+
+
+def _split_edge_pair(input_edges):
     if len(input_edges) != 2:
         raise IndexError('Incorrect edge count given: Must input 2 edges.')
 
-    name = name or 'rivet_01'
-
     name_check = [obj.split('.')[0] for obj in input_edges]
     if name_check[0] != name_check[1]:
         raise NameError('More than one object specified for rivet!')
-    full_name = name_check[0]
-    input_object = name_check[0].split(':')[-1]  # no namespaces
-
-    edge_loft = node_builder.create_node('loft', name='{obj}_{name}_edgeLoft'.format(
-        obj=input_object,
-        name=name))
-
-    i = 0
-    for edge in input_edges:
-        index = get_index_from_component(edge)
-        edge_node = node_builder.create_node(
-            'curveFromMeshEdge',
-            name='{obj}_edge_{id}'.format(obj=input_object, id=index))
-        cmds.connectAttr(edge_node + '.outputCurve', edge_loft + '.inputCurve[{:04}]'.format(i))
-        cmds.connectAttr(full_name + '.worldMesh[0]', edge_node + '.inputMesh')
-        cmds.setAttr(edge_node + '.edgeIndex[0]', index)
-        i += 1
-
-    rivet_posi = node_builder.create_node('POSI', name='{obj}_{name}_loftPoint'.format(
-        obj=input_object,
-        name=name))
-    cmds.setAttr(rivet_posi + '.turnOnPercentage', 1)
-    cmds.setAttr(rivet_posi + '.parameterU', 0.5)
-    cmds.setAttr(rivet_posi + '.parameterV', 0.5)
-    cmds.connectAttr(edge_loft + '.outputSurface', rivet_posi + '.inputSurface')
-    if not target:
-        target = cmds.spaceLocator(name=name + '_RIVET')[0]
-        curve_builder.set_control_color(rgb_input='yellow', input_object=target)
-    cmds.connectAttr(rivet_posi + '.result.position', target + '.t')
-
-
-def create_pv_guide(ik_base, ik_pivot, ik_end):
-    pass
-
-# def create_pv_guide(ik_base, ik_pivot, ik_end):
-#     # Naming Conventions
-#     parts = ik_base.split('_')
-#     component = parts[0]
-#     side = parts[1]
-#     # ik_joints = ensure_list(ik_joints)
-#     hierarchy_node = cmds.createNode('transform', name='{component}_{side}_PVsolver_GRP'.format(component=component, side=side))
-#
-#     start_to_end = cmds.spaceLocator(
-#         name='{component}_{side}_start2end_AIM'.format(component=component, side=side))
-#     aim_at_pole = cmds.spaceLocator(
-#         name='{component}_{side}_aimAtPole_AIM'.format(component=component, side=side))
-#
-#     cmds.parent(aim_at_pole, start_to_end)
-#     cmds.select(clear=True)
-#     pos_crv = curve_builder.add_curve_shape('arrow', shape_offset=(0, 90, 0), color='yellow')
-#     pos_arrow = cmds.listRelatives(pos_crv, parent=True)[0]
-#     pos_arrow = cmds.rename(pos_arrow, '{component}_{side}_defaultPV_POS'.format(component=component, side=side))
-#     cmds.parent(pos_arrow, aim_at_pole)
-#
-#     cmds.pointConstraint(ik_base, start_to_end, maintainOffset=False)
-#     cmds.aimConstraint(ik_end, start_to_end, maintainOffset=False, aimVector=[1, 0, 0], upVector=[0, 1, 0], worldUpType='vector')
-#     cmds.pointConstraint(ik_pivot, aim_at_pole, maintainOffset=False, skip=['y', 'z'])
-#     cmds.aimConstraint(ik_pivot, aim_at_pole, maintainOffset=False, aimVector=[1, 0, 0], upVector=[0, 1, 0], worldUpType='vector')
-#
-#     dist = nUtils.get_distance_between(ik_base, ik_end)
-#     norm_dist = dist / 2.0
-#     cmds.xform(pos_arrow, translation=[norm_dist, 0, 0], relative=True)
-#
-#     cmds.parent(start_to_end, hierarchy_node)
+    return name_check[0], tuple(sorted(get_index_from_component(edge) for edge in input_edges))
+
+
+def _get_edge_pair_uv(shape, edge_indices):
+    """
+    Returns the UV at the centre of two edges, the same point the loft rivet
+    samples at parameter 0.5, 0.5.
+    """
+    mesh_fn = om.MFnMesh(api.get_dag_path(shape))
+    centre = om.MVector()
+    for edge_index in edge_indices:
+        for vertex_index in mesh_fn.getEdgeVertices(edge_index):
+            centre += om.MVector(mesh_fn.getPoint(vertex_index, om.MSpace.kWorld))
+    u, v, _ = mesh_fn.getUVAtPoint(om.MPoint(centre / 4.0), om.MSpace.kWorld)
+    return u, v
+
+
+def create_rivets(edge_pairs, targets=None, names=None, use_uv_pin=False):
+    """
+    Creates any number of rivets in one batched build.  Every edge gets one
+    curveFromMeshEdge no matter how many rivets use it, every edge pair gets
+    one loft, and the mesh output only fans out once per edge.
+
+    With use_uv_pin the lofts are skipped entirely: each mesh gets a single
+    uvPin node per rivet parent with one coordinate per edge pair, driving
+    the rivet's offsetParentMatrix (Maya 2020+).  Each uvPin outputs in the
+    space of its rivets' parent, so moving the parent does not move them
+    twice.  The uvPin also carries the surface orientation, where the loft
+    rivet only drives translation.
+
+    Args:
+        edge_pairs (list[list[str]]): Two edges on the same mesh per rivet.
+        targets (list[str]): Existing node to rivet for each pair.  Entries that
+            are None get a new locator.
+        names (list[str]): Rivet names, used for new locators and loft nodes.
+        use_uv_pin (bool): Build uvPin rivets instead of lofts.
+
+    Returns:
+        (list[str]): The riveted node for each edge pair.
+
+    """
+    targets = list(targets or [None] * len(edge_pairs))
+    names = [name or 'rivet_{:02}'.format(index + 1) for index, name
+             in enumerate(names or [None] * len(edge_pairs))]
+    rivets = [_split_edge_pair(input_edges) for input_edges in edge_pairs]
+
+    shapes = dict(
+        (mesh, cmds.listRelatives(mesh, shapes=True, noIntermediate=True, fullPath=True)[0])
+        for mesh, _ in rivets)
+
+    for index, target in enumerate(targets):
+        if not target:
+            targets[index] = cmds.spaceLocator(name=names[index] + '_RIVET')[0]
+            curve_builder.set_control_color(rgb_input='yellow', input_object=targets[index])
+
+    connections = []
+    plug_values = []
+    if use_uv_pin:
+        if node_builder.get_maya_api_version() < OFFSET_PARENT_MATRIX_API_VERSION:
+            raise RuntimeError('uvPin rivets need Maya 2020 or newer!')
+
+        # Rivets under different parents need their own pin, as the output
+        # space is set per uvPin
+        pin_keys = [(mesh, (cmds.listRelatives(target, parent=True, fullPath=True) or [None])[0])
+                    for (mesh, _), target in zip(rivets, targets)]
+        pins = _build_shared(
+            _UV_PIN_TEMPLATE,
+            pin_keys,
+            lambda key: {'mesh': key[0].split(':')[-1], 'shape': shapes[key[0]]})
+        for (_, parent), nodes in pins.items():
+            if parent:
+                connections.append((parent + '.worldInverseMatrix[0]',
+                                    nodes['pin'] + '.relativeSpaceMatrix'))
+
+        coordinates = {}
+        coordinate_counts = dict.fromkeys(pins, 0)
+        for (mesh, edge_indices), target, pin_key in zip(rivets, targets, pin_keys):
+            pin = pins[pin_key]['pin']
+            if (pin_key, edge_indices) not in coordinates:
+                coordinate = coordinate_counts[pin_key]
+                coordinate_counts[pin_key] += 1
+                coordinates[(pin_key, edge_indices)] = coordinate
+                plug_values.append(('{}.coordinate[{}]'.format(pin, coordinate),
+                                    _get_edge_pair_uv(shapes[mesh], edge_indices)))
+            connections.append(('{}.outputMatrix[{}]'.format(pin, coordinates[(pin_key, edge_indices)]),
+                                target + '.offsetParentMatrix'))
+            plug_values.append((target + '.t', (0, 0, 0)))
+            plug_values.append((target + '.r', (0, 0, 0)))
+    else:
+        curves = _build_shared(
+            _EDGE_CURVE_TEMPLATE,
+            [(mesh, edge_index) for mesh, edge_indices in rivets for edge_index in edge_indices],
+            lambda key: {'mesh': key[0].split(':')[-1],  # no namespaces
+                         'shape': shapes[key[0]],
+                         'index': key[1]})
+        for (_, edge_index), nodes in curves.items():
+            plug_values.append((nodes['curve'] + '.edgeIndex[0]', edge_index))
+
+        rivet_names = dict(zip(reversed(rivets), reversed(names)))
+        lofts = _build_shared(
+            _EDGE_LOFT_TEMPLATE,
+            rivets,
+            lambda key: {'mesh': key[0].split(':')[-1],
+                         'name': rivet_names[key],
+                         'curve_a': curves[(key[0], key[1][0])]['curve'],
+                         'curve_b': curves[(key[0], key[1][1])]['curve']})
+        for rivet, target in zip(rivets, targets):
+            connections.append((lofts[rivet]['point'] + '.position', target + '.t'))
+
+    api.set_plug_values(plug_values)
+    api.connect_plugs(connections)
+    return targets
+
+
+def create_rivet(input_edges, target=None, name=''):
+    return create_rivets([input_edges], targets=[target], names=[name])[0]
+
+
+def get_world_positions(nodes):
+    """
+    Returns the world space translation of every node as an (n, 3) array.
+    """
+    return np.array([
+        om.MTransformationMatrix(api.get_dag_path(node).inclusiveMatrix()).translation(
+            om.MSpace.kWorld)
+        for node in nodes], dtype=np.float64).reshape(-1, 3)
+
+
+def get_pole_vector_matrices(positions, distance_scale=0.5):
+    """
+    Solves pole vector positions for any number of 3 joint chains.
+
+    The pole vector direction is the pivot's offset from its projection onto
+    the base to end line.  Guides sit that far out from the pivot, scaled by
+    the chain's base to end length.  Straight chains have no bend to read, so
+    they fall back to a direction perpendicular to the chain and world up.
+
+    Args:
+        positions (np.ndarray): (n, 3, 3) base, pivot and end world positions.
+        distance_scale (float): Guide distance from the pivot, as a fraction of
+            the base to end length.
+
+    Returns:
+        (np.ndarray): (n, 4, 4) guide world matrices, X pointing away from the
+            pivot and Y along the normal of the chain's plane.
+
+    """
+    base, pivot, end = positions[:, 0], positions[:, 1], positions[:, 2]
+    chain = end - base
+    length = np.linalg.norm(chain, axis=1)
+    chain_direction = chain / np.maximum(length, 1e-8)[:, None]
+
+    projection = base + chain_direction * np.einsum(
+        'ij,ij->i', pivot - base, chain_direction)[:, None]
+    pole = pivot - projection
+    pole_length = np.linalg.norm(pole, axis=1)
+
+    straight = pole_length < 1e-6 * np.maximum(length, 1.0)
+    if straight.any():
+        fallback = np.cross(chain_direction[straight], (0.0, 1.0, 0.0))
+        parallel = np.linalg.norm(fallback, axis=1) < 1e-6
+        fallback[parallel] = np.cross(chain_direction[straight][parallel], (1.0, 0.0, 0.0))
+        pole[straight] = fallback
+        pole_length[straight] = np.linalg.norm(fallback, axis=1)
+
+    x_axis = pole / pole_length[:, None]
+    y_axis = np.cross(chain_direction, x_axis)
+    y_axis /= np.maximum(np.linalg.norm(y_axis, axis=1), 1e-8)[:, None]
+    z_axis = np.cross(x_axis, y_axis)
+
+    matrices = np.zeros((len(positions), 4, 4))
+    matrices[:, 0, :3] = x_axis
+    matrices[:, 1, :3] = y_axis
+    matrices[:, 2, :3] = z_axis
+    matrices[:, 3, :3] = pivot + x_axis * (length * distance_scale)[:, None]
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def _pv_guide_name(ik_base):
+    parts = ik_base.split('|')[-1].split('_')
+    if len(parts) >= 2:
+        return '{component}_{side}_defaultPV'.format(component=parts[0], side=parts[1])
+    return '{}_defaultPV'.format(parts[0])
+
+
+def create_pv_guides(ik_chains, names=None, distance_scale=0.5):
+    """
+    Creates a pole vector guide for any number of 3 joint IK chains.  All joint
+    positions are read up front and solved together, then each guide is placed
+    with a single xform.  No helper nodes or constraints are made.
+
+    Args:
+        ik_chains (list[tuple]): (ik_base, ik_pivot, ik_end) joints per chain.
+        names (list[str]): Guide names, suffixed with _POS.  Defaults to
+            '{component}_{side}_defaultPV' from the base joint name.
+        distance_scale (float): Guide distance from the pivot, as a fraction of
+            the base to end length.
+
+    Returns:
+        (list[str]): The created guides.
+
+    """
+    if not ik_chains:
+        return []
+    positions = get_world_positions([joint for chain in ik_chains for joint in chain])
+    matrices = get_pole_vector_matrices(positions.reshape(-1, 3, 3), distance_scale)
+
+    names = names or [_pv_guide_name(chain[0]) for chain in ik_chains]
+    guides = utils.create_nulls(names, suffix='POS')
+    for guide, matrix in zip(guides, matrices):
+        curve_builder.add_curve_shape('arrow', transform_node=guide, color='yellow',
+                                      shape_offset=(0, 90, 0))
+        cmds.xform(guide, worldSpace=True, matrix=matrix.ravel().tolist())
+    return guides
+
+
+def create_pv_guide(ik_base, ik_pivot, ik_end, name=None, distance_scale=0.5):
+    return create_pv_guides([(ik_base, ik_pivot, ik_end)],
+                            names=[name] if name else None,
+                            distance_scale=distance_scale)[0]
 
 
 class RivetWidget(QtWidgets.QFrame):
@@ -411,10 +1000,15 @@ class ConstraintWidget(frame.MayaFrameWidget):
         self.rotate_checkbox.setChecked(True)
         self.scale_checkbox = QtWidgets.QCheckBox('Scale')
         self.scale_checkbox.setChecked(False)
+        self.offset_parent_checkbox = QtWidgets.QCheckBox('Offset Parent')
+        self.offset_parent_checkbox.setChecked(False)
+        self.offset_parent_checkbox.setToolTip(
+            'Drive offsetParentMatrix (Maya 2020+) instead of the SRT channels')
 
         srt_layout.addWidget(self.translate_checkbox)
         srt_layout.addWidget(self.rotate_checkbox)
         srt_layout.addWidget(self.scale_checkbox)
+        srt_layout.addWidget(self.offset_parent_checkbox)
         # srt_layout.addSpacerItem(
         #     QtWidgets.QSpacerItem(5, 5, QtWidgets.QSizePolicy.Expanding)
         # )
@@ -423,20 +1017,26 @@ class ConstraintWidget(frame.MayaFrameWidget):
         self.matrix_constrain_button.clicked.connect(self.matrix_constrain)
 
     def matrix_constrain(self):
-        t = self.translate_checkbox.checkState()
-        r = self.rotate_checkbox.checkState()
-        s = self.scale_checkbox.checkState()
-
-        source, inverse, target = cmds.ls(selection=True)
+        t = self.translate_checkbox.isChecked()
+        r = self.rotate_checkbox.isChecked()
+        s = self.scale_checkbox.isChecked()
+        offset_parent_matrix = (self.offset_parent_checkbox.isChecked()
+                                and node_builder.get_maya_api_version()
+                                >= OFFSET_PARENT_MATRIX_API_VERSION)
+
+        selection = cmds.ls(selection=True)
+        if len(selection) < 3:
+            self.popUpError(IndexError('Select a source, an inverse parent, then one or more targets!'))
+            return
+        source, inverse = selection[:2]
 
         with UndoBlock():
-            matrix_constraint(
-                source=source,
-                inverse=inverse,
-                target=target,
+            matrix_constraints(
+                [(source, inverse, target) for target in selection[2:]],
                 position=t,
                 orientation=r,
-                scale=s
+                scale=s,
+                offset_parent_matrix=offset_parent_matrix
             )
 
 
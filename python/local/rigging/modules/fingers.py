@@ -1,23 +1,340 @@
 """
-Deprecated auto rig file that probably DOES work, may be used as reference for future iterations
+Hand and finger rig module.  The hand is planned in pure Python by
+plans.plan_hand, and built here in bulk passes that work on any number of hands
+at once.
 """
 
 import pprint
 from string import ascii_uppercase
 
-from local.basic import curve_builder
+from local.basic import api
 from local.basic import attributes
+from local.basic import curve_builder
 from local.basic import node_builder
-from local.basic import utils
+from local.rigging.common import guides
+from local.rigging.common import utils as rig_utils
+from local.rigging.modules import plans
 
+import maya.api.OpenMaya as om
 import maya.cmds as cmds
 
+# Degrees between neighbouring fingers per unit of the hand's spread attribute
+SPREAD_ANGLE = 1.5
+
+_VECTOR_CHANNELS = ('X', 'Y', 'Z')
+_COLOR_CHANNELS = ('R', 'G', 'B')
+_driver_templates = {}
+
+
+def _chunks(items, size=3):
+    return [items[index:index + size] for index in range(0, len(items), size)]
+
+
+def get_driver_layout(plan):
+    """
+    Hands with the same layout share one driver graph template.
+    """
+    return plan.inverse, tuple((len(finger.driven), finger.is_thumb) for finger in plan.fingers)
+
+
+def get_driver_template(layout):
+    """
+    Returns the curl and spread driver graph of a hand layout.  Segments are
+    packed three to a node: one plusMinusAverage per three segments sums the
+    master rotation, the finger offset and the segment's own attribute over its
+    input3D channels, and a multiplyDivide flips the sums of an inverse hand.
+    The offset and spread of three fingers share one condition and two
+    multiplyDivide nodes.
+
+    Template inputs are 'prefix' (node name prefix), 'hand' (the hand
+    control), and 'attr{finger}_{segment}' (hand attribute plug) and
+    'srt{finger}_{segment}' (SRT node) for every driven segment.
+
+    Args:
+        layout (tuple): See get_driver_layout.
+
+    Returns:
+        (NodeGraphTemplate): The driver graph.
+
+    """
+    if layout in _driver_templates:
+        return _driver_templates[layout]
+
+    inverse, finger_layout = layout
+    nodes = []
+    connections = []
+    values = []
+    inputs = ['prefix', 'hand']
+
+    fingers = [index for index, (_, is_thumb) in enumerate(finger_layout) if not is_thumb]
+    center = (len(fingers) - 1) / 2.0
+    for group, chunk in enumerate(_chunks(fingers)):
+        condition = '{{offsetCondition{}}}'.format(group)
+        offset = '{{offset{}}}'.format(group)
+        spread = '{{spread{}}}'.format(group)
+        nodes.extend([('offsetCondition{}'.format(group), 'CND', '{{prefix}}_offset{}'.format(group)),
+                      ('offset{}'.format(group), 'MDIV', '{{prefix}}_offset{}'.format(group)),
+                      ('spread{}'.format(group), 'MDIV', '{{prefix}}_spread{}'.format(group))])
+        connections.extend([('{hand}.offsetFavor', condition + '.firstTerm'),
+                            (condition + '.outColor', offset + '.input2')])
+        values.extend([(condition + '.secondTerm', 0), (condition + '.operation', 1)])
+        for channel, finger in enumerate(chunk):
+            # Fingers curl from the outside in, favouring either edge
+            position = fingers.index(finger)
+            values.extend([
+                ('{}.colorIfTrue{}'.format(condition, _COLOR_CHANNELS[channel]), float(position)),
+                ('{}.colorIfFalse{}'.format(condition, _COLOR_CHANNELS[channel]),
+                 float(len(finger_layout) - 2 - position)),
+                ('{}.input2{}'.format(spread, _VECTOR_CHANNELS[channel]),
+                 (position - center) * SPREAD_ANGLE * inverse)])
+            connections.extend([
+                ('{hand}.offset', '{}.input1{}'.format(offset, _VECTOR_CHANNELS[channel])),
+                ('{hand}.spread', '{}.input1{}'.format(spread, _VECTOR_CHANNELS[channel]))])
+            if finger_layout[finger][0]:
+                connections.append(('{}.output{}'.format(spread, _VECTOR_CHANNELS[channel]),
+                                    '{{srt{}_0}}.ry'.format(finger)))
+
+    segments = [(finger, segment, is_thumb)
+                for finger, (count, is_thumb) in enumerate(finger_layout)
+                for segment in range(count)]
+    for group, chunk in enumerate(_chunks(segments)):
+        total = '{{curl{}}}'.format(group)
+        nodes.append(('curl{}'.format(group), 'PMA', '{{prefix}}_curl{}'.format(group)))
+        if inverse != 1:
+            flip = '{{curlInverse{}}}'.format(group)
+            nodes.append(('curlInverse{}'.format(group), 'MDIV',
+                          '{{prefix}}_curl{}_inverse'.format(group)))
+            connections.append((total + '.output3D', flip + '.input1'))
+        for channel, (finger, segment, is_thumb) in enumerate(chunk):
+            attr = 'attr{}_{}'.format(finger, segment)
+            srt = 'srt{}_{}'.format(finger, segment)
+            inputs.extend([attr, srt])
+            vector_channel = 'input3D{}'.format(_VECTOR_CHANNELS[channel].lower())
+            # The thumb is only driven by its own attributes
+            if not is_thumb:
+                offset_group, offset_channel = divmod(fingers.index(finger), 3)
+                connections.extend([
+                    ('{hand}.masterRotation',
+                     '{}.input3D[0].{}'.format(total, vector_channel)),
+                    ('{{offset{}}}.output{}'.format(offset_group, _VECTOR_CHANNELS[offset_channel]),
+                     '{}.input3D[1].{}'.format(total, vector_channel))])
+            connections.append(('{%s}' % attr, '{}.input3D[2].{}'.format(total, vector_channel)))
+            if inverse != 1:
+                values.append(('{}.input2{}'.format(flip, _VECTOR_CHANNELS[channel]),
+                               float(inverse)))
+                connections.append(('{}.output{}'.format(flip, _VECTOR_CHANNELS[channel]),
+                                    '{%s}.rz' % srt))
+            else:
+                connections.append(('{}.output3D{}'.format(total, _VECTOR_CHANNELS[channel].lower()),
+                                    '{%s}.rz' % srt))
+
+    template = node_builder.NodeGraphTemplate(nodes=nodes, inputs=sorted(set(inputs)),
+                                              connections=connections, values=values)
+    _driver_templates[layout] = template
+    return template
+
+
+def _to_radians(rotation):
+    # Angle plugs set through the API take radians
+    return tuple(om.MAngle(value, om.MAngle.kDegrees).asRadians() for value in rotation)
+
+
+def _create_transforms(node_type, names, parents):
+    """
+    Creates nodes whose parents may be other nodes of the same call (by name)
+    or existing nodes, in one modifier pass.
+    """
+    index = dict((name, i) for i, name in enumerate(names))
+    return api.create_dag_nodes(
+        node_type, names, parents=[index.get(parent, parent) for parent in parents])
+
+
+def guide_names(plan):
+    return [plan.hand_locator.name] + [locator.name for locator in plan.locators]
+
+
+def create_hand_locators(hand_plans):
+    """
+    Creates the guide locators of every hand in one pass.
+    """
+    plug_values = []
+    for plan in hand_plans:
+        plug_values.append((plan.hand_locator.name + '.overrideEnabled', 1))
+        plug_values.append((plan.hand_locator.name + '.overrideColor', 13))
+    guides.create_guides([transform for plan in hand_plans
+                          for transform in (plan.hand_locator,) + plan.locators],
+                         plug_values=plug_values)
+    return [plan.hand_locator.name for plan in hand_plans]
+
+
+def snapshot_hand_guides(hand_plans):
+    """
+    Reads the guide locators of every hand that has them in the scene.
+
+    Returns:
+        (GuideLayout): The guide world matrices.
+
+    """
+    names = [name for plan in hand_plans if cmds.objExists(plan.hand_locator.name)
+             for name in guide_names(plan)]
+    return guides.snapshot_guides(names, module='hand')
+
+
+def create_hand_joints(hand_plans, from_guides=True, guide_layout=None):
+    """
+    Creates the joints of every hand in one pass.
+
+    Args:
+        hand_plans (list[HandPlan]): Hands to build.
+        from_guides (bool): Solve the joints from the guide locators in the
+            scene, if they exist, rather than the planned guide layout.
+        guide_layout (GuideLayout): Solve the joints from a saved guide layout
+            instead, with no guides needed in the scene.
+
+    Returns:
+        (list[HandPlan]): The plans, updated to the guides that were used.
+
+    """
+    if guide_layout is None and from_guides:
+        guide_layout = snapshot_hand_guides(hand_plans)
+    if guide_layout is not None:
+        hand_plans = [plans.replan_hand_from_guides(plan, guide_layout.to_dict(guide_names(plan)))
+                      if plan.hand_locator.name in guide_layout else plan
+                      for plan in hand_plans]
+
+    joints = [joint for plan in hand_plans for joint in (plan.hand_joint,) + plan.joints]
+    _create_transforms('joint', [joint.name for joint in joints],
+                       [joint.parent for joint in joints])
+
+    plug_values = []
+    for joint in joints:
+        plug_values.append((joint.name + '.t', joint.translate))
+        plug_values.append((joint.name + '.jointOrient', _to_radians(joint.joint_orient)))
+    api.set_plug_values(plug_values)
+    return hand_plans
+
+
+def create_hand_controls(hand_plans):
+    """
+    Creates the finger offsets and controls and the hand control of every hand.
+    Transforms are created and placed in bulk; only the control shapes and
+    attributes are added one by one.
+    """
+    names = []
+    parents = []
+    matrices = []
+    for plan in hand_plans:
+        names.append(plan.hand_control.ctl)
+        parents.append(None)
+        matrices.append(plans.flatten_matrix(plan.hand_control.matrix))
+        for control in plan.controls:
+            names.extend([control.ofs, control.srt])
+            parents.extend([control.parent, control.ofs])
+            matrices.extend([plans.flatten_matrix(control.matrix), None])
+            if control.ctl:
+                names.append(control.ctl)
+                parents.append(control.srt)
+                matrices.append(None)
+
+    mobjects = _create_transforms('transform', names, parents)
+    api.set_world_matrices(mobjects, matrices)
+
+    for plan in hand_plans:
+        finger_controls = [control.ctl for control in plan.controls if control.ctl]
+        for finger_control in finger_controls:
+            curve_builder.add_curve_shape(shape_choice=plan.shape_type,
+                                          transform_node=finger_control)
+        if plan.limit_attrs and finger_controls:
+            attributes.lock_hide(1, 1, 1, 0, 0, 0, 1, 1, 1, 1, objects=finger_controls)
+
+        hand_control = plan.hand_control.ctl
+        curve_builder.add_curve_shape(shape_choice=plan.hand_shape, transform_node=hand_control)
+        attributes.lock_hide(1, 1, 1, 1, 1, 1, 1, 1, 1, 1, objects=[hand_control])
+        for attr in plan.attributes:
+            options = dict(attr.options)
+            if 'enum_names' in options:
+                options['enum_names'] = list(options['enum_names'])
+            attributes.create_attr(attribute_name=attr.name,
+                                   attribute_type=attr.type,
+                                   input_object=hand_control,
+                                   **options)
+
+    return [plan.hand_control.ctl for plan in hand_plans]
+
+
+def build_hand_drivers(hand_plans):
+    """
+    Builds the hand control's curl, offset and spread drivers for every hand.
+    Hands that share a layout are built from one driver template in a single
+    pass.
+    """
+    layouts = {}
+    for plan in hand_plans:
+        instance = {'prefix': 'Hand_' + plan.side, 'hand': plan.hand_control.ctl}
+        for finger_index, finger in enumerate(plan.fingers):
+            for segment_index, segment in enumerate(finger.driven):
+                instance['attr{}_{}'.format(finger_index, segment_index)] = '{}.{}'.format(
+                    plan.hand_control.ctl, '_'.join(segment.split('_')[2:]))
+                instance['srt{}_{}'.format(finger_index, segment_index)] = segment + '_SRT'
+        layouts.setdefault(get_driver_layout(plan), []).append(instance)
+
+    for layout, instances in layouts.items():
+        get_driver_template(layout).build(instances)
+
+
+def connect_hands(hand_plans):
+    """
+    Constrains the finger joints to their controls, connects the finger
+    visibility switches and builds the finger drivers for every hand.  The
+    constraint zeroes the bones' joint orients, so the control alone sets their
+    rotation whether it drives offsetParentMatrix or, before Maya 2020, the
+    rotate channels.
+    """
+    constraints = []
+    connections = []
+    for plan in hand_plans:
+        hand = plan.hand_control.ctl
+        first_offsets = dict((control.segment.rpartition('_')[0], control.ofs)
+                             for control in reversed(plan.controls))
+        for finger in plan.fingers:
+            connections.append(('{}.{}_Vis'.format(hand, finger.label),
+                                first_offsets[finger.key] + '.v'))
+            constraints.extend((segment + '_CTL', segment + '_BONE') for segment in finger.driven)
+
+    api.connect_plugs(connections)
+    rig_utils.matrix_constraints(constraints)
+    build_hand_drivers(hand_plans)
+
+
+def build_hands(hand_plans, from_guides=False, guide_layout=None):
+    """
+    Builds any number of hands, each step running once over every hand.
+
+    Args:
+        hand_plans (list[HandPlan]): Hands to build, see plans.plan_hand.
+        from_guides (bool): Solve joints from guide locators already placed in
+            the scene instead of creating the planned guides.
+        guide_layout (GuideLayout): Solve joints from a saved guide layout, see
+            guides.GuideLayout.load.  No guide locators are created.
+
+    Returns:
+        (list[HandPlan]): The plans as built.
+
+    """
+    if not from_guides and guide_layout is None:
+        create_hand_locators(hand_plans)
+    hand_plans = create_hand_joints(hand_plans, from_guides=from_guides,
+                                    guide_layout=guide_layout)
+    create_hand_controls(hand_plans)
+    connect_hands(hand_plans)
+    return hand_plans
+
 
 class HandModule(object):
     """
-    Builds a dictionary (library) of all the parts of the hand/fingers based on
-    the inputs to suit individualized characters not limited to human hand
-    features.
+    Builds a plan of all the parts of the hand/fingers based on the inputs to
+    suit individualized characters not limited to human hand features, and
+    builds it in steps so the guides can be placed before the joints are made.
 
     Args:
         finger_count (int): The number of fingers being created, thumb excluded.
@@ -26,8 +343,9 @@ class HandModule(object):
         side (str): Body orientation of the fingers.
             'L/M/R' are appropriate inputs.
 
-    Returns:
-        self.fingers_dict (dictionary): Dictionary with each finger as a key, giving
+    Attributes:
+        plan (HandPlan): The hand plan, see plans.plan_hand.
+        fingers_dict (dictionary): Dictionary with each finger as a key, giving
             a list for the segments of the given finger key.
 
     """
@@ -35,11 +353,6 @@ class HandModule(object):
     # Letters for finger enumeration
     LETTERS_INDEX = {index: letter for index, letter in
                      enumerate(ascii_uppercase, start=1)}
-    # Dictionary variable, used for all callbacks and built with first function
-    fingers_dict = {}
-
-    hand_control = ''
-    hand_parent = ''
 
     def __init__(self, side, finger_count, segment_count, thumb=True, **kwargs):
         self.side = side
@@ -52,7 +365,16 @@ class HandModule(object):
         self.metacarpus = kwargs.get('metacarpus', False)
         self.inverse = -1 if kwargs.get('inverse', False) else 1
 
-        self.build_finger_library()
+        self.hand_control = ''
+        self.hand_parent = ''
+        self.plan = plans.plan_hand(side, finger_count, segment_count,
+                                    thumb=thumb,
+                                    metacarpus=self.metacarpus,
+                                    inverse=self.inverse == -1,
+                                    shape_type=self.shape_type,
+                                    hand_shape=self.hand_shape,
+                                    limit_attrs=self.limit_attrs)
+        self.fingers_dict = self.build_finger_library()
 
     def __str__(self):
         flattened_dict = pprint.pformat(self.fingers_dict)
@@ -71,316 +393,37 @@ class HandModule(object):
         pass
 
     def build_finger_library(self):
-
-        metacarpus = 1 if self.metacarpus else 0
-
-        for finger in range(self.finger_count):
-            finger = finger + 1
-            finger_letter = self.LETTERS_INDEX[finger]
-            finger_key = 'Hand_{side}_finger{index}'.format(side=self.side, index=finger_letter)
-            finger_segment_list = []
-            for segment in range(self.segment_count + 1 + metacarpus):
-                if segment >= (self.segment_count + metacarpus):
-                    segment = 'END'
-                else:
-                    segment = '{:02}'.format(segment + 1 - metacarpus)
-
-                finger_segment_list.append('Hand_{side}_finger{index}_{segment}'.format(
-                                           side=self.side,
-                                           index=finger_letter,
-                                           segment=segment))
-            self.fingers_dict[finger_key] = finger_segment_list
-
-        if self.thumb:
-            thumb_segment_list = []
-            thumb_key = 'Hand_{}_thumb'.format(self.side)
-            for segment in range(self.segment_count + 1):
-                if segment >= self.segment_count:
-                    segment = 'END'
-                else:
-                    segment = '{:02}'.format(segment + 1)
-
-                thumb_segment_list.append('Hand_%s_thumb_%s'
-                                          % (self.side, segment))
-            self.fingers_dict[thumb_key] = thumb_segment_list
-
-        return self.fingers_dict
+        return dict((finger.key, list(finger.segments)) for finger in self.plan.fingers)
 
     def create_finger_locators(self):
         """
         Creates the locators for the finger position alignments.
         """
-        self.hand_parent = cmds.spaceLocator(name='Hand_{side}_handBase_POS'.format(side=self.side))[0]
-        for finger, segments in self.fingers_dict.items():
-            for segment in segments:
-                cmds.spaceLocator(name='{segment}_POS'.format(side=self.side, segment=segment))
-            # Parenting logic
-            for loc in range(len(segments)):
-                if loc == (len(segments) - 1):
-                    cmds.parent(segments[0] + '_POS', self.hand_parent)
-                else:
-                    cmds.parent(segments[loc + 1] + '_POS',
-                                segments[loc] + '_POS')
-
-        cmds.setAttr(self.hand_parent + '.overrideEnabled', 1)
-        cmds.setAttr(self.hand_parent + '.overrideColor', 13)
-
-        i = (len(self.fingers_dict) / 2) - 1
-        for key in sorted(self.fingers_dict.keys()):
-            for segment in self.fingers_dict[key]:
-                cmds.move(1, 0, 0, segment + '_POS', relative=True)
-            cmds.move(1, 0, i, self.fingers_dict[key][0] + '_POS', relative=True)
-            if 'thumb' in key:
-                cmds.rotate(0, -45, 0, self.fingers_dict[key][0] + '_POS', relative=True)
-                cmds.move(-1, 0, len(self.fingers_dict), self.fingers_dict[key][0] + '_POS',
-                          relative=True)
-            i -= 1
-
-    def create_finger_joints(self):
+        self.hand_parent = create_hand_locators([self.plan])[0]
+
+    def save_guides(self, filepath):
+        """
+        Saves the placed finger locators to a guide file.
+        """
+        return snapshot_hand_guides([self.plan]).save(filepath)
+
+    def create_finger_joints(self, guide_file=None):
         """
-        Creates the joints for the finger.
+        Creates the joints for the finger from the placed locators, or from a
+        saved guide file.
         """
-        finger_start_list = []
-        cmds.select(clear=True)
-        hand_joint = cmds.joint(name='Hand_{}_handBase_BONE'.format(self.side))
-        utils.match_transformations(source=self.hand_parent, target=hand_joint)
-        cmds.xform(self.hand_parent, query=True, rotation=True, relative=True)
-        hand_orientation = [val for val in cmds.xform(self.hand_parent, query=True, rotation=True, relative=True)]
-        cmds.setAttr(hand_joint + '.r', 0, 0, 0)
-        cmds.setAttr(hand_joint + '.jointOrient', hand_orientation[0], hand_orientation[1] * self.inverse, hand_orientation[2] * self.inverse)
-        for _, segments in sorted(self.fingers_dict.items()):
-            cmds.select(clear=True)
-            for segment in segments:
-                print(segment)
-                locator_position = cmds.getAttr(segment + '_POS.worldPosition[0]')[0]
-                finger_joint = cmds.joint(name=segment + '_BONE',
-                                          position=[locator_position[0],
-                                                    locator_position[1],
-                                                    locator_position[2]])
-                if 'thumb_01' in segment or segment.endswith('00'):
-                    print('adding {} to finger_start_list'.format(finger_joint))
-                    finger_start_list.append(finger_joint)
-
-        cmds.parent(finger_start_list, hand_joint)
-
-        for _, segments in sorted(self.fingers_dict.items()):
-            for segment in segments:
-                locator_reference = segment + '_POS'
-                joint_reference = segment + '_BONE'
-                locator_position = cmds.getAttr(locator_reference
-                                                + '.worldPosition[0]')[0]
-                locator_rotations = cmds.getAttr(locator_reference + '.r')[0]
-                cmds.setAttr(joint_reference + '.jointOrientX',
-                             locator_rotations[0])
-                cmds.setAttr(joint_reference + '.jointOrientY',
-                             locator_rotations[1] * self.inverse)
-                cmds.setAttr(joint_reference + '.jointOrientZ',
-                             locator_rotations[2] * self.inverse)
-                cmds.joint(joint_reference,
-                           edit=True,
-                           position=[locator_position[0],
-                                     locator_position[1],
-                                     locator_position[2]])
+        guide_layout = guides.GuideLayout.load(guide_file) if guide_file else None
+        self.plan = create_hand_joints([self.plan], guide_layout=guide_layout)[0]
 
     def create_finger_controls(self):
         """
         Creates controls for the joints of the finger.
         """
-        attr_names = []
-
-        for key, segments in sorted(self.fingers_dict.items()):
-            # Declaring the parent variable before it gets continually reassigned
-            parent_curve = None
-            for segment in segments:
-                if segment.endswith('END'):
-                    continue
-                elif segment.endswith('00'):
-                    finger_ctrl = None
-                    finger_srt = cmds.group(empty=True, n=segment + '_SRT')
-                    finger_ofs = cmds.group(finger_srt, n=segment + '_OFS')
-                    segment_position = cmds.xform(segment + '_BONE',
-                                                  query=True,
-                                                  translation=True,
-                                                  worldSpace=True)
-                    segment_orientation = cmds.xform(segment + '_BONE',
-                                                     query=True,
-                                                     rotation=True,
-                                                     worldSpace=True)
-                    cmds.setAttr(finger_ofs + '.t', segment_position[0], segment_position[1], segment_position[2])
-                    cmds.setAttr(finger_ofs + '.r', segment_orientation[0], segment_orientation[1], segment_orientation[2])
-
-                else:
-                    # Convert to basicTools.create_offset() or .create_hierarchy()
-                    finger_ctrl = cmds.group(empty=True, n=segment + '_CTL')
-                    curve_builder.add_curve_shape(shape_choice=self.shape_type,
-                                        transform_node=finger_ctrl)
-                    finger_srt = cmds.group(finger_ctrl, n=segment + '_SRT')
-                    # if offset:
-                    #     finger_ofs = cmds.group(finger_srt, n=segment + '_OFS')
-                    #     finger_zero = cmds.group(finger_ofs, n=segment + '_ZERO')
-                    # else:
-                    if True:  # Rewrite nicer later
-                        finger_ofs = cmds.group(finger_srt, n=segment + '_OFS')
-                    segment_position = cmds.xform(segment + '_BONE',
-                                                  query=True,
-                                                  translation=True,
-                                                  worldSpace=True)
-                    segment_orientation = cmds.xform(segment + '_BONE',
-                                                     query=True,
-                                                     rotation=True,
-                                                     worldSpace=True)
-                    cmds.setAttr(finger_ofs + '.t', segment_position[0], segment_position[1], segment_position[2])
-                    cmds.setAttr(finger_ofs + '.r', segment_orientation[0], segment_orientation[1], segment_orientation[2])
-
-                # If the control group is not the base of the finger, parent
-                if '00' not in segment:
-                    if parent_curve:
-                        cmds.parent(finger_ofs, parent_curve)
-                    # Lock unnecessary attributes if assigned
-                    if self.limit_attrs:
-                        attributes.lock_hide(1, 1, 1, 0, 0, 0, 1, 1, 1, 1,
-                                       objects=[finger_ctrl])
-                parent_curve = finger_ctrl or finger_srt  # if '00' joint
-
-                if not segment.endswith(('END', '00')):
-                    attr_name = '_'.join(segment.split('_')[2:])
-                    attr_names.append(attr_name)
-
-            # Must be repeated later to avoid overcorrecting the looping list
-            for segment in segments:
-                if segment.endswith('00'):
-                    segments.remove(segment)
-                    self.fingers_dict[key] = segments
-                    break
-
-        hand_control = cmds.group(empty=True, name='Hand_{side}_handBase_CTL'.format(side=self.side))
-        curve_builder.add_curve_shape(
-            shape_choice=self.hand_shape,
-            transform_node=hand_control)
-        hand_position = cmds.xform(
-            hand_control.replace('CTL', 'BONE'),
-            query=True,
-            translation=True,
-            worldSpace=True)
-        hand_orientation = cmds.xform(
-            hand_control.replace('CTL', 'BONE'),
-            query=True,
-            rotation=True,
-            worldSpace=True)
-
-        cmds.setAttr(hand_control + '.t', hand_position[0], hand_position[1], hand_position[2])
-        cmds.setAttr(hand_control + '.r', hand_orientation[0], hand_orientation[1], hand_orientation[2])
-
-        attributes.lock_hide(1, 1, 1, 1, 1, 1, 1, 1, 1, 1,
-                       objects=[hand_control])
-
-        attributes.create_attr(
-            attribute_name='IKFK',
-            attribute_type='double',
-            input_object=hand_control,
-            min_value=0, max_value=1, default_value=1)
-        attributes.create_attr(
-            attribute_name='spread',
-            attribute_type='double',
-            input_object=hand_control,
-            min_value=-10, max_value=10)
-        attributes.create_attr(
-            attribute_name='masterRotation',
-            attribute_type='double',
-            input_object=hand_control)
-        attributes.create_attr(
-            attribute_name='offset',
-            attribute_type='double',
-            input_object=hand_control)
-        attributes.create_attr(
-            attribute_name='offsetFavor',
-            attribute_type='enum',
-            input_object=hand_control, default_value=1,
-            enum_names=['Inner', 'Outer'])
-
-        for attribute in sorted(attr_names):
-            attributes.create_attr(
-                attribute_name=attribute,
-                attribute_type='double',
-                input_object=hand_control)
-
-        for key in sorted(self.fingers_dict.keys()):
-            vis_attribute = key.split('_')[-1] + '_Vis'
-            attributes.create_attr(
-                attribute_name=vis_attribute,
-                attribute_type='bool',
-                input_object=hand_control, default_value=1)
-
-        self.hand_control = hand_control
+        self.hand_control = create_hand_controls([self.plan])[0]
 
     def connect_fingers(self):
         """
         Creates necessary connections for the fingers, and applies them to the hand
         control if applicable.
         """
-        # Declaring early repeating factors
-        offset_attr_factor = 0
-        reverse_attr_factor = len(self.fingers_dict) - 2  # accounts for no thumb offset
-        finger_srt_mult = None
-
-        for finger, segments in sorted(self.fingers_dict.items()):
-            print(finger, segments)
-            # Building the node network
-            if self.hand_control:
-                # Visibility connections
-                cmds.connectAttr('%s.%s_Vis' % (self.hand_control, finger.split('_')[-1]),
-                                 finger + '_01_OFS.v')
-                # Remove the thumb from the automations
-                if 'thumb' not in finger:
-                    finger_srt_mult = node_builder.create_node('MDIV')
-                    finger_srt_cnd = node_builder.create_node('CND')
-                    # finger_srt_mult = node_builder.create_node('MDIV', name=finger)
-                    # finger_srt_cnd = node_builder.create_node('CND', name=finger)
-
-                    cmds.setAttr(finger_srt_cnd + '.colorIfFalseR',
-                                 reverse_attr_factor)
-                    cmds.setAttr(finger_srt_cnd + '.colorIfTrueR',
-                                 offset_attr_factor)
-                    cmds.setAttr(finger_srt_cnd + '.secondTerm', 0)
-                    cmds.setAttr(finger_srt_cnd + '.operation', 1)
-
-                    cmds.connectAttr(finger_srt_cnd + '.outColorR',
-                                     finger_srt_mult + '.input2X')
-                    cmds.connectAttr(self.hand_control + '.offsetFavor',
-                                     finger_srt_cnd + '.firstTerm')
-                    cmds.connectAttr(self.hand_control + '.offset',
-                                     finger_srt_mult + '.input1X')
-
-            # Creating the initial segment constraints
-            for segment in segments:
-                if 'END' in segment:
-                    continue
-                ctrl = segment + '_CTL'
-                bone = segment + '_BONE'
-                cmds.parentConstraint(ctrl, bone, mo=True)
-
-                # Building the SRT values network, if applicable
-                if self.hand_control:
-                    finger_attr = '_'.join(segment.split('_')[2:])
-                    finger_srt_sum = node_builder.create_node('PMA', name=segment)
-                    finger_inverse_mdl = node_builder.create_node('MDL', name=segment + '_inverse')
-                    cmds.setAttr(finger_inverse_mdl + '.input2', self.inverse)
-                    if 'thumb' in segment:
-                        cmds.connectAttr(self.hand_control + '.' + finger_attr,
-                                         finger_inverse_mdl + '.input1')
-                        cmds.connectAttr(finger_inverse_mdl + '.output',
-                                         segment + '_SRT.rz')
-                    else:
-                        cmds.connectAttr(self.hand_control + '.masterRotation',
-                                         finger_srt_sum + '.input1D[0]')
-                        cmds.connectAttr(finger_srt_mult + '.outputX',
-                                         finger_srt_sum + '.input1D[1]')
-                        cmds.connectAttr(self.hand_control + '.' + finger_attr,
-                                         finger_srt_sum + '.input1D[2]')
-                        cmds.connectAttr(finger_srt_sum + '.output1D',
-                                         finger_inverse_mdl + '.input1')
-                        cmds.connectAttr(finger_inverse_mdl + '.output',
-                                         segment + '_SRT.rz')
-
-            offset_attr_factor = offset_attr_factor + 1
-            reverse_attr_factor = reverse_attr_factor - 1
+        connect_hands([self.plan])
@@ -1,391 +1,345 @@
 """
-Deprecated auto rig file that probably doesn't work
+Reverse foot rig module.  The foot is planned in pure Python by plans.plan_foot,
+and built here in bulk passes that work on any number of feet at once: guides,
+the bank and reverse pivot chain, foot bones and toes, controls, then the roll
+and bank network.  Nothing is kept between steps but the plans themselves.
+
+Example:
+    foot_plans = [plans.plan_foot('L', toes=True), plans.plan_foot('R', toes=True)]
+    create_foot_locators(foot_plans)
+    # ... place the guides ...
+    foot_plans = build_feet(foot_plans, from_guides=True)
 """
 
-from string import ascii_uppercase
-
-from local.basic import curve_builder
+from local.basic import api
 from local.basic import attributes
+from local.basic import curve_builder
 from local.basic import node_builder
-from local.basic import utils
+from local.rigging.common import guides
+from local.rigging.common import utils as rig_utils
+from local.rigging.modules import plans
 
+import maya.api.OpenMaya as om
 import maya.cmds as cmds
 
-reverse_foot_parts = ['bank_out', 'bank_in', 'heel', 'toe', 'ball', 'ankle']
-toe_library = []
-
-default_vals = [
-    [2, 0, 0], [-2, 0, 0], [0, 0, -4], [0, 0, 5], [0, 1, 2], [0, 5, -3]
-]
-
-LETTERS_INDEX = {index: letter for index, letter in
-                 enumerate(ascii_uppercase, start=1)}
-
-ROTATE_ORDER = {
-    'xyz': 0,
-    'yzx': 1,
-    'zxy': 2,
-    'xzy': 3,
-    'yxz': 4,
-    'zyx': 5
-}
-
-foot_attribute_dict = {
-    'secondaryVisibility': ['bool', None, None, 0, False, None],
-    'reverseControlVisibility': ['bool', None, None, 0, False, None],
-    'toeBend': ['double', None, None, 0, True, None],
-    'ballRoll': ['double', None, None, 0, True, None],
-    'toeRoll': ['double', None, None, 0, True, None],
-    'heelRoll': ['double', None, None, 0, True, None],
-    'ballSwivel': ['double', None, None, 0, True, None],
-    'toeSwivel': ['double', None, None, 0, True, None],
-    'heelSwivel': ['double', None, None, 0, True, None],
-    'footBank': ['double', None, None, 0, True, None],
-    'twistOffset': ['double', None, None, 0, True, None],
-    'upperLengthOffset': ['double', None, None, 0, True, None],
-    'lowerLengthOffset': ['double', None, None, 0, True, None]
-}
-# For calling and filling if toes are created
-
-# List of keys to keep correct order when calling back later
-foot_attribute_keys = [
-    'secondaryVisibility', 'reverseControlVisibility', 'toeBend', 'ballRoll',
-    'toeRoll', 'heelRoll', 'ballSwivel', 'toeSwivel', 'heelSwivel', 'footBank',
-    'twistOffset', 'upperLengthOffset', 'lowerLengthOffset'
-]
-
-reverse_jnt_list = []
-
-temp_item_list = []
-
-toes_dict = {}
-
-
-def build_toe_library(toe_count=5, segment_count=1, prefix='C'):
-    for toe in range(toe_count):
-        toe_letter = LETTERS_INDEX[toe + 1]
-        toe_key = '%s_toe%s' % (prefix, toe_letter)
-        toe_segment_list = []
-        for segment in range(segment_count + 1):
-            if segment >= segment_count:
-                segment = 'END'
-            else:
-                segment = str(segment + 1).zfill(2)
-
-            toe_segment_list.append('%s_toe%s_%s'
-                                    % (prefix, toe_letter, segment))
-        toes_dict[toe_key] = toe_segment_list
-
-    return toes_dict
-
-
-def create_foot_locators(prefix='C', toes=False, toe_count=5,
-                         toe_segments=1):
-    rev_orient = None
-    parent_joint = None
-    toe_temp_parent = None
-    i = 0
-    for part in reverse_foot_parts:
-        if 'bank' in part:
-            bank_loc = cmds.spaceLocator(name='%s_%s_rev_LOC' % (prefix, part))
-            cmds.setAttr(bank_loc[0] + '.localScaleZ', 5)
-            attributes.lock_hide(0, 0, 0, 1, 0, 1, 1, 1, 1, 1,
-                                 objects=[bank_loc[0]])
-            cmds.move(default_vals[i][0], default_vals[i][1], default_vals[i][2])
-        else:
-            cmds.select(clear=True)
-            rev_joint = cmds.joint(name='%s_%s_rev_JNT' % (prefix, part))
-            if rev_orient:
-                cmds.aimConstraint(rev_joint, rev_orient, mo=True,
-                                   worldUpType='scene')
-            if part == 'ball':
-                toe_temp_parent = rev_joint
-            rev_orient = cmds.spaceLocator(name='%s_%s_tmp_ROT'
-                                                % (prefix, part))[0]
-            cmds.setAttr(rev_orient + '.rotateOrder', ROTATE_ORDER['xzy'])
-            cmds.pointConstraint(rev_joint, rev_orient, mo=False)
-            cmds.joint(rev_joint, edit=True, position=default_vals[i])
-            if parent_joint:
-                cmds.parent(rev_joint, parent_joint)
-            parent_joint = rev_joint
-            temp_item_list.append(rev_orient)
-
-        i = i + 1
-
-    if toes:
-        build_toe_library(toe_count=toe_count, segment_count=toe_segments,
-                          prefix=prefix)
-        
-        for toe in toes_dict:
-            for segment in toes_dict[toe]:
-                cmds.spaceLocator(name=segment + '_LOC')
-            for loc in range(len(toes_dict[toe])):
-                if loc == (len(toes_dict[toe]) - 1):
-                    cmds.parent(toes_dict[toe][0] + '_LOC', toe_temp_parent)
-                else:
-                    cmds.parent(toes_dict[toe][loc + 1] + '_LOC',
-                                toes_dict[toe][loc] + '_LOC')
-
-        i = (len(toes_dict) / 2)
-        for key in sorted(toes_dict):
-            for segment in toes_dict[key]:
-                cmds.xform(segment + '_LOC',
-                           translation=[0, 0, 1], relative=True)
-            cmds.xform(toes_dict[key][0] + '_LOC',
-                       translation=[i, 0, 3], relative=True)
-            i = i - 1
-
-
-def create_driver_foot_joints(prefix='C', toes=False, toe_count=5,
-                              toe_segments=1):
-    loc_parent = None
-    for part in reverse_foot_parts:
-        if 'bank' in part:
-            offset = utils.create_offset(suffix='OFS',
-                                         input_object='%s_%s_rev_LOC' % (prefix, part))
-            if loc_parent:
-                cmds.parent(offset, loc_parent)
-            attributes.lock_hide(1, 1, 1, 1, 1, 0, 1, 1, 1, 1,
-                                 objects=['%s_%s_rev_LOC' % (prefix, part)])
-            loc_parent = '%s_%s_rev_LOC' % (prefix, part)
-        else:
-            query_loc = '%s_%s_tmp_ROT' % (prefix, part)
-            query_jnt = '%s_%s_rev_JNT' % (prefix, part)
-            query_parent = cmds.listRelatives(query_jnt, parent=True)
-            query_child = cmds.listRelatives(query_jnt, children=True)
-            offset = utils.create_offset(suffix='OFS',
-                                         input_object=query_jnt)
-            if query_parent:
-                cmds.parent(offset, world=True)
-            if query_child:
-                cmds.parent(query_child, world=True)
-
-            cmds.setAttr(query_jnt + '.jointOrientY',
-                         cmds.getAttr(query_loc + '.rotateY'))
-            if query_parent:
-                cmds.parent(offset, query_parent)
-            else:
-                cmds.parent(offset, loc_parent)
-            if query_child:
-                cmds.parent(query_child, query_jnt)
-
-            reverse_jnt_list.append(query_jnt)
-
-    # Build the bone system
-    start_joint = None
-    toe_base_bone = None
-
-    for bone in ['ankle', 'ball', 'toe']:
-        cmds.select(clear=True)
-        foot_bone = cmds.joint(name='%s_%s_BONE' % (prefix, bone))
-        if start_joint:
-            cmds.parent(foot_bone, start_joint)
-        utils.match_transformations(source='%s_%s_rev_JNT' % (prefix, bone),
-                                    target=foot_bone)
-        if bone != 'ankle':
-            # Looking into matrix based mechanics versus IK
-            foot_ik_handle = cmds.ikHandle(startJoint=start_joint,
-                                           endEffector=foot_bone,
-                                           solver='ikSCsolver',
-                                           name='%s_%s_IKH' % (prefix, bone))
-            if bone == 'toe':
-                cmds.select(clear=True)
-                toe_srt = cmds.group(empty=True,
-                                     name='%s_%s_bend_SRT' % (prefix, bone))
-                utils.match_transformations(target=toe_srt,
-                                            source=prefix + '_ball_rev_JNT')
-                cmds.parent(foot_ik_handle[0], toe_srt)
-                cmds.parent(toe_srt, '%s_%s_rev_JNT' % (prefix, bone))
-                toe_base_bone = foot_bone
-            else:
-                cmds.parent(foot_ik_handle[0], '%s_%s_rev_JNT' % (prefix, bone))
-        start_joint = foot_bone
-        
-    if toes:
-        if not toes_dict:
-            build_toe_library(toe_count=toe_count, segment_count=toe_segments,
-                              prefix=prefix)
-        toe_start_list = []
-        cmds.select(clear=True)
-        # hand_joint replaced by toe_base_bone from above
-        for toe in sorted(toes_dict):
-            cmds.select(clear=True)
-            for segment in toes_dict[toe]:
-                locator_position = \
-                    cmds.getAttr(segment + '_LOC.worldPosition[0]')[0]
-                toe_joint = cmds.joint(name=segment + '_BONE',
-                                       position=[locator_position[0],
-                                                 locator_position[1],
-                                                 locator_position[2]])
-                if '01' in segment:
-                    toe_start_list.append(toe_joint)
-
-        cmds.parent(toe_start_list, toe_base_bone)
-
-        for toe in sorted(toes_dict):
-            for segment in toes_dict[toe]:
-                locator_reference = segment + '_LOC'
-                joint_reference = segment + '_BONE'
-                locator_position = cmds.getAttr(locator_reference
-                                                + '.worldPosition[0]')[0]
-                locator_rotations = cmds.getAttr(locator_reference + '.r')[0]
-                cmds.setAttr(joint_reference + '.jointOrientX',
-                             locator_rotations[0])
-                cmds.setAttr(joint_reference + '.jointOrientY',
-                             locator_rotations[1])
-                cmds.setAttr(joint_reference + '.jointOrientZ',
-                             locator_rotations[2])
-                cmds.joint(joint_reference,
-                           edit=True,
-                           position=[locator_position[0],
-                                     locator_position[1],
-                                     locator_position[2]])
-
-
-def build_foot_system(foot_control=None, prefix='C', toes=False,
-                      toe_shape_type='box', toe_offset=False, limit_attrs=True):
-    # Deleting temp items; might move between different commands or write its
-    # own deleting procedure later
-    for item in temp_item_list:
-        cmds.delete(item)
-    # Dealing with the foot control setup
-    if not foot_control:
-        foot_control = cmds.group(empty=True,
-                                  name=prefix + '_foot_IK_CTRL')
-        secondary_control = cmds.group(empty=True,
-                                       parent=foot_control,
-                                       name=prefix + '_foot_IK_SCND_CTRL')
-        curve_builder.add_curve_shape('box', foot_control)
-        curve_builder.add_curve_shape('square', secondary_control)
-        # Match position of ankle
-        utils.match_transformations(rotation=False, source=prefix + '_ankle_rev_JNT', target=foot_control)
-        # Match orientation of heel
-        utils.match_transformations(translation=False, source=prefix + '_heel_rev_JNT', target=foot_control)
-        utils.create_offset(input_object=foot_control)
-    else:
-        secondary_control = cmds.group(empty=True,
-                                       parent=foot_control,
-                                       name=prefix + '_foot_IK_SCND_CTRL')
-        curve_builder.add_curve_shape('square', secondary_control)
-        cmds.xform(secondary_control, translation=[0, 0, 0], relative=True)
-
-    attributes.lock_hide(0, 0, 0, 0, 0, 0, 1, 1, 1, 1,
-                         objects=[foot_control, secondary_control])
-
-    for attribute in foot_attribute_keys:
-        attributes.create_attr(
-            attribute,
-            attribute_type=foot_attribute_dict[attribute][0],
-            input_object=foot_control,
-            min_value=foot_attribute_dict[attribute][1],
-            max_value=foot_attribute_dict[attribute][2],
-            default_value=foot_attribute_dict[attribute][3],
-            keyable=foot_attribute_dict[attribute][4],
-            enum_names=[foot_attribute_dict[attribute][5]]  # TODO: Why is this always None?
-        )
-
-    parent_rev_ctrl = None
-    reverse_ctrl_grp = cmds.group(empty=True, name=prefix + '_foot_rev_CTRL_GRP')
-    index = 2
-    for jnt in reverse_jnt_list:
-        if 'ankle' in jnt:
-            continue
-        rev_control = cmds.group(empty=True, name=jnt.replace('JNT', 'CTRL'))
-        curve_builder.add_curve_shape('circle', transform_node=rev_control)
-        utils.match_transformations(source=jnt,
-                                    target=rev_control)
-        rev_offset = utils.create_offset(input_object=rev_control)
-        if parent_rev_ctrl:
-            cmds.parent(rev_offset, parent_rev_ctrl)
-        parent_rev_ctrl = rev_control
-
-        # Node connection network
-        reverse_rotate_sum = node_builder.create_node('PMA', jnt.replace('JNT', 'rotation'))
-        cmds.connectAttr(rev_control + '.r', reverse_rotate_sum + '.input3D[0]')
-        cmds.connectAttr('%s.%sRoll' % (foot_control, reverse_foot_parts[index]),
-                         reverse_rotate_sum + '.input3D[1].input3Dx')
-        cmds.connectAttr(
-            '%s.%sSwivel' % (foot_control, reverse_foot_parts[index]),
-            reverse_rotate_sum + '.input3D[1].input3Dy')
-        cmds.connectAttr(reverse_rotate_sum + '.output3D', jnt + '.r')
-        if 'heel' in jnt:
-            cmds.parent(rev_offset, reverse_ctrl_grp)
-            cmds.connectAttr(foot_control + '.reverseControlVisibility',
-                             reverse_ctrl_grp + '.v')
-
-        index = index + 1
-
-    foot_roll_cnd = node_builder.create_node('CND', name=prefix + 'footRoll')
-    cmds.connectAttr(foot_control + '.footBank',
-                     foot_roll_cnd + '.firstTerm')
-    cmds.connectAttr(foot_control + '.footBank',
-                     foot_roll_cnd + '.colorIfTrueR')
-    cmds.connectAttr(foot_control + '.footBank',
-                     foot_roll_cnd + '.colorIfFalseG')
-    cmds.setAttr(foot_roll_cnd + '.operation', 3)  # Greater than or equal
-    cmds.connectAttr(foot_roll_cnd + '.outColor.outColorR',
-                     '%s_bank_in_rev_LOC.rz' % prefix)
-    cmds.connectAttr(foot_roll_cnd + '.outColor.outColorG',
-                     '%s_bank_out_rev_LOC.rz' % prefix)
-
-    # Toe Bend
-    cmds.connectAttr(foot_control + '.toeBend', '%s_toe_bend_SRT.rx' % prefix)
-
-    if toes:
-        attr_name = []
-        toe_ctrl_grp = cmds.group(empty=True, name=prefix + '_toe_CTRL_GRP')
-        cmds.parentConstraint(prefix + '_ball_BONE', toe_ctrl_grp, mo=False)
-        for toe in sorted(toes_dict):
-            # Declaring the parent variable before it gets continually 
-            # reassigned
-            parent_curve = toe_ctrl_grp
-            for segment in toes_dict[toe]:
-                if 'END' in segment:
-                    continue
-                toe_ctrl = cmds.group(empty=True, n=segment + '_CTRL')
-                curve_builder.add_curve_shape(shape_choice=toe_shape_type, transform_node=toe_ctrl)
-                toe_srt = cmds.group(toe_ctrl, n=segment + '_SRT')
-                if toe_offset:
-                    toe_ofs = cmds.group(toe_srt, n=segment + '_OFS')
-                    toe_zero = cmds.group(toe_ofs, n=segment + '_ZERO')
-                else:
-                    toe_zero = cmds.group(toe_srt, n=segment + '_ZERO')
-
-                utils.match_transformations(source=segment + '_BONE', target=toe_zero)
-                cmds.parentConstraint(toe_ctrl, segment + '_BONE')
-
-                # If the control group is not the base of the toe, parent
-                if '01' not in segment:
-                    cmds.parent(toe_zero, parent_curve)
-                    # Lock unnecessary attributes if assigned
-                    if limit_attrs:
-                        attributes.lock_hide(1, 1, 1, 0, 1, 1, 1, 1, 1, 1, objects=[toe_ctrl])
-                else:
-                    cmds.parent(toe_zero, toe_ctrl_grp)
-                parent_curve = toe_ctrl
-
-                if 'END' not in segment:
-                    attr_name.append(segment[2:])
-
-        # Organizer attribute
-        attributes.create_attr(
-            attribute_name='_',
-            attribute_type='enum',
-            input_object=foot_control,
-            keyable=False,
-            enum_names=['Toes']
-        )
-        for attribute in sorted(attr_name):
-            attributes.create_attr(
-                attribute_name=attribute,
-                attribute_type='double',
-                input_object=foot_control
-            )
-
-            cmds.connectAttr('%s.%s' % (foot_control, attribute),
-                             '%s_%s_SRT.rx' % (prefix, attribute))
-# Remaining Operations:
-# Condition to create a foot control if one does not yet exist
-    # Extend this condition to the foot auto rigger in a similar fashion
-    # Also extend to find the leg IK handle and put in the reverse hierarchy
-    # Original ankle joint will not be influenced otherwise.
+# The whole roll network of a foot.  Reverse controls rotate their joints
+# directly and the foot's roll (X) and swivel (Y) attributes rotate the group
+# above each joint, so the two compose through the hierarchy with no utility
+# node; one clamp splits the bank between the inner pivot (positive) and the
+# outer one (negative).
+_FOOT_ROLL_TEMPLATE = node_builder.NodeGraphTemplate(
+    nodes=[('bank', 'CLMP', '{prefix}_footBank')],
+    inputs=['prefix', 'foot', 'bank_in', 'bank_out'] + [
+        '{}_{}'.format(part, role) for part in plans.REVERSE_CONTROL_PARTS
+        for role in ('ctl', 'srt', 'jnt')],
+    connections=[
+        ('{foot}.footBank', '{bank}.inputR'),
+        ('{foot}.footBank', '{bank}.inputG'),
+        ('{bank}.outputR', '{bank_in}.rz'),
+        ('{bank}.outputG', '{bank_out}.rz'),
+    ] + [connection for part in plans.REVERSE_CONTROL_PARTS for connection in (
+        ('{%s_ctl}.r' % part, '{%s_jnt}.r' % part),
+        ('{foot}.%sRoll' % part, '{%s_srt}.rx' % part),
+        ('{foot}.%sSwivel' % part, '{%s_srt}.ry' % part),
+    )],
+    values=[
+        ('{bank}.maxR', 360.0),
+        ('{bank}.minG', -360.0),
+    ],
+)
+
+
+def _to_radians(rotation):
+    # Angle plugs set through the API take radians
+    return tuple(om.MAngle(value, om.MAngle.kDegrees).asRadians() for value in rotation)
+
+
+def _create_nodes(node_types, names, parents):
+    """
+    Creates nodes whose parents may be other nodes of the same call (by name)
+    or existing nodes, in one modifier pass.
+    """
+    index = dict((name, i) for i, name in enumerate(names))
+    return api.create_dag_nodes(
+        node_types, names, parents=[index.get(parent, parent) for parent in parents])
+
+
+def guide_names(plan):
+    return [guide.name for guide in plan.guides]
+
+
+def create_foot_locators(foot_plans):
+    """
+    Creates the guide locators of every foot in one pass.
+    """
+    bank_guides = [pivot.guide for plan in foot_plans for pivot in plan.pivots if pivot.is_bank]
+    guides.create_guides([guide for plan in foot_plans for guide in plan.guides],
+                         plug_values=[(guide + 'Shape.localScaleZ', 5.0) for guide in bank_guides])
+    # Banks only slide along the ground
+    attributes.lock_hide(0, 0, 0, 1, 0, 1, 1, 1, 1, 1, objects=bank_guides)
+    return [plan.guides[0].name for plan in foot_plans]
+
+
+def snapshot_foot_guides(foot_plans):
+    """
+    Reads the guide locators of every foot that has them in the scene.
+
+    Returns:
+        (GuideLayout): The guide world matrices.
+
+    """
+    names = [name for plan in foot_plans if cmds.objExists(plan.guides[0].name)
+             for name in guide_names(plan)]
+    return guides.snapshot_guides(names, module='foot')
+
+
+def create_driver_foot_joints(foot_plans, from_guides=True, guide_layout=None):
+    """
+    Creates the reverse pivot chain, foot bones, toe joints and IK handles of
+    every foot.  All nodes are created in one pass and placed in one batched
+    write; only the IK handles are made one by one.
+
+    Args:
+        foot_plans (list[FootPlan]): Feet to build.
+        from_guides (bool): Solve the joints from the guide locators in the
+            scene, if they exist, rather than the planned guide layout.
+        guide_layout (GuideLayout): Solve the joints from a saved guide layout
+            instead, with no guides needed in the scene.
+
+    Returns:
+        (list[FootPlan]): The plans, updated to the guides that were used.
+
+    """
+    if guide_layout is None and from_guides:
+        guide_layout = snapshot_foot_guides(foot_plans)
+    if guide_layout is not None:
+        foot_plans = [plans.replan_foot_from_guides(plan, guide_layout.to_dict(guide_names(plan)))
+                      if plan.guides[0].name in guide_layout else plan
+                      for plan in foot_plans]
+
+    node_types = []
+    names = []
+    parents = []
+    plug_values = []
+    placements = []
+    for plan in foot_plans:
+        for pivot in plan.pivots:
+            if pivot.srt:
+                # The offset carries the heading, so the roll and swivel of
+                # the group rotate about the pivot's own axes
+                node_types.extend(['transform', 'transform', 'joint'])
+                names.extend([pivot.ofs, pivot.srt, pivot.node])
+                parents.extend([pivot.parent, pivot.ofs, pivot.srt])
+                placements.append((pivot.ofs, pivot.matrix))
+                continue
+
+            node_types.extend(['transform', 'transform' if pivot.is_bank else 'joint'])
+            names.extend([pivot.ofs, pivot.node])
+            parents.extend([pivot.parent, pivot.ofs])
+            # Offsets only carry the position; the heading is the joint orient
+            placements.append((pivot.ofs, plans.euler_to_matrix((0.0, 0.0, 0.0),
+                                                                 pivot.matrix[3][:3])))
+            if not pivot.is_bank:
+                plug_values.append((pivot.node + '.jointOrient',
+                                    _to_radians(plans.matrix_to_euler(pivot.matrix))))
+
+        for joint in plan.bones + plan.toe_joints:
+            node_types.append('joint')
+            names.append(joint.name)
+            parents.append(joint.parent)
+            plug_values.append((joint.name + '.t', joint.translate))
+            plug_values.append((joint.name + '.jointOrient', _to_radians(joint.joint_orient)))
+
+        ball = [pivot for pivot in plan.pivots if pivot.part == 'ball'][0]
+        node_types.append('transform')
+        names.append(plan.toe_bend)
+        parents.append([pivot.node for pivot in plan.pivots if pivot.part == 'toe'][0])
+        placements.append((plan.toe_bend, ball.matrix))
+
+    mobjects = dict(zip(names, _create_nodes(node_types, names, parents)))
+    # Joint orients first, so offsets under the reverse joints land in world
+    api.set_plug_values(plug_values)
+    api.set_world_matrices([mobjects[name] for name, _ in placements],
+                           [plans.flatten_matrix(matrix) for _, matrix in placements])
+
+    handle_parents = {}
+    for plan in foot_plans:
+        for handle in plan.ik_handles:
+            cmds.ikHandle(startJoint=handle.start, endEffector=handle.end,
+                          solver='ikSCsolver', name=handle.name)
+            handle_parents.setdefault(handle.parent, []).append(handle.name)
+    for parent, handles in handle_parents.items():
+        cmds.parent(handles, parent)
+
+    return foot_plans
+
+
+def create_foot_controls(foot_plans, foot_controls=None):
+    """
+    Creates the foot, reverse and toe controls of every foot.  Transforms are
+    created and placed in bulk; only the control shapes and attributes are
+    added one by one.
+
+    Args:
+        foot_plans (list[FootPlan]): Feet to build.
+        foot_controls (list[str]): An existing control per foot to use as the
+            foot control, such as a leg IK control, or None to create one.
+
+    Returns:
+        (list[str]): The foot control of each foot.
+
+    """
+    foot_controls = foot_controls or [None] * len(foot_plans)
+
+    names = []
+    parents = []
+    matrices = []
+    for plan, foot_control in zip(foot_plans, foot_controls):
+        control = plan.foot_control
+        if foot_control is None:
+            names.extend([control.ofs, control.ctl])
+            parents.extend([None, control.ofs])
+            matrices.extend([plans.flatten_matrix(control.matrix), None])
+        names.extend([plan.secondary_control, plan.reverse_group])
+        parents.extend([foot_control or control.ctl, None])
+        matrices.extend([None, None])
+        for reverse in plan.reverse_controls:
+            names.extend([reverse.ofs, reverse.ctl])
+            parents.extend([reverse.parent, reverse.ofs])
+            matrices.extend([plans.flatten_matrix(reverse.matrix), None])
+
+        if plan.toe_controls:
+            names.append(plan.toe_group)
+            parents.append(None)
+            matrices.append(None)
+        for toe in plan.toe_controls:
+            chain = [toe.ofs, toe.segment + '_OFS', toe.srt, toe.ctl]
+            if not plan.toe_offset:
+                chain.remove(toe.segment + '_OFS')
+            names.extend(chain)
+            parents.extend([toe.parent] + chain[:-1])
+            matrices.extend([plans.flatten_matrix(toe.matrix)] + [None] * (len(chain) - 1))
+
+    mobjects = _create_nodes('transform', names, parents)
+    api.set_world_matrices(mobjects, matrices)
+
+    built_controls = []
+    for plan, foot_control in zip(foot_plans, foot_controls):
+        foot_control = foot_control or plan.foot_control.ctl
+        built_controls.append(foot_control)
+        if foot_control == plan.foot_control.ctl:
+            curve_builder.add_curve_shape(shape_choice='box', transform_node=foot_control)
+        curve_builder.add_curve_shape(shape_choice='square',
+                                      transform_node=plan.secondary_control)
+        attributes.lock_hide(0, 0, 0, 0, 0, 0, 1, 1, 1, 1,
+                             objects=[foot_control, plan.secondary_control])
+        for reverse in plan.reverse_controls:
+            curve_builder.add_curve_shape(shape_choice='circle', transform_node=reverse.ctl)
+
+        for toe in plan.toe_controls:
+            curve_builder.add_curve_shape(shape_choice=plan.toe_shape_type,
+                                          transform_node=toe.ctl)
+        limited = [toe.ctl for toe in plan.toe_controls if toe.parent != plan.toe_group]
+        if plan.limit_attrs and limited:
+            attributes.lock_hide(1, 1, 1, 0, 1, 1, 1, 1, 1, 1, objects=limited)
+
+        for attr in plan.attributes:
+            options = dict(attr.options)
+            if 'enum_names' in options:
+                options['enum_names'] = list(options['enum_names'])
+            attributes.create_attr(attribute_name=attr.name,
+                                   attribute_type=attr.type,
+                                   input_object=foot_control,
+                                   **options)
+
+    return built_controls
+
+
+def connect_feet(foot_plans, foot_controls):
+    """
+    Builds the roll, swivel and bank network of every foot in one template
+    pass, and constrains the toe joints to their controls and the toe controls
+    to the ball.  Roll and swivel rotate the group above each reverse joint,
+    so they compose with the reverse control's rotation rather than being
+    added to it.  Toe controls sit at their bones and the constraint zeroes the
+    bones' joint orients, so the toes keep their pose on the offsetParentMatrix
+    path and on the pre-2020 decompose fallback alike.
+    """
+    networks = []
+    connections = []
+    constraints = []
+    for plan, foot_control in zip(foot_plans, foot_controls):
+        pivots = dict((pivot.part, pivot) for pivot in plan.pivots)
+        network = {'prefix': plan.prefix, 'foot': foot_control,
+                   'bank_in': pivots['bank_in'].node, 'bank_out': pivots['bank_out'].node}
+        for reverse in plan.reverse_controls:
+            network[reverse.segment + '_ctl'] = reverse.ctl
+            network[reverse.segment + '_srt'] = pivots[reverse.segment].srt
+            network[reverse.segment + '_jnt'] = pivots[reverse.segment].node
+        networks.append(network)
+
+        connections.append((foot_control + '.reverseControlVisibility',
+                            plan.reverse_group + '.v'))
+        connections.append((foot_control + '.toeBend', plan.toe_bend + '.rx'))
+        for toe in plan.toe_controls:
+            connections.append(('{}.{}'.format(foot_control, toe.segment[len(plan.prefix) + 1:]),
+                                toe.srt + '.rx'))
+            constraints.append((toe.ctl, toe.segment + '_BONE'))
+        if plan.toe_controls:
+            constraints.append((plan.bones[1].name, plan.toe_group))
+
+    _FOOT_ROLL_TEMPLATE.build(networks)
+    api.connect_plugs(connections)
+    rig_utils.matrix_constraints(constraints)
+
+
+def build_foot_system(foot_plans, foot_controls=None):
+    """
+    Creates the controls of every foot and wires them to the driver joints.
+
+    Returns:
+        (list[str]): The foot control of each foot.
+
+    """
+    foot_controls = create_foot_controls(foot_plans, foot_controls=foot_controls)
+    connect_feet(foot_plans, foot_controls)
+    return foot_controls
+
+
+def cleanup_foot_guides(foot_plans):
+    """
+    Deletes the guide locators of every foot in one call.
+    """
+    # Toe guides go with the ball guide they sit under
+    names = [guide.name for plan in foot_plans for guide in plan.guides
+             if guide.parent is None and cmds.objExists(guide.name)]
+    if names:
+        cmds.delete(names)
+
+
+def build_feet(foot_plans, from_guides=False, guide_layout=None, foot_controls=None,
+               cleanup=True):
+    """
+    Builds any number of feet, each step running once over every foot.
+
+    Args:
+        foot_plans (list[FootPlan]): Feet to build, see plans.plan_foot.
+        from_guides (bool): Solve joints from guide locators already placed in
+            the scene instead of creating the planned guides.
+        guide_layout (GuideLayout): Solve joints from a saved guide layout, see
+            guides.GuideLayout.load.  No guide locators are created.
+        foot_controls (list[str]): An existing control per foot, or None.
+        cleanup (bool): Delete the guide locators once the feet are built.
+
+    Returns:
+        (list[FootPlan]): The plans as built.
+
+    """
+    if not from_guides and guide_layout is None:
+        create_foot_locators(foot_plans)
+    foot_plans = create_driver_foot_joints(foot_plans, from_guides=from_guides,
+                                           guide_layout=guide_layout)
+    build_foot_system(foot_plans, foot_controls=foot_controls)
+    if cleanup:
+        cleanup_foot_guides(foot_plans)
+    return foot_plans
@@ -6,12 +6,15 @@ import pprint
 from string import ascii_uppercase
 
 from local.basic import curve_builder
+from local.basic import api
 from local.basic import attributes
 from local.basic import node_builder
 from local.basic import utils
-from local.basic import renamer
+from local.rigging.common import chains
+from local.rigging.common import guides
 
 import maya.cmds as cmds
+import numpy as np
 
 
 LETTERS_INDEX = {index: letter for index, letter in enumerate(ascii_uppercase, start=1)}
@@ -49,6 +52,12 @@ ik_end_attribute_dict = {
     'secondaryVisibility': ['bool', None, None, 0, False, None],
 }
 
+INBETWEEN_MODES = ('constraint', 'shared', 'static')
+_INBETWEEN_TEMPLATE = node_builder.NodeGraphTemplate(
+    nodes=[('scale', 'MDIV', '{start}_inbetween')],
+    inputs=['start', 'end'],
+    connections=[('{end}.t', '{scale}.input1')])
+
 
 def build_limb_library(prefix='L', limb_type='arm', extra_joints=2):
     """
@@ -149,48 +158,39 @@ def create_limb_locators(limb_dict, prefix='L', limb_type='arm'):
     limb_locator_list = []
     parent_loc = None
     distance_factor = 4.0 / len(limb_dict[limb_parts[0]])  # 4=default distance
+    axis = {'arm': 0, 'leg': 1}.get(limb_type, 2)
+    direction = -1 if limb_type == 'leg' else 1
+    mirror = -1 if ('right' in prefix or 'R' in prefix or 'rt' in prefix) else 1
+    guide_list = []
+    plug_values = []
     i = 1
     for segment in limb_parts:
         # Using the limb_parts list keeps the correct order when calling the
         # limb_dict
         for part in limb_dict[segment]:
-            segment_loc = cmds.spaceLocator(name=part + '_LOC')[0]
+            segment_loc = part + '_LOC'
             if parent_loc:
-                cmds.parent(segment_loc, parent_loc)
-                if 'arm' in limb_type:
-                    cmds.xform(segment_loc,
-                               translation=[distance_factor * i, 0, 0],
-                               absolute=True)
-                elif 'leg' in limb_type:
-                    cmds.xform(segment_loc,
-                               translation=[0, distance_factor * -i, 0],
-                               absolute=True)
-                else:
-                    cmds.xform(segment_loc,
-                               translation=[0, 0, distance_factor * i],
-                               absolute=True)
+                translate = [0, 0, 0]
+                translate[axis] = distance_factor * i * direction
                 i = i + 1
             else:
-                cmds.xform(segment_loc,
-                           translation=limb_starting_position[limb_type],
-                           worldSpace=True)
+                translate = list(limb_starting_position[limb_type])
+            translate[0] = translate[0] * mirror
+            guide_list.append(guides.Guide(segment_loc, parent_loc, translate, (0, 0, 0)))
             # If the locator is the first of the part (key), make its color
             # significant
             if part.endswith(segment):
-                curve_builder.set_control_color(rgb_input=side_to_color[prefix], input_object=segment_loc + 'Shape')
                 pivot_locator_list.append(segment_loc)
                 parent_loc = segment_loc
                 i = 1  # Reset the distance index factor
             else:
-                cmds.setAttr(segment_loc + '.localScaleX', 0.5)
-                cmds.setAttr(segment_loc + '.localScaleY', 0.5)
-                cmds.setAttr(segment_loc + '.localScaleZ', 0.5)
+                plug_values.append((segment_loc + 'Shape.localScale', (0.5, 0.5, 0.5)))
             limb_locator_list.append(segment_loc)
 
-    if 'right' in prefix or 'R' in prefix or 'rt' in prefix:
-        for loc in limb_locator_list:
-            tx_value = cmds.getAttr(loc + '.translateX')
-            cmds.setAttr(loc + '.translateX', -tx_value)
+    guides.create_guides(guide_list, plug_values=plug_values)
+    for pivot_loc in pivot_locator_list:
+        curve_builder.set_control_color(rgb_input=side_to_color[prefix],
+                                        input_object=pivot_loc + 'Shape')
 
     # Setting the constraints for in-between locators
     i = 1.0
@@ -302,13 +302,30 @@ def create_limb_locators(limb_dict, prefix='L', limb_type='arm'):
     return limb_locator_list, pivot_locator_list, pv_loc
 
 
+def snapshot_limb_guides(locator_inputs):
+    """
+    Reads every guide of a limb, as returned by create_limb_locators, in one
+    pass.
+
+    Returns:
+        (GuideLayout): The guide world matrices.
+
+    """
+    names = []
+    for loc in locator_inputs[0] + locator_inputs[1] + [locator_inputs[2]]:
+        if loc not in names:
+            names.append(loc)
+    return guides.snapshot_guides(names, module='limb')
+
+
 # Work start here.  Must determine what needs to be pushed from the locator
 # procedure into the later procedures in order to work with multiple instances.
 
 
 def create_limb_system(limb_dict, locator_inputs, prefix='L', limb_type='arm',
                        auto_twist=True, orient_symmetry=False, fk_shape='ring',
-                       ik_shape='box', pv_shape='diamond'):
+                       ik_shape='box', pv_shape='diamond', guide_layout=None,
+                       inbetween_mode='constraint'):
     """
     Builds a joint and control rig system based on the placements of the
     locators from the previous function.  Relies heavily on correct variable
@@ -332,9 +349,20 @@ def create_limb_system(limb_dict, locator_inputs, prefix='L', limb_type='arm',
         fk_shape (str): Assign a shape type for the FK controls.
         ik_shape (str): Assign a shape type for the IK controls.
         pv_shape (str): Assign a shape type for the PV control.
+        guide_layout (GuideLayout): Saved guide layout to build from instead of
+            the locators in the scene.
+        inbetween_mode (str): How the extra joints follow the pivots.
+            'constraint' point constrains each one between its pivots,
+            'shared' drives all of a segment's extra joints from one
+            multiplyDivide, and 'static' places them evenly between the pivots
+            with nothing driving them.
 
     """
 
+    if inbetween_mode not in INBETWEEN_MODES:
+        raise ValueError('Unknown inbetween_mode "{}", expected one of: {}'.format(
+            inbetween_mode, ', '.join(INBETWEEN_MODES)))
+
     if limb_type == 'arm':
         limb_parts = arm_parts
     elif limb_type == 'leg':
@@ -343,105 +371,82 @@ def create_limb_system(limb_dict, locator_inputs, prefix='L', limb_type='arm',
         limb_type = 'other'
         limb_parts = [limb_type + '_01', limb_type + '_02', limb_type + '_03']
 
-    cmds.select(clear=True)
-    limb_bone_list = []
-    for loc in locator_inputs[0]:
-        locator_position = cmds.getAttr(loc + '.worldPosition[0]')[0]
-        bone = cmds.joint(name=loc.replace('LOC', 'BONE'),
-                          position=[locator_position[0],
-                          locator_position[1],
-                          locator_position[2]])
-        limb_bone_list.append(bone)
-    # Orient Bones
-    cmds.joint(limb_bone_list[0],
-               edit=True,
-               orientJoint='xzy',
-               secondaryAxisOrient='yup',
-               children=True)
-
-    # Separating extra joints from pivots to avoid cycles on twists.  Adding
-    # x-based point constraints to keep the extra joints from overextending
-    # when switching between IKFK.
-    pivot_bone_list = []
-    for bone in locator_inputs[1]:
-        pivot_bone_list.append(bone.replace('LOC', 'BONE'))
-
-    bone_parent = None
-    if len(limb_dict[limb_parts[0]]) > 1:
-
-        for bone in pivot_bone_list:
-            if bone == pivot_bone_list[-1]:
-                break
-            if bone_parent:
-                cmds.parent(bone, bone_parent)
-            bone_parent = bone
-
-        i = 0
-        j = -1
-        bone_count_factor = 1.0 / float(len(limb_dict[limb_parts[0]]))
-        bone_position_factor = bone_count_factor
-        for bone in limb_bone_list:
-            if bone in pivot_bone_list:
-                i = i + 1
-                j = j + 1
-                bone_position_factor = bone_count_factor
-                continue
-            bone_position_constraint = \
-                cmds.pointConstraint(pivot_bone_list[j],
-                                     pivot_bone_list[i],
-                                     bone,
-                                     maintainOffset=False)[0]
-
-            weight_0_attr = cmds.listAttr(bone_position_constraint)[-2]
-            weight_1_attr = cmds.listAttr(bone_position_constraint)[-1]
-
-            cmds.setAttr('%s.%s' % (bone_position_constraint, weight_1_attr),
-                         bone_position_factor)
-            cmds.setAttr('%s.%s' % (bone_position_constraint, weight_0_attr),
-                         1 - bone_position_factor)
-            bone_position_factor = bone_position_factor + bone_count_factor
-
-    # FK Joint System
-    i = 0
-    fk_origin = None
-    fk_orient_jnt = None
-    fk_joints_list = []
-    cmds.select(clear=True)
-    for loc in locator_inputs[1]:
-        locator_position = cmds.getAttr(loc + '.worldPosition[0]')[0]
-        bone = cmds.joint(name=loc.replace('LOC', 'FK_JNT'),
-                          position=[locator_position[0],
-                                    locator_position[1],
-                                    locator_position[2]])
-        if loc == locator_inputs[1][-1]:
-            fk_orient_jnt = loc.replace('_LOC', '_FK_JNT')
-            continue
-        fk_joints_list.append(bone)
-        if i == 0:
-            fk_origin = bone
-        i = i + 1
-
-    # Orient driver joints
-    cmds.joint(fk_joints_list[0],
-               edit=True,
-               orientJoint='xzy',
-               secondaryAxisOrient='yup',
-               children=True)
-
-    # IK Joint System
-    ik_origin = cmds.duplicate(fk_origin, renameChildren=True)
-    ik_joints = renamer.search_replace_name(
-        search_input='FK',
-        replace_output='IK',
-        input_objects=ik_origin
-    )
-    ik_joints_list = []
-    for jnt in ik_joints:
-        ik_joint_name = renamer.clear_end_digits(input_objects=[jnt])[0]
-        ik_joints_list.append(ik_joint_name)
-    # Deleteing all of the orient joints now that they have been oriented
-    cmds.delete(ik_joints_list[-1], limb_bone_list[-1], fk_orient_jnt)
-    del(ik_joints_list[-1])
+    if guide_layout is None:
+        guide_layout = snapshot_limb_guides(locator_inputs)
+
+    # The last guide of both lists is the orient locator, which the end
+    # joints aim at but which gets no joint of its own
+    orient_position = guide_layout.position(locator_inputs[1][-1])
+    bone_locs = locator_inputs[0][:-1]
+    pivot_locs = locator_inputs[1][:-1]
+
+    # Separating extra joints from pivots to avoid cycles on twists: each
+    # pivot hangs from the previous pivot and the extra joints from the joint
+    # before them, while orients still follow the full chain.
+    bone_parents = []
+    for index, loc in enumerate(bone_locs):
+        if not index:
+            bone_parents.append(None)
+        elif loc in pivot_locs:
+            bone_parents.append(bone_locs.index(pivot_locs[pivot_locs.index(loc) - 1]))
+        else:
+            bone_parents.append(index - 1)
+
+    pivot_positions = [guide_layout.position(loc) for loc in pivot_locs]
+    bone_positions = np.array([guide_layout.position(loc) for loc in bone_locs])
+    # Extra joints sit at even steps between the pivot before and after them
+    bone_count_factor = 1.0 / float(len(limb_dict[limb_parts[0]]))
+    segment_indices = np.searchsorted([bone_locs.index(loc) for loc in pivot_locs],
+                                      np.arange(len(bone_locs)), side='right') - 1
+    inbetween_mask = np.array([loc not in pivot_locs for loc in bone_locs])
+    inbetween_factors = (np.arange(len(bone_locs)) - np.array(
+        [bone_locs.index(pivot_locs[index]) for index in segment_indices])) * bone_count_factor
+    if inbetween_mode == 'static' and inbetween_mask.any():
+        pivot_array = np.array(pivot_positions)
+        weights = inbetween_factors[inbetween_mask, np.newaxis]
+        segments = segment_indices[inbetween_mask]
+        bone_positions[inbetween_mask] = \
+            pivot_array[segments] * (1.0 - weights) + pivot_array[segments + 1] * weights
+
+    limb_bone_list, fk_joints_list, ik_joints_list = chains.create_chains([
+        chains.chain_spec([loc.replace('LOC', 'BONE') for loc in bone_locs],
+                          bone_positions, parents=bone_parents, aim_target=orient_position),
+        chains.chain_spec([loc.replace('LOC', 'FK_JNT') for loc in pivot_locs],
+                          pivot_positions, aim_target=orient_position),
+        chains.chain_spec([loc.replace('LOC', 'IK_JNT') for loc in pivot_locs],
+                          pivot_positions, aim_target=orient_position),
+    ])
+
+    # Keeping the extra joints from overextending when switching between IKFK
+    pivot_bone_list = [loc.replace('LOC', 'BONE') for loc in pivot_locs]
+    inbetween_bones = [(bone, pivot_bone_list[segment], pivot_bone_list[segment + 1], factor)
+                       for bone, is_inbetween, segment, factor
+                       in zip(limb_bone_list, inbetween_mask, segment_indices, inbetween_factors)
+                       if is_inbetween]
+    if inbetween_mode == 'constraint':
+        weight_values = []
+        for bone, start_bone, end_bone, factor in inbetween_bones:
+            bone_position_constraint = cmds.pointConstraint(start_bone, end_bone, bone,
+                                                            maintainOffset=False)[0]
+            weight_values.append(('%s.%sW0' % (bone_position_constraint, start_bone),
+                                  1 - factor))
+            weight_values.append(('%s.%sW1' % (bone_position_constraint, end_bone), factor))
+        api.set_plug_values(weight_values)
+    elif inbetween_mode == 'shared':
+        # Every extra joint is a child of the joint before it with the same
+        # orientation, so each one is offset by the same fraction of the end
+        # pivot's translate under the start pivot
+        segment_bones = {}
+        for bone, start_bone, end_bone, _ in inbetween_bones:
+            segment_bones.setdefault((start_bone, end_bone), []).append(bone)
+        segments = sorted(segment_bones)
+        scale_nodes = _INBETWEEN_TEMPLATE.build([{'start': start_bone, 'end': end_bone}
+                                                 for start_bone, end_bone in segments])
+        api.set_plug_values([(nodes['scale'] + '.input2', (bone_count_factor,) * 3)
+                             for nodes in scale_nodes])
+        api.connect_plugs([(nodes['scale'] + '.output', bone + '.t')
+                           for segment, nodes in zip(segments, scale_nodes)
+                           for bone in segment_bones[segment]])
 
     # Variable to assign the symmetry -1 scale assignment
     inverse = None
@@ -539,13 +544,15 @@ def create_limb_system(limb_dict, locator_inputs, prefix='L', limb_type='arm',
     cmds.xform(ik_control + '.cv[0:]', scale=[1.85, 1.85, 1.85])
 
     utils.match_transformations(source=ik_joints_list[-1], target=ik_control_offset)
-    utils.match_transformations(source=locator_inputs[2], target=ik_pv_control_offset)
+    cmds.xform(ik_pv_control_offset, matrix=guide_layout.matrix_list(locator_inputs[2]),
+               worldSpace=True)
 
     ik_ctrl_grp = cmds.group(ik_control_offset, ik_pv_control_offset,
                              name='%s_%s_IK_CTRL_GRP' % (prefix, limb_type))
 
     # Deleting the placement pv arrow
-    cmds.delete('%s_%s_pv_LOC' % (prefix, limb_parts[1]))
+    if cmds.objExists('%s_%s_pv_LOC' % (prefix, limb_parts[1])):
+        cmds.delete('%s_%s_pv_LOC' % (prefix, limb_parts[1]))
 
     # Creating FK control constraints
     for ctrl in fk_ctrl_list:
@@ -625,7 +632,7 @@ def create_limb_system(limb_dict, locator_inputs, prefix='L', limb_type='arm',
         twist_jnt_count_fraction = 1.0 / float(len(limb_dict[limb_parts[1]]))
         twist_jnt_index_list = []
         for jnt in range(twist_jnt_count):
-            list_jnt = -3 - jnt
+            list_jnt = -2 - jnt
             twist_jnt_index_list.append(list_jnt)
         twist_jnt_list = []
         for index in twist_jnt_index_list:
@@ -637,7 +644,7 @@ def create_limb_system(limb_dict, locator_inputs, prefix='L', limb_type='arm',
         twist_limit_factor_mdl = \
             node_builder.create_node('MDL', name='%s_%s_twist_limit_factor'
                                          % (prefix, limb_parts[2]))
-        cmds.connectAttr(limb_bone_list[-2] + '.rotateX',
+        cmds.connectAttr(limb_bone_list[-1] + '.rotateX',
                          twist_limit_factor_mdl + '.input1')
         cmds.setAttr(twist_limit_factor_mdl + '.input2',
                      twist_jnt_count_fraction)
@@ -674,9 +681,11 @@ def create_limb_system(limb_dict, locator_inputs, prefix='L', limb_type='arm',
     cmds.parent(input_module, output_module,
                 '%s_%s_MOD' % (prefix, limb_type))
     # Removing setup trash
-    cmds.delete(locator_inputs[0][0], '%s_%s_pv_GRP' % (prefix, limb_parts[1]))
-    if cmds.objExists(locator_inputs[0][-1]):
-        cmds.delete(locator_inputs[0][-1])
+    setup_items = [locator_inputs[0][0], '%s_%s_pv_GRP' % (prefix, limb_parts[1]),
+                   locator_inputs[0][-1]]
+    setup_items = [item for item in setup_items if cmds.objExists(item)]
+    if setup_items:
+        cmds.delete(setup_items)
 
     ctrl_grp = cmds.group(ik_ctrl_grp, fk_ctrl_offset,
                           name='%s_%s_CTRL_GRP' % (prefix, limb_type))
@@ -0,0 +1,510 @@
+"""
+Pure Python build plans for rig modules.  A plan holds every name, transform,
+parent and attribute a module needs, as immutable tuples, without touching
+Maya, so it can be inspected and tested offline.  The module files execute
+plans in the scene in bulk passes.
+
+Matrices are 4x4 nested tuples in Maya's row vector layout (translation in the
+last row) and rotations are XYZ order Euler angles in degrees.
+"""
+
+from collections import namedtuple
+import math
+from string import ascii_uppercase
+
+# Math -----------------------------------------------------------------#
+IDENTITY = ((1.0, 0.0, 0.0, 0.0),
+            (0.0, 1.0, 0.0, 0.0),
+            (0.0, 0.0, 1.0, 0.0),
+            (0.0, 0.0, 0.0, 1.0))
+
+
+def euler_to_matrix(rotate, translate=(0.0, 0.0, 0.0)):
+    rx, ry, rz = [math.radians(value) for value in rotate]
+    cx, sx = math.cos(rx), math.sin(rx)
+    cy, sy = math.cos(ry), math.sin(ry)
+    cz, sz = math.cos(rz), math.sin(rz)
+    return ((cy * cz, cy * sz, -sy, 0.0),
+            (sx * sy * cz - cx * sz, sx * sy * sz + cx * cz, sx * cy, 0.0),
+            (cx * sy * cz + sx * sz, cx * sy * sz - sx * cz, cx * cy, 0.0),
+            (float(translate[0]), float(translate[1]), float(translate[2]), 1.0))
+
+
+def matrix_to_euler(matrix):
+    sy = max(-1.0, min(1.0, -matrix[0][2]))
+    ry = math.asin(sy)
+    if abs(sy) < 0.999999:
+        rx = math.atan2(matrix[1][2], matrix[2][2])
+        rz = math.atan2(matrix[0][1], matrix[0][0])
+    else:
+        # Gimbal locked, fold Z into X
+        rx = math.atan2(matrix[1][0] * sy, matrix[1][1])
+        rz = 0.0
+    return tuple(math.degrees(value) for value in (rx, ry, rz))
+
+
+def multiply(a, b):
+    return tuple(tuple(sum(a[row][k] * b[k][column] for k in range(4)) for column in range(4))
+                 for row in range(4))
+
+
+def rigid_inverse(matrix):
+    """
+    Inverse of a matrix with no scale or shear.
+    """
+    rotation = [[matrix[column][row] for column in range(3)] for row in range(3)]
+    translate = [-sum(matrix[3][k] * rotation[k][column] for k in range(3)) for column in range(3)]
+    return tuple(tuple(rotation[row]) + (0.0,) for row in range(3)) + (tuple(translate) + (1.0,),)
+
+
+def flatten_matrix(matrix):
+    return [value for row in matrix for value in row]
+
+
+# Hand -----------------------------------------------------------------#
+Transform = namedtuple('Transform', 'name parent translate rotate')
+Joint = namedtuple('Joint', 'name parent translate joint_orient matrix')
+Control = namedtuple('Control', 'segment ofs srt ctl parent matrix')
+Attribute = namedtuple('Attribute', 'name type options')
+Finger = namedtuple('Finger', 'key label segments driven is_thumb')
+HandPlan = namedtuple('HandPlan', [
+    'side', 'inverse', 'shape_type', 'hand_shape', 'limit_attrs',
+    'fingers', 'hand_locator', 'locators', 'hand_joint', 'joints',
+    'hand_control', 'controls', 'attributes'])
+
+FINGER_LETTERS = dict(enumerate(ascii_uppercase, start=1))
+
+
+def _finger_segments(side, label, segment_count, metacarpus):
+    segments = []
+    for segment in range(segment_count + 1 + metacarpus):
+        if segment >= (segment_count + metacarpus):
+            segment = 'END'
+        else:
+            segment = '{:02}'.format(segment + 1 - metacarpus)
+        segments.append('Hand_{side}_{label}_{segment}'.format(
+            side=side, label=label, segment=segment))
+    return tuple(segments)
+
+
+def _plan_fingers(side, finger_count, segment_count, thumb, metacarpus):
+    fingers = []
+    for finger in range(1, finger_count + 1):
+        label = 'finger{}'.format(FINGER_LETTERS[finger])
+        fingers.append((label, _finger_segments(side, label, segment_count, int(metacarpus)), False))
+    if thumb:
+        fingers.append(('thumb', _finger_segments(side, 'thumb', segment_count, 0), True))
+
+    return tuple(
+        Finger(key='Hand_{}_{}'.format(side, label),
+               label=label,
+               segments=segments,
+               driven=tuple(segment for segment in segments
+                            if not segment.endswith(('_00', '_END'))),
+               is_thumb=is_thumb)
+        for label, segments, is_thumb in sorted(fingers, key=lambda finger: finger[0]))
+
+
+def _plan_locators(hand_locator, fingers):
+    """
+    Default guide layout: fingers one unit apart along Z, segments one unit
+    apart along X, the thumb turned in and set in front of the fingers.
+    """
+    locators = []
+    spread = (len(fingers) / 2.0) - 1
+    for finger in fingers:
+        for index, segment in enumerate(finger.segments):
+            if index:
+                locators.append(Transform(segment + '_POS', finger.segments[index - 1] + '_POS',
+                                          (1.0, 0.0, 0.0), (0.0, 0.0, 0.0)))
+            elif finger.is_thumb:
+                locators.append(Transform(segment + '_POS', hand_locator.name,
+                                          (1.0, 0.0, spread + len(fingers)), (0.0, -45.0, 0.0)))
+            else:
+                locators.append(Transform(segment + '_POS', hand_locator.name,
+                                          (2.0, 0.0, spread), (0.0, 0.0, 0.0)))
+        spread -= 1
+    return tuple(locators)
+
+
+def get_world_matrices(transforms, root_matrices=None):
+    """
+    Composes the world matrix of every transform from its local translate and
+    rotate.  Transforms must be ordered parents first.
+
+    Args:
+        transforms (list[Transform]): Transforms to solve.
+        root_matrices (dict): World matrices of parents outside the list.
+
+    Returns:
+        (dict): Name to world matrix.
+
+    """
+    matrices = dict(root_matrices or {})
+    for transform in transforms:
+        local = euler_to_matrix(transform.rotate, transform.translate)
+        parent_matrix = matrices.get(transform.parent, IDENTITY)
+        matrices[transform.name] = multiply(local, parent_matrix)
+    return matrices
+
+
+def _plan_guide_joints(entries, world_matrices, joint_matrices, inverse=1):
+    """
+    Joints follow the guides: positions are the guide world positions, and each
+    joint orient is the guide's rotation relative to its parent guide, with Y
+    and Z flipped for an inverse (mirrored) side.
+
+    Args:
+        entries (list[tuple]): (guide, guide parent, joint, joint parent) names,
+            parents first.
+        world_matrices (dict): Guide world matrices.
+        joint_matrices (dict): World matrices of joint parents outside the
+            entries.  Filled in with every planned joint.
+        inverse (int): -1 for a mirrored side.
+
+    Returns:
+        (list[Joint]): The planned joints.
+
+    """
+    joints = []
+    for guide, guide_parent, joint_name, parent_name in entries:
+        parent_guide_matrix = world_matrices.get(guide_parent, IDENTITY)
+        rx, ry, rz = matrix_to_euler(multiply(world_matrices[guide],
+                                              rigid_inverse(parent_guide_matrix)))
+        orient = (rx, ry * inverse, rz * inverse)
+        parent_matrix = joint_matrices.get(parent_name, IDENTITY)
+        position = world_matrices[guide][3][:3]
+        world = multiply(euler_to_matrix(orient), parent_matrix)
+        world = world[:3] + (tuple(position) + (1.0,),)
+        local_translate = multiply(world, rigid_inverse(parent_matrix))[3][:3]
+        joint_matrices[joint_name] = world
+        joints.append(Joint(joint_name, parent_name, local_translate, orient, world))
+    return joints
+
+
+def _plan_joints(hand_locator, locators, hand_joint_name, inverse, world_matrices):
+    entries = [(hand_locator.name, None, hand_joint_name, None)]
+    entries.extend((locator.name, locator.parent, locator.name[:-len('_POS')] + '_BONE',
+                    hand_joint_name if locator.parent == hand_locator.name
+                    else locator.parent[:-len('_POS')] + '_BONE')
+                   for locator in locators)
+    joints = _plan_guide_joints(entries, world_matrices, {}, inverse)
+    return joints[0], tuple(joints[1:])
+
+
+def _plan_controls(fingers, joints):
+    joint_matrices = dict((joint.name, joint.matrix) for joint in joints)
+    controls = []
+    for finger in fingers:
+        parent = None
+        for segment in finger.segments:
+            if segment.endswith('_END'):
+                continue
+            # Metacarpal segments are only an offset, with no control
+            ctl = None if segment.endswith('_00') else segment + '_CTL'
+            controls.append(Control(segment=segment,
+                                    ofs=segment + '_OFS',
+                                    srt=segment + '_SRT',
+                                    ctl=ctl,
+                                    parent=parent,
+                                    matrix=joint_matrices[segment + '_BONE']))
+            parent = ctl or segment + '_SRT'
+    return tuple(controls)
+
+
+def _plan_hand_attributes(fingers):
+    attrs = [
+        Attribute('IKFK', 'double', (('min_value', 0), ('max_value', 1), ('default_value', 1))),
+        Attribute('spread', 'double', (('min_value', -10), ('max_value', 10))),
+        Attribute('masterRotation', 'double', ()),
+        Attribute('offset', 'double', ()),
+        Attribute('offsetFavor', 'enum', (('default_value', 1),
+                                          ('enum_names', ('Inner', 'Outer')))),
+    ]
+    segment_attrs = sorted('_'.join(segment.split('_')[2:])
+                           for finger in fingers for segment in finger.driven)
+    attrs.extend(Attribute(name, 'double', ()) for name in segment_attrs)
+    attrs.extend(Attribute(finger.label + '_Vis', 'bool', (('default_value', 1),))
+                 for finger in fingers)
+    return tuple(attrs)
+
+
+def plan_hand(side, finger_count, segment_count, thumb=True, metacarpus=False,
+              inverse=False, shape_type='box', hand_shape='triangle', limit_attrs=True):
+    """
+    Plans every node of a hand: guide locators, joints, finger controls, the
+    hand control and its attribute schema.
+
+    Args:
+        side (str): Body side, 'L/M/R'.
+        finger_count (int): The number of fingers, thumb excluded.
+        segment_count (int): The number of segments in each finger.
+        thumb (bool): If building a thumb is needed.
+        metacarpus (bool): Add a metacarpal (_00) segment to each finger.
+        inverse (bool): Mirrored side, flips joint orients and rotations.
+        shape_type (str): Finger control shape.
+        hand_shape (str): Hand control shape.
+        limit_attrs (bool): Lock and hide all but rotation on finger controls.
+
+    Returns:
+        (HandPlan): The hand plan.
+
+    """
+    if finger_count > len(FINGER_LETTERS):
+        raise ValueError('At most {} fingers can be named!'.format(len(FINGER_LETTERS)))
+
+    inverse = -1 if inverse else 1
+    fingers = _plan_fingers(side, finger_count, segment_count, thumb, metacarpus)
+    hand_locator = Transform('Hand_{}_handBase_POS'.format(side), None,
+                             (0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+    locators = _plan_locators(hand_locator, fingers)
+    plan = HandPlan(side=side, inverse=inverse, shape_type=shape_type, hand_shape=hand_shape,
+                    limit_attrs=limit_attrs, fingers=fingers, hand_locator=hand_locator,
+                    locators=locators, hand_joint=None, joints=(), hand_control=None,
+                    controls=(), attributes=_plan_hand_attributes(fingers))
+    return replan_hand_from_guides(plan, get_world_matrices((hand_locator,) + locators))
+
+
+def replan_hand_from_guides(plan, world_matrices):
+    """
+    Returns a copy of the plan with joints and controls solved from guide world
+    matrices, such as the guide locators after they were placed by hand.
+
+    Args:
+        plan (HandPlan): Plan whose guides were placed.
+        world_matrices (dict): Guide locator name to world matrix.
+
+    """
+    hand_joint, joints = _plan_joints(plan.hand_locator, plan.locators,
+                                      'Hand_{}_handBase_BONE'.format(plan.side),
+                                      plan.inverse, world_matrices)
+    hand_control = Control(segment=None, ofs=None, srt=None,
+                           ctl='Hand_{}_handBase_CTL'.format(plan.side),
+                           parent=None, matrix=hand_joint.matrix)
+    return plan._replace(hand_joint=hand_joint, joints=joints, hand_control=hand_control,
+                         controls=_plan_controls(plan.fingers, joints))
+
+
+# Foot -----------------------------------------------------------------#
+REVERSE_FOOT_PARTS = ('bank_out', 'bank_in', 'heel', 'toe', 'ball', 'ankle')
+REVERSE_FOOT_POSITIONS = {
+    'bank_out': (2.0, 0.0, 0.0),
+    'bank_in': (-2.0, 0.0, 0.0),
+    'heel': (0.0, 0.0, -4.0),
+    'toe': (0.0, 0.0, 5.0),
+    'ball': (0.0, 1.0, 2.0),
+    'ankle': (0.0, 5.0, -3.0),
+}
+FOOT_BONES = ('ankle', 'ball', 'toe')
+# Reverse pivots with a control, and the foot attributes that roll and swivel
+# them
+REVERSE_CONTROL_PARTS = ('heel', 'toe', 'ball')
+
+Pivot = namedtuple('Pivot', 'part node ofs srt parent guide is_bank matrix')
+Toe = namedtuple('Toe', 'key label segments')
+IkHandle = namedtuple('IkHandle', 'name start end parent')
+FootPlan = namedtuple('FootPlan', [
+    'prefix', 'toe_shape_type', 'toe_offset', 'limit_attrs', 'guides',
+    'pivots', 'bones', 'ik_handles', 'toe_bend', 'toes', 'toe_joints',
+    'foot_control', 'secondary_control', 'reverse_group', 'reverse_controls',
+    'toe_group', 'toe_controls', 'attributes'])
+
+FOOT_ATTRIBUTES = (
+    Attribute('secondaryVisibility', 'bool', (('default_value', 0), ('keyable', False))),
+    Attribute('reverseControlVisibility', 'bool', (('default_value', 0), ('keyable', False))),
+    Attribute('toeBend', 'double', ()),
+    Attribute('ballRoll', 'double', ()),
+    Attribute('toeRoll', 'double', ()),
+    Attribute('heelRoll', 'double', ()),
+    Attribute('ballSwivel', 'double', ()),
+    Attribute('toeSwivel', 'double', ()),
+    Attribute('heelSwivel', 'double', ()),
+    Attribute('footBank', 'double', ()),
+    Attribute('twistOffset', 'double', ()),
+    Attribute('upperLengthOffset', 'double', ()),
+    Attribute('lowerLengthOffset', 'double', ()),
+)
+
+
+def _plan_toes(prefix, toe_count, segment_count):
+    if toe_count > len(FINGER_LETTERS):
+        raise ValueError('At most {} toes can be named!'.format(len(FINGER_LETTERS)))
+    toes = []
+    for toe in range(1, toe_count + 1):
+        label = 'toe{}'.format(FINGER_LETTERS[toe])
+        segments = ['{}_{}_{:02}'.format(prefix, label, segment + 1)
+                    for segment in range(segment_count)]
+        segments.append('{}_{}_END'.format(prefix, label))
+        toes.append(Toe('{}_{}'.format(prefix, label), label, tuple(segments)))
+    return tuple(toes)
+
+
+def _plan_foot_guides(prefix, toes):
+    """
+    Default guide layout: the reverse pivots at the foot's default positions,
+    and toe bases on the ground in front of the ball, spread across X, with
+    each further segment one unit ahead of the last.
+    """
+    foot_guides = [Transform('{}_{}_POS'.format(prefix, part), None,
+                             REVERSE_FOOT_POSITIONS[part], (0.0, 0.0, 0.0))
+                   for part in REVERSE_FOOT_PARTS]
+    ball_guide = '{}_ball_POS'.format(prefix)
+    ball_x, ball_y, ball_z = REVERSE_FOOT_POSITIONS['ball']
+    spread = len(toes) / 2.0
+    for toe in toes:
+        parent = ball_guide
+        for segment in toe.segments:
+            if parent == ball_guide:
+                translate = (spread - ball_x, -ball_y, 4.0 - ball_z)
+            else:
+                translate = (0.0, 0.0, 1.0)
+            foot_guides.append(Transform(segment + '_POS', parent, translate, (0.0, 0.0, 0.0)))
+            parent = segment + '_POS'
+        spread -= 1
+    return tuple(foot_guides)
+
+
+def _heading_matrix(position, target):
+    """
+    World matrix at position turned about Y only, so X heads towards target.
+    """
+    if target is None:
+        heading = 0.0
+    else:
+        heading = math.degrees(math.atan2(-(target[2] - position[2]), target[0] - position[0]))
+    return euler_to_matrix((0.0, heading, 0.0), position)
+
+
+def plan_foot(prefix='C', toes=False, toe_count=5, toe_segments=1, toe_shape_type='box',
+              toe_offset=False, limit_attrs=True):
+    """
+    Plans every node of a reverse foot: guides, the bank and reverse pivot
+    chain, foot bones and IK handles, toe joints and controls, the foot
+    controls and their attribute schema.
+
+    Args:
+        prefix (str): Name prefix, usually the body side.
+        toes (bool): Build toes.
+        toe_count (int): The number of toes.
+        toe_segments (int): The number of segments in each toe.
+        toe_shape_type (str): Toe control shape.
+        toe_offset (bool): Add an extra offset group above each toe control.
+        limit_attrs (bool): Lock and hide all but rotate X on the toe controls
+            past the first segment.
+
+    Returns:
+        (FootPlan): The foot plan.
+
+    """
+    foot_toes = _plan_toes(prefix, toe_count, toe_segments) if toes else ()
+    foot_guides = _plan_foot_guides(prefix, foot_toes)
+
+    attrs = list(FOOT_ATTRIBUTES)
+    if foot_toes:
+        attrs.append(Attribute('_', 'enum', (('keyable', False), ('enum_names', ('Toes',)))))
+        attrs.extend(Attribute(name, 'double', ()) for name in sorted(
+            segment[len(prefix) + 1:] for toe in foot_toes for segment in toe.segments
+            if not segment.endswith('_END')))
+
+    plan = FootPlan(prefix=prefix, toe_shape_type=toe_shape_type, toe_offset=toe_offset,
+                    limit_attrs=limit_attrs, guides=foot_guides, pivots=(), bones=(),
+                    ik_handles=(), toe_bend='{}_toe_bend_SRT'.format(prefix), toes=foot_toes,
+                    toe_joints=(), foot_control=None,
+                    secondary_control='{}_foot_IK_SCND_CTRL'.format(prefix),
+                    reverse_group='{}_foot_rev_CTRL_GRP'.format(prefix), reverse_controls=(),
+                    toe_group='{}_toe_CTRL_GRP'.format(prefix), toe_controls=(),
+                    attributes=tuple(attrs))
+    return replan_foot_from_guides(plan, get_world_matrices(foot_guides))
+
+
+def replan_foot_from_guides(plan, world_matrices):
+    """
+    Returns a copy of the plan with the pivots, bones, toe joints and controls
+    solved from guide world matrices.
+
+    Args:
+        plan (FootPlan): Plan whose guides were placed.
+        world_matrices (dict): Guide name to world matrix.
+
+    """
+    prefix = plan.prefix
+    positions = dict((part, world_matrices['{}_{}_POS'.format(prefix, part)][3][:3])
+                     for part in REVERSE_FOOT_PARTS)
+
+    # Banks pivot unrotated; each reverse joint heads towards the next one
+    pivots = []
+    parent = None
+    joint_parts = [part for part in REVERSE_FOOT_PARTS if not part.startswith('bank')]
+    for part in REVERSE_FOOT_PARTS:
+        is_bank = part.startswith('bank')
+        if is_bank:
+            node = '{}_{}_rev_PIV'.format(prefix, part)
+            matrix = euler_to_matrix((0.0, 0.0, 0.0), positions[part])
+        else:
+            node = '{}_{}_rev_JNT'.format(prefix, part)
+            index = joint_parts.index(part)
+            target = positions[joint_parts[index + 1]] if index + 1 < len(joint_parts) else None
+            matrix = _heading_matrix(positions[part], target)
+        # Pivots with a control get a group between the offset and the joint
+        # for the foot's roll and swivel
+        srt = node + '_SRT' if part in REVERSE_CONTROL_PARTS else None
+        pivots.append(Pivot(part=part, node=node, ofs=node + '_OFS', srt=srt, parent=parent,
+                            guide='{}_{}_POS'.format(prefix, part), is_bank=is_bank,
+                            matrix=matrix))
+        parent = node
+    pivot_matrices = dict((pivot.part, pivot.matrix) for pivot in pivots)
+
+    bones = []
+    parent = None
+    for part in FOOT_BONES:
+        name = '{}_{}_BONE'.format(prefix, part)
+        parent_matrix = bones[-1].matrix if bones else IDENTITY
+        local = multiply(pivot_matrices[part], rigid_inverse(parent_matrix))
+        bones.append(Joint(name, parent, local[3][:3], matrix_to_euler(local),
+                           pivot_matrices[part]))
+        parent = name
+    ik_handles = (
+        IkHandle('{}_ball_IKH'.format(prefix), bones[0].name, bones[1].name,
+                 '{}_ball_rev_JNT'.format(prefix)),
+        IkHandle('{}_toe_IKH'.format(prefix), bones[1].name, bones[2].name, plan.toe_bend),
+    )
+
+    entries = []
+    for toe in plan.toes:
+        guide_parent = '{}_ball_POS'.format(prefix)
+        joint_parent = bones[-1].name
+        for segment in toe.segments:
+            entries.append((segment + '_POS', guide_parent, segment + '_BONE', joint_parent))
+            guide_parent = segment + '_POS'
+            joint_parent = segment + '_BONE'
+    joint_matrices = dict((bone.name, bone.matrix) for bone in bones)
+    toe_joints = _plan_guide_joints(entries, world_matrices, joint_matrices)
+
+    # Position of the ankle, orientation of the heel
+    foot_matrix = pivot_matrices['heel'][:3] + (tuple(positions['ankle']) + (1.0,),)
+    foot_control = Control(segment=None, ofs='{}_foot_IK_CTRL_OFS'.format(prefix), srt=None,
+                           ctl='{}_foot_IK_CTRL'.format(prefix), parent=None, matrix=foot_matrix)
+
+    reverse_controls = []
+    parent = plan.reverse_group
+    for part in REVERSE_CONTROL_PARTS:
+        ctl = '{}_{}_rev_CTRL'.format(prefix, part)
+        reverse_controls.append(Control(segment=part, ofs=ctl + '_OFS', srt=None, ctl=ctl,
+                                        parent=parent, matrix=pivot_matrices[part]))
+        parent = ctl
+
+    toe_controls = []
+    for toe in plan.toes:
+        parent = plan.toe_group
+        for segment in toe.segments:
+            if segment.endswith('_END'):
+                continue
+            toe_controls.append(Control(segment=segment, ofs=segment + '_ZERO',
+                                        srt=segment + '_SRT', ctl=segment + '_CTRL',
+                                        parent=parent, matrix=joint_matrices[segment + '_BONE']))
+            parent = segment + '_CTRL'
+
+    return plan._replace(pivots=tuple(pivots), bones=tuple(bones), ik_handles=ik_handles,
+                         toe_joints=tuple(toe_joints), foot_control=foot_control,
+                         reverse_controls=tuple(reverse_controls),
+                         toe_controls=tuple(toe_controls))
@@ -1,370 +1,321 @@
 """
-Deprecated auto rig file that probably doesn't work
+Ribbon and spline IK builder for spines, tails and tentacles.  The guide
+positions are the control points of one cubic B-spline; the spline IK curve and
+the ribbon surface are both created from them directly, and the joint and pin
+parameters are solved for the whole chain in one NumPy pass, spaced evenly by
+arc length.  Pins are uvPin nodes (one per ribbon) where Maya supports them and
+follicles otherwise, created in bulk for any joint count.
+
+Example:
+    tail = spine.ribbon_spec('C', tail_positions, joint_count=30, name='tail')
+    spine.build_ribbons([tail])
 """
 
+from collections import namedtuple
+
+from local.basic import api
+from local.basic import node_builder
+from local.rigging.common import chains
+from local.rigging.common import utils as rig_utils
+
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+import numpy as np
+
+DEFAULT_POSITIONS = (
+    (0.0, 10.0, 0.0),
+    (0.0, 11.0, 0.0),
+    (0.0, 12.0, -0.25),
+    (0.0, 13.0, -0.5),
+    (0.0, 14.0, -0.5),
+    (0.0, 15.0, -0.5),
+)
+# Curve samples per control point when measuring arc length
+_LENGTH_SAMPLES = 64
+
+RibbonSpec = namedtuple('RibbonSpec', 'prefix name positions joint_count width side_vector')
+
+_RIBBON_PIN_TEMPLATE = node_builder.NodeGraphTemplate(
+    nodes=[('pin', 'UVP', '{ribbon}_pins')],
+    inputs=['ribbon', 'surface', 'group'],
+    connections=[
+        ('{surface}.worldSpace[0]', '{pin}.deformedGeometry'),
+        # Pins sit under the ribbon group, so they are placed in its space
+        ('{group}.worldInverseMatrix[0]', '{pin}.relativeSpaceMatrix'),
+    ],
+    values=[('{pin}.normalizedIsoParms', 1)])
+
+
+def ribbon_spec(prefix='C', positions=DEFAULT_POSITIONS, joint_count=5, width=1.0,
+                side_vector=(1.0, 0.0, 0.0), name='spine'):
+    """
+    Describes one ribbon to build.
+
+    Args:
+        prefix (str): Name prefix, usually the body side.
+        positions (list[tuple]): World positions of the guides, the control
+            points of the curve and ribbon.
+        joint_count (int): The number of bind joints along the ribbon.
+        width (float): Ribbon width.
+        side_vector (tuple): World direction across the ribbon.
+        name (str): Part name, such as spine or tail.
+
+    Returns:
+        (RibbonSpec): The ribbon spec.
+
+    """
+    if joint_count < 2:
+        raise ValueError('A ribbon needs at least 2 joints!')
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    if len(positions) < 2:
+        raise ValueError('A ribbon needs at least 2 guide positions!')
+    return RibbonSpec(prefix, name, positions, joint_count, width,
+                      np.asarray(side_vector, dtype=np.float64))
+
+
+def get_degree(cv_count):
+    return min(3, cv_count - 1)
+
+
+def get_knots(cv_count, degree):
+    """
+    Clamped uniform knots normalized to 0-1, in Maya's form (no end knots
+    beyond the degree).
+    """
+    spans = cv_count - degree
+    return [0.0] * (degree - 1) + np.linspace(0.0, 1.0, spans + 1).tolist() + [1.0] * (degree - 1)
+
+
+def evaluate_bspline(cvs, parameters, degree=3):
+    """
+    Points of a clamped uniform B-spline at any number of parameters.
+
+    Args:
+        cvs (np.ndarray): (n, 3) control points.
+        parameters (np.ndarray): Parameters in 0-1.
+        degree (int): Curve degree.
+
+    Returns:
+        (np.ndarray): (m, 3) points.
+
+    """
+    cv_count = len(cvs)
+    knots = np.array([0.0] + get_knots(cv_count, degree) + [1.0])
+    u = np.asarray(parameters, dtype=np.float64)[:, np.newaxis]
+
+    basis = ((knots[:-1] <= u) & (u < knots[1:])).astype(np.float64)
+    # The end parameter belongs to the last span
+    end = u[:, 0] >= knots[-1]
+    basis[end] = 0.0
+    basis[end, cv_count - 1] = 1.0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for level in range(1, degree + 1):
+            left = np.nan_to_num((u - knots[:-level - 1]) / (knots[level:-1] - knots[:-level - 1]))
+            right = np.nan_to_num((knots[level + 1:] - u) / (knots[level + 1:] - knots[1:-level]))
+            basis = left * basis[:, :-1] + right * basis[:, 1:]
+    return basis.dot(cvs)
+
+
+def get_arc_length_parameters(cvs, count, degree=3):
+    """
+    Parameters of count points spaced evenly by length along a B-spline, from
+    its first point to its last.
+    """
+    samples = np.linspace(0.0, 1.0, len(cvs) * _LENGTH_SAMPLES)
+    points = evaluate_bspline(cvs, samples, degree=degree)
+    lengths = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+    return np.interp(np.linspace(0.0, lengths[-1], count), lengths, samples)
+
+
+def get_ribbon_cvs(cvs, side_vector, width):
+    """
+    Surface control points for a ribbon centred on a curve: two rows, V
+    varying fastest, so the middle of V is the curve itself.
+    """
+    offset = side_vector / np.linalg.norm(side_vector) * width * 0.5
+    return np.stack([cvs - offset, cvs + offset], axis=1).reshape(-1, 3)
+
+
+def get_joint_positions(spec):
+    """
+    Returns the ribbon parameter and world position of each joint of a spec.
+    """
+    degree = get_degree(len(spec.positions))
+    parameters = get_arc_length_parameters(spec.positions, spec.joint_count, degree=degree)
+    return parameters, evaluate_bspline(spec.positions, parameters, degree=degree)
+
+
+def _part(spec, suffix):
+    return '{}_{}_{}'.format(spec.prefix, spec.name, suffix)
+
+
+def _indexed(spec, index, suffix):
+    return '{}_{}_{:02}_{}'.format(spec.prefix, spec.name, index + 1, suffix)
+
+
+def create_ribbon_geometry(specs):
+    """
+    Creates the group, ribbon surface and spline IK curve of every ribbon.
+
+    Returns:
+        (list[tuple]): (group, surface, surface shape, curve) names for each
+            ribbon.
+
+    """
+    names = []
+    parents = []
+    for spec in specs:
+        names.extend([_part(spec, 'GRP'), _part(spec, 'SRF'), _part(spec, 'CRV')])
+        parents.extend([None, len(names) - 3, len(names) - 3])
+    transforms = api.create_dag_nodes('transform', names, parents=parents)
+
+    surface_fn = om.MFnNurbsSurface()
+    curve_fn = om.MFnNurbsCurve()
+    built = []
+    shapes = []
+    for index, spec in enumerate(specs):
+        group, surface, curve = transforms[index * 3:index * 3 + 3]
+        degree = get_degree(len(spec.positions))
+        knots = get_knots(len(spec.positions), degree)
+        surface_shape = surface_fn.create(
+            om.MPointArray(get_ribbon_cvs(spec.positions, spec.side_vector, spec.width).tolist()),
+            knots, [0.0, 1.0], degree, 1, om.MFnNurbsSurface.kOpen, om.MFnNurbsSurface.kOpen,
+            False, surface)
+        curve_shape = curve_fn.create(om.MPointArray(spec.positions.tolist()), knots, degree,
+                                      om.MFnNurbsCurve.kOpen, False, False, curve)
+        shapes.extend([surface_shape, curve_shape])
+        built.append(tuple(api.get_name(mobject)
+                           for mobject in (group, surface, surface_shape, curve)))
+    api.record_created_nodes(shapes)
+    return built
+
+
+def create_ribbon_pins(specs, surfaces, use_uv_pin=None):
+    """
+    Creates a pin transform per joint on every ribbon, placed at parameters
+    spaced evenly along the ribbon's length.  With uvPin each ribbon gets one
+    uvPin node carrying every coordinate; otherwise each pin gets a follicle.
+
+    Args:
+        specs (list[RibbonSpec]): Ribbons to pin.
+        surfaces (list[str]): The ribbon surface shape of each spec.
+        use_uv_pin (bool): Build uvPins.  Defaults to using them when Maya
+            supports them.
+
+    Returns:
+        (list[list[str]]): The pins of each ribbon.
+
+    """
+    if use_uv_pin is None:
+        use_uv_pin = (node_builder.get_maya_api_version()
+                      >= rig_utils.OFFSET_PARENT_MATRIX_API_VERSION)
+
+    names = []
+    parents = []
+    for spec in specs:
+        names.extend(_indexed(spec, index, 'PIN') for index in range(spec.joint_count))
+        parents.extend([_part(spec, 'GRP')] * spec.joint_count)
+    mobjects = api.create_dag_nodes('transform', names, parents=parents)
+    pin_names = [api.get_name(mobject) for mobject in mobjects]
+
+    pins = []
+    for spec in specs:
+        pins.append(pin_names[:spec.joint_count])
+        pin_names = pin_names[spec.joint_count:]
+    parameters = [get_joint_positions(spec)[0].tolist() for spec in specs]
+
+    plug_values = []
+    connections = []
+    if use_uv_pin:
+        uv_pins = _RIBBON_PIN_TEMPLATE.build([{'ribbon': _part(spec, 'ribbon'), 'surface': surface,
+                                               'group': _part(spec, 'GRP')}
+                                              for spec, surface in zip(specs, surfaces)])
+        for ribbon_pins, ribbon_parameters, nodes in zip(pins, parameters, uv_pins):
+            for index, (pin, parameter) in enumerate(zip(ribbon_pins, ribbon_parameters)):
+                plug_values.append(('{}.coordinate[{}]'.format(nodes['pin'], index),
+                                    (parameter, 0.5)))
+                connections.append(('{}.outputMatrix[{}]'.format(nodes['pin'], index),
+                                    pin + '.offsetParentMatrix'))
+    else:
+        flat_pins = [pin for ribbon_pins in pins for pin in ribbon_pins]
+        follicles = api.create_dag_nodes('follicle', [pin + 'Shape' for pin in flat_pins],
+                                         parents=mobjects)
+        follicles = iter([api.get_name(mobject) for mobject in follicles])
+        for ribbon_pins, ribbon_parameters, surface in zip(pins, parameters, surfaces):
+            for pin, parameter in zip(ribbon_pins, ribbon_parameters):
+                follicle = next(follicles)
+                # Follicles output world space, so the pin ignores the group
+                plug_values.append((pin + '.inheritsTransform', False))
+                plug_values.append((follicle + '.parameterU', parameter))
+                plug_values.append((follicle + '.parameterV', 0.5))
+                connections.extend([
+                    (surface + '.local', follicle + '.inputSurface'),
+                    (surface + '.worldMatrix[0]', follicle + '.inputWorldMatrix'),
+                    (follicle + '.outTranslate', pin + '.t'),
+                    (follicle + '.outRotate', pin + '.r'),
+                ])
+
+    api.set_plug_values(plug_values)
+    api.connect_plugs(connections)
+    return pins
+
+
+def build_ribbons(specs, use_uv_pin=None, spline_ik=True):
+    """
+    Builds any number of ribbons, each step running once over every ribbon: the
+    surfaces and curves, the pins and their bind joints, and the spline IK
+    chains that deform the ribbons.
+
+    Args:
+        specs (list[RibbonSpec]): Ribbons to build, see ribbon_spec.
+        use_uv_pin (bool): Pin with uvPin rather than follicles, see
+            create_ribbon_pins.
+        spline_ik (bool): Build a spline IK chain on the curve and skin the
+            ribbon to it.
+
+    Returns:
+        (list[dict]): The group, surface, curve, pins, joints, ik_joints and
+            ik_handle of each ribbon.
+
+    """
+    geometry = create_ribbon_geometry(specs)
+    pins = create_ribbon_pins(specs, [shape for _, _, shape, _ in geometry],
+                              use_uv_pin=use_uv_pin)
+
+    joint_names = [pin.replace('_PIN', '_JNT') for ribbon_pins in pins for pin in ribbon_pins]
+    api.create_dag_nodes('joint', joint_names, parents=[pin for ribbon_pins in pins
+                                                       for pin in ribbon_pins])
+
+    ik_chains = [[] for _ in specs]
+    if spline_ik:
+        chain_specs = []
+        for spec in specs:
+            _, positions = get_joint_positions(spec)
+            chain_specs.append(chains.chain_spec(
+                [_indexed(spec, index, 'IK_JNT') for index in range(spec.joint_count)],
+                positions, up_vector=tuple(spec.side_vector), root=_part(spec, 'GRP')))
+        ik_chains = chains.create_chains(chain_specs)
+
+    built = []
+    for spec, (group, surface, _, curve), ribbon_pins, ik_joints in zip(specs, geometry, pins,
+                                                                     ik_chains):
+        ik_handle = None
+        if ik_joints:
+            ik_handle = cmds.ikHandle(startJoint=ik_joints[0], endEffector=ik_joints[-1],
+                                      solver='ikSplineSolver', curve=curve, createCurve=False,
+                                      parentCurve=False, name=_part(spec, 'IKH'))[0]
+            cmds.parent(ik_handle, group)
+            cmds.skinCluster(ik_joints, surface, toSelectedBones=True,
+                             name=_part(spec, 'SKN'))
+        built.append({'group': group, 'surface': surface, 'curve': curve, 'pins': ribbon_pins,
+                      'joints': [pin.replace('_PIN', '_JNT') for pin in ribbon_pins],
+                      'ik_joints': ik_joints, 'ik_handle': ik_handle})
+    return built
+
 
-# from ...basic import curve_builder
-# from ...basic import attributes
-# from ...basic import node_builder
-# from ...basic import utils
-# from ...basic import renamer
-#
-# import maya.cmds as cmds
-#
-# default_positions = [
-#     [0, 10, 0],
-#     [0, 11, 0],
-#     [0, 12, -0.25],
-#     [0, 13, -0.5],
-#     [0, 14, -0.5],
-#     [0, 15, -0.5]
-# ]
-#
-# spine_drivers = ['pelvis', 'hips', 'chest_IK', 'chest_FK']
-# spine_shapes = ['circle', 'circle', 'octagon', 'circle']
-# spine_driver_jnt_list = []
-#
-# cog_attribute_dict = {
-#     'secondaryVisibility': ['bool', None, None, 0, False, None],
-#     'spineControlVisibility': ['bool', None, None, 0, False, None],
-#     'spineIKFK': ['double', 0, 1, 0, True, None],
-# }
-#
-# spine_locator_list = []
-# locator_world_positions = []
-# ik_bind_list = []
-# fk_bind_list = []
-# ik_spine_bones = []
-# fk_spine_bones = []
-# spine_blendshape = []
-#
-#
-# def build_spine_library():
-#     pass
-#
-#
-# def create_spine_locators(prefix='C'):
-#     parent_locator = None
-#     for loc in range(6):
-#         point = cmds.spaceLocator(name='%s_spine_0%s_LOC' % (prefix, str(loc)))
-#         cmds.xform(point, translation=default_positions[loc], worldSpace=True)
-#         if parent_locator:
-#             cmds.parent(point, parent_locator)
-#         parent_locator = point
-#         if loc == 5:
-#             cmds.xform(point[0], scale=[0.25, 0.25, 0.25])
-#             end = cmds.rename(point[0], point[0].replace('05', 'END'))
-#             spine_locator_list.append(end)
-#             break
-#         spine_locator_list.append(point[0])
-#
-#
-# def build_spine_system(bind_joint_count=5, prefix='C'):
-#     # Creating a list of the locator positions
-#     end_world_position = None
-#     for loc in spine_locator_list:
-#         if 'END' in loc:
-#             end_world_position = cmds.getAttr(loc + '.worldPosition[0]')[0]
-#             continue
-#         point_world_position = cmds.getAttr(loc + '.worldPosition[0]')[0]
-#         locator_world_positions.append(point_world_position)
-#
-#     # Building Spine Curve
-#     spine_crv = cmds.curve(degree=3,
-#                            point=locator_world_positions,
-#                            name='%s_spine_base_CRV' % prefix)
-#     locator_world_positions.append(end_world_position)
-#
-#     cmds.rebuildCurve(spine_crv,
-#                       constructionHistory=False,
-#                       end=True,
-#                       degree=3,
-#                       spans=bind_joint_count-1,
-#                       replaceOriginal=True)
-#
-#     # Building Spine Ribbon
-#     left_duplicate_crv = cmds.duplicate(spine_crv,
-#                                         name='%s_lt_spine_ref_CRV' % prefix)
-#     # Check that these directions are correct.  Mostly irrelevant though
-#     cmds.xform(left_duplicate_crv, translation=[0.5, 0, 0], worldSpace=True)
-#     right_duplicate_crv = cmds.duplicate(spine_crv,
-#                                          name='%s_rt_spine_ref_CRV' % prefix)
-#     cmds.xform(right_duplicate_crv, translation=[-0.5, 0, 0], worldSpace=True)
-#
-#     # Building the Ribbons
-#     spine_ribbon = cmds.loft(left_duplicate_crv, right_duplicate_crv,
-#                              name='%s_spine_ribbon_SRF' % prefix,
-#                              uniform=True,
-#                              constructionHistory=False,
-#                              polygon=0,
-#                              reverseSurfaceNormals=True)[0]
-#
-#     cmds.group(spine_crv, left_duplicate_crv, right_duplicate_crv,
-#                name=prefix + '_spine_ref_CRV_GRP')
-#
-#     # Ribbon blendshapes
-#     ik_ribbon = cmds.duplicate(spine_ribbon,
-#                                name=spine_ribbon.replace('SRF', 'IK_SHP'))
-#     fk_ribbon = cmds.duplicate(spine_ribbon,
-#                                name=spine_ribbon.replace('SRF', 'FK_SHP'))
-#
-#     # Building the follicles and bones
-#     ribbon.build_ribbon(spine_ribbon,
-#                         span_align='edge',
-#                         override_ctrls=False,
-#                         ribbon_name='spine_ribbon')
-#
-#     # Influence blendshape
-#     spine_shp = cmds.blendShape(fk_ribbon, ik_ribbon, spine_ribbon,
-#                                 name=spine_ribbon.replace('SRF', 'IKFK_BSHP'))
-#     spine_blendshape.append(spine_shp[0])
-#
-#     # Building driver joint chains
-#     ik_parent = None
-#     fk_parent = None
-#     ik_end = None
-#     fk_end = None
-#     driver_kill_list = []
-#     for jnt in range(6):
-#         # End joint condition
-#         if jnt == 5:
-#             cmds.select(clear=True)
-#             ik_jnt = cmds.joint(name='%s_spine_driver_END_IK_JNT' % prefix)
-#             cmds.select(clear=True)
-#             fk_jnt = cmds.joint(name='%s_spine_driver_END_FK_JNT' % prefix)
-#             cmds.xform(ik_jnt, fk_jnt,
-#                        translation=locator_world_positions[3],
-#                        worldSpace=True)
-#             ik_end = ik_jnt
-#             fk_end = fk_jnt
-#         # All other joint condition
-#         else:
-#             cmds.select(clear=True)
-#             ik_jnt = cmds.joint(name='%s_spine_driver_0%s_IK_JNT' %
-#                                      (prefix, str(jnt)))
-#             cmds.select(clear=True)
-#             fk_jnt = cmds.joint(name='%s_spine_driver_0%s_FK_JNT' %
-#                                      (prefix, str(jnt)))
-#
-#             cmds.xform(ik_jnt, fk_jnt,
-#                        translation=locator_world_positions[jnt],
-#                        worldSpace=True)
-#             # Setting the 3rd and 4th joints to be deleted (replaced with chest)
-#             if jnt == 3 or jnt == 4:
-#                 driver_kill_list.append(ik_jnt)
-#                 driver_kill_list.append(fk_jnt)
-#             if jnt == 0:
-#                 spine_driver_jnt_list.append(ik_jnt)
-#                 spine_driver_jnt_list.append(fk_jnt)
-#         # Setting the parent joint from previous loop
-#         if ik_parent and fk_parent:
-#             cmds.parent(ik_jnt, ik_parent)
-#             cmds.parent(fk_jnt, fk_parent)
-#         # Avoid deleting the ends too early so that the joints can be oriented
-#         if ik_end and fk_end:
-#             cmds.parent(ik_end, ik_spine_bones[2])
-#             cmds.parent(fk_end, fk_spine_bones[2])
-#             continue
-#         ik_spine_bones.append(ik_jnt)
-#         fk_spine_bones.append(fk_jnt)
-#         ik_parent = ik_jnt
-#         fk_parent = fk_jnt
-#
-#     # Building the
-#     for driver in spine_drivers:
-#         if 'chest' in driver:
-#             cmds.select(clear=True)
-#             driver_jnt = cmds.joint(
-#                 name='%s_%s_JNT' % (prefix, driver))
-#             temp_cns = cmds.pointConstraint(
-#                 '%s_spine_driver_03_IK_JNT' % prefix,
-#                 '%s_spine_driver_04_IK_JNT' % prefix,
-#                 driver_jnt,
-#                 mo=False)
-#             cmds.delete(temp_cns)
-#             if 'IK' in driver:
-#                 ik_spine_bones.append(driver_jnt)
-#             else:
-#                 fk_spine_bones.append(driver_jnt)
-#             spine_driver_jnt_list.append(driver_jnt)
-#         else:
-#             cmds.select(clear=True)
-#             spine_driver = cmds.joint(name='%s_%s_JNT' % (prefix, driver))
-#             cmds.xform(spine_driver,
-#                        translation=locator_world_positions[0],
-#                        worldSpace=True)
-#             ik_spine_bones.append(spine_driver)
-#             fk_spine_bones.append(spine_driver)
-#             spine_driver_jnt_list.append(spine_driver)
-#
-#     # Killing the unnecessary joints made by the loops
-#     i = 0
-#     for trash in driver_kill_list:
-#         if trash in ik_spine_bones:
-#             ik_spine_bones.remove(trash)
-#         i = i + 1
-#     for trash in driver_kill_list:
-#         if trash in fk_spine_bones:
-#             fk_spine_bones.remove(trash)
-#         i = i + 1
-#
-#     cmds.delete(driver_kill_list)
-#
-#     # Orienting the driver joints
-#     cmds.joint('%s_spine_driver_00_IK_JNT' % prefix,
-#                '%s_spine_driver_00_FK_JNT' % prefix,
-#                edit=True,
-#                orientJoint='xzy',
-#                secondaryAxisOrient='xup',
-#                children=True,
-#                zeroScaleOrient=True)
-#
-#     cmds.delete(ik_end, fk_end)
-#
-#     # Add a dropoff rate later if it makes sense
-#     ik_skin = cmds.skinCluster(ik_spine_bones, ik_ribbon, toSelectedBones=True)
-#     fk_skin = cmds.skinCluster(fk_spine_bones, fk_ribbon, toSelectedBones=True)
-#
-#     # Creating a list of the objects that influence the ribbon skins
-#     ik_skin_connections = cmds.listConnections(ik_skin, source=True)
-#     for item in ik_skin_connections:
-#         if item in ik_bind_list:
-#             continue
-#         if 'JNT' in ik_skin_connections:
-#             ik_bind_list.append(item)
-#
-#     fk_skin_connections = cmds.listConnections(fk_skin, source=True)
-#     for item in fk_skin_connections:
-#         if item in fk_bind_list:
-#             continue
-#         if 'JNT' in fk_skin_connections:
-#             fk_bind_list.append(item)
-#
-#     # Add something to force even weights to the ribbon influence
-#
-#
-# def create_spine_controls(prefix='C', control_colors=('yellow', 'orange')):
-#     # Building a COG control to be the center of everything
-#     cog_scnd_ctrl = cmds.group(empty=True, name=prefix + '_COG_SCND_CTRL')
-#     cog_scnd_shape = crv.add_curve_shape(shape_choice='box',
-#                                          transform_node=cog_scnd_ctrl,
-#                                          color=control_colors[0],
-#                                          off_color=True)
-#     cmds.xform(cog_scnd_ctrl + '.cv[0:]', scale=[2.2, 0.6, 2.2])
-#     cog_ctrl = cmds.group(cog_scnd_ctrl, name=prefix + '_COG_CTRL')
-#     crv.add_curve_shape(shape_choice='box',
-#                         transform_node=cog_ctrl,
-#                         color=control_colors[0])
-#     cmds.xform(cog_ctrl + '.cv[0:]', scale=[2, 0.5, 2])
-#     cog_offset = tool.create_offset(input_object=cog_ctrl)
-#     tool.match_transformations(rotation=False,
-#                                source=prefix + '_pelvis_JNT',
-#                                target=cog_offset)
-#     for attribute in cog_attribute_dict:
-#         attr.create_attr(attribute,
-#                          attribute_type=cog_attribute_dict[attribute][0],
-#                          input_object=cog_ctrl,
-#                          min_value=cog_attribute_dict[attribute][1],
-#                          max_value=cog_attribute_dict[attribute][2],
-#                          default_value=cog_attribute_dict[attribute][3],
-#                          keyable=cog_attribute_dict[attribute][4],
-#                          enum_names=cog_attribute_dict[attribute][5])
-#
-#     # Main body controls
-#     ik_vis = []
-#     i = 0
-#     for ctrl in spine_drivers:
-#         control = cmds.group(empty=True, name='%s_%s_CTRL' % (prefix, ctrl))
-#         zero = tool.create_offset(input_object=control)
-#         tool.create_offset(suffix='OFS', input_object=control)
-#         tool.match_transformations(source=control.replace('CTRL', 'JNT'),
-#                                    target=zero)
-#         if 'IK' not in ctrl:
-#             crv.add_curve_shape(shape_choice=spine_shapes[i],
-#                                 transform_node=control,
-#                                 color=control_colors[0])
-#         else:
-#             crv.add_curve_shape(shape_choice=spine_shapes[i],
-#                                 transform_node=control,
-#                                 color=control_colors[1])
-#             ik_vis.append(zero)
-#         cmds.parentConstraint(control, control.replace('CTRL', 'JNT'), mo=True)
-#         if 'chest' not in ctrl:
-#             cmds.parent(zero, cog_scnd_ctrl)
-#         i = i + 1
-#
-#     ikfk_shapes_vis_list = []
-#     # IK spine controls
-#     ik_parent = prefix + '_pelvis_CTRL'
-#     for jnt in ik_spine_bones:
-#         if 'spine' not in jnt or '00' in jnt:
-#             continue
-#         ik_ctrl = cmds.group(empty=True, name=jnt.replace('JNT', 'CTRL'))
-#         ik_offset = tool.create_offset(input_object=ik_ctrl)
-#         shape = crv.add_curve_shape(shape_choice='octagon',
-#                                     transform_node=ik_ctrl,
-#                                     color=control_colors[1],
-#                                     shape_offset=[0, 0, 90])
-#         tool.match_transformations(source=jnt, target=ik_offset)
-#         cmds.parentConstraint(ik_ctrl, jnt, mo=False)
-#         cmds.parent(ik_offset, ik_parent)
-#         ikfk_shapes_vis_list.append(shape)
-#         ik_vis.append(ik_offset)
-#         if '02' in jnt:
-#             cmds.parentConstraint(ik_parent,
-#                                   prefix + '_chest_IK_CTRL',
-#                                   ik_offset,
-#                                   mo=True)
-#
-#     # FK spine controls
-#     fk_ctrl = None
-#     fk_parent = None
-#     fk_vis = []
-#     for jnt in fk_spine_bones:
-#         if 'spine' not in jnt or '00' in jnt:
-#             continue
-#         fk_ctrl = cmds.group(empty=True, name=jnt.replace('JNT', 'CTRL'))
-#         fk_offset = tool.create_offset(input_object=fk_ctrl)
-#         fk_vis.append(fk_offset)
-#         shape = crv.add_curve_shape(shape_choice='circle',
-#                                     transform_node=fk_ctrl,
-#                                     color=control_colors[0],
-#                                     shape_offset=[0, 0, 90])
-#         tool.match_transformations(source=jnt, target=fk_offset)
-#         cmds.parentConstraint(fk_ctrl, jnt, mo=False)
-#         ikfk_shapes_vis_list.append(shape)
-#         if fk_parent:
-#             cmds.parent(fk_offset, fk_parent)
-#         else:
-#             cmds.parent(fk_offset, ik_parent)
-#         fk_parent = fk_ctrl
-#
-#     cmds.parent(prefix + '_chest_IK_CTRL_ZERO', cog_scnd_ctrl)
-#     cmds.parent(prefix + '_chest_FK_CTRL_ZERO', fk_ctrl)
-#
-#     cmds.connectAttr(cog_ctrl + '.secondaryVisibility', cog_scnd_shape + '.v')
-#     spine_rev = node.create_node(node_key='REV',
-#                                  name=prefix + '_spineIKFK_blend')
-#     cmds.connectAttr(cog_ctrl + '.spineIKFK', spine_rev + '.inputX')
-#     for shape in ikfk_shapes_vis_list:
-#         vis_factor = node.create_node(node_key='MDL', name=shape)
-#         cmds.connectAttr(cog_ctrl + '.spineControlVisibility',
-#                          vis_factor + '.input1')
-#         if 'FK' not in shape:
-#             # IK vis
-#             cmds.connectAttr(cog_ctrl + '.spineIKFK', vis_factor + '.input2')
-#         else:
-#             # FK vis
-#             cmds.connectAttr(spine_rev + '.outputX', vis_factor + '.input2')
-#         cmds.connectAttr(vis_factor + '.output', shape + '.v')
-#
-#     cmds.connectAttr(spine_rev + '.outputX',
-#                      '%s_%s_CTRLShape.v' % (prefix, spine_drivers[3]))
-#     cmds.connectAttr(cog_ctrl + '.spineIKFK',
-#                      '%s_%s_CTRLShape.v' % (prefix, spine_drivers[2]))
-#
-#     # In blendshape node, weight[0] is FK and weight[1] is IK
-#     cmds.connectAttr(spine_rev + '.outputX', spine_blendshape[0] + '.weight[0]')
-#     cmds.connectAttr(cog_ctrl + '.spineIKFK', spine_blendshape[0] + '.weight[1]')
-#
-#     cmds.group(spine_driver_jnt_list, name=prefix + '_spine_driver_JNT_GRP')
+def build_spine(prefix='C', positions=DEFAULT_POSITIONS, joint_count=5, **kwargs):
+    """
+    Builds a single spine ribbon.  See ribbon_spec for the arguments.
+    """
+    return build_ribbons([ribbon_spec(prefix, positions, joint_count=joint_count, **kwargs)])[0]
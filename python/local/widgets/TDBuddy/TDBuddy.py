@@ -9,37 +9,135 @@ except ImportError:
     from shiboken import wrapInstance
 
 import importlib
+import os
+import sys
+import time
 
-from local.widgets.common.splitter import Splitter, SplitterLayout
-from local.basic import attributes
-from local.basic import node_builder
-from local.basic import utils
-from local.rigging.common import setup as rig_setup
-from local.basic import curve_builder
-from local.basic import renamer
-from local.rigging.common import utils as rig_utils
-from local.rigging.common import hierarchy
-from local.widgets.TDBuddy import global_widget
+from local.widgets.common.splitter import SplitterLayout
+from local.widgets.common.tool_context import TOOL_CONTEXTS
 
 # Dockable options
 from maya.app.general.mayaMixin import MayaQWidgetDockableMixin, MayaQDockWidget
 
-# Reload frequently edited modules for fast edits
-importlib.reload(global_widget)
-importlib.reload(attributes)
-importlib.reload(node_builder)
-importlib.reload(utils)
-importlib.reload(rig_setup)
-importlib.reload(curve_builder)
-importlib.reload(renamer)
-importlib.reload(rig_utils)
-importlib.reload(hierarchy)
+# Reload each tool module the first time a window loads it, for fast edits.
+# Off unless TDBUDDY_DEV_RELOAD=1 is set, since reloading costs seconds.
+DEV_RELOAD = os.environ.get('TDBUDDY_DEV_RELOAD') == '1'
+
+TABS = ('General', 'Controls', 'Viewport', 'Custom')
+
+# (tab, title, module, widget class, expanded) of every tool section, in
+# display order.  A section's module is only imported when the section is first
+# expanded; expanded sections load right after the window opens.  Sections
+# without a tab sit above the tabs.
+SECTIONS = (
+    (None, 'Global Tools', 'local.widgets.TDBuddy.global_widget', 'GlobalToolWidget', True),
+    ('General', 'Naming', 'local.basic.renamer', 'NamingWidget', False),
+    ('General', 'Edit Attribute', 'local.basic.attributes', 'AttributeWidget', False),
+    ('General', 'Create Attribute', 'local.basic.attributes', 'AddAttributesWidget', False),
+    ('General', 'Nodes', 'local.basic.node_builder', 'NodeWidget', False),
+    ('Controls', 'Create Controls', 'local.basic.curve_builder', 'ControlCurveWidget', False),
+    ('Controls', 'Offsets', 'local.basic.utils', 'OffsetNodeWidget', False),
+    ('Controls', 'Transformations', 'local.basic.utils', 'TransformWidget', False),
+    ('Controls', 'Create Rig', 'local.rigging.common.setup', 'CreateRigWidget', False),
+    ('Controls', 'Constraints', 'local.rigging.common.utils', 'ConstraintWidget', False),
+    ('Controls', 'Hierarchy Tree', 'local.rigging.common.hierarchy', 'HierarchyTreeWidget', False),
+    ('Controls', 'Rivet (WIP)', 'local.rigging.common.utils', 'RivetWidget', False),
+    ('Controls', 'Pole Vector Solver (WIP)', 'local.rigging.common.utils', 'PVWidget', False),
+    ('Viewport', 'Isolate Options', 'local.basic.utils', 'IsolateSelectionWidget', False),
+)
+
+# Seconds spent importing each tool module, reported as they load
+import_times = {}
+
+
+def load_module(module_name, reload=False):
+    """
+    Imports a tool module, timing and reporting the import the first time.
+
+    Args:
+        module_name (str): Module to import.
+        reload (bool): Reload the module if it is already imported.
+
+    Returns:
+        (module): The module.
+
+    """
+    start = time.time()
+    if module_name in sys.modules:
+        module = sys.modules[module_name]
+        if not reload:
+            return module
+        module = importlib.reload(module)
+    else:
+        module = importlib.import_module(module_name)
+    import_times[module_name] = time.time() - start
+    print('TD Buddy: {} {} in {:.1f} ms'.format('reloaded' if reload else 'imported',
+                                                module_name, import_times[module_name] * 1000))
+    return module
+
+
+class LazySection(QtWidgets.QWidget):
+    """
+    Collapsible tool section whose widget is built the first time it opens.
+
+    Args:
+        title (str): Section header.
+        module_name (str): Module holding the tool widget.
+        widget_name (str): Tool widget class.
+        reload_modules (set): Modules the window has reloaded in dev mode,
+            shared by its sections.  None to never reload.
+
+    """
+
+    def __init__(self, title, module_name, widget_name, reload_modules=None):
+        QtWidgets.QWidget.__init__(self)
+        self.module_name = module_name
+        self.widget_name = widget_name
+        self.reload_modules = reload_modules
+        self.tool_widget = None
+
+        self.setLayout(QtWidgets.QVBoxLayout())
+        self.layout().setContentsMargins(0, 0, 0, 0)
+        self.layout().setSpacing(2)
+
+        self.header = QtWidgets.QToolButton()
+        self.header.setText(title)
+        self.header.setCheckable(True)
+        self.header.setArrowType(QtCore.Qt.RightArrow)
+        self.header.setToolButtonStyle(QtCore.Qt.ToolButtonTextBesideIcon)
+        self.header.setAutoRaise(True)
+        self.header.toggled.connect(self.set_expanded)
+        self.layout().addWidget(self.header)
+
+    def build(self):
+        if self.tool_widget is not None:
+            return self.tool_widget
+
+        reload = False
+        if self.reload_modules is not None and self.module_name not in self.reload_modules:
+            self.reload_modules.add(self.module_name)
+            reload = True
+        module = load_module(self.module_name, reload=reload)
+        self.tool_widget = getattr(module, self.widget_name)()
+        self.layout().addWidget(self.tool_widget)
+        return self.tool_widget
+
+    def set_expanded(self, expanded):
+        if self.header.isChecked() != expanded:
+            # Toggling the header calls back in here
+            self.header.setChecked(expanded)
+            return
+        self.header.setArrowType(QtCore.Qt.DownArrow if expanded else QtCore.Qt.RightArrow)
+        if expanded:
+            self.build()
+        if self.tool_widget is not None:
+            self.tool_widget.setVisible(expanded)
 
 
 class TDBuddy(MayaQWidgetDockableMixin, QtWidgets.QDialog):
     window_name = 'TD Buddy'
 
-    def __init__(self, parent=None, ss_path=''):  # set default ss if made
+    def __init__(self, parent=None, ss_path='', dev_reload=None):  # set default ss if made
         super(TDBuddy, self).__init__(parent=parent)
         self.setWindowFlags(QtCore.Qt.WindowStaysOnTopHint)
         self.setWindowTitle(self.window_name)
@@ -76,14 +174,10 @@ class TDBuddy(MayaQWidgetDockableMixin, QtWidgets.QDialog):
         text_layout.addWidget(example_label)
         text_layout.addWidget(example_line_edit)
 
-        # self.layout().addWidget(Splitter('Global Tools'))
-
-        global_tools_layout = QtWidgets.QHBoxLayout()
-        global_tools_layout.setSpacing(5)
-        self.layout().addLayout(global_tools_layout)
-
-        global_tools_widget = global_widget.GlobalToolWidget()
-        global_tools_layout.addWidget(global_tools_widget)
+        # Sections above the tabs ----------------------------------------------
+        top_layout = QtWidgets.QVBoxLayout()
+        top_layout.setSpacing(5)
+        self.layout().addLayout(top_layout)
         self.layout().addLayout(SplitterLayout())
 
         # Tabs Layout ----------------------------------------------------------
@@ -94,166 +188,52 @@ class TDBuddy(MayaQWidgetDockableMixin, QtWidgets.QDialog):
         tab_widget.setTabPosition(tab_widget.West)
         tab_layout.addWidget(tab_widget)
 
-        # Rigging categories
-        general_tools_layout = QtWidgets.QVBoxLayout()
-        # skeleton_tools_layout = QtWidgets.QVBoxLayout()
-        # deformer_tools_layout = QtWidgets.QVBoxLayout()
-        # skinning_tools_layout = QtWidgets.QVBoxLayout()
-        control_tools_layout = QtWidgets.QVBoxLayout()
-        viewport_tools_layout = QtWidgets.QVBoxLayout()
-        custom_tools_layout = QtWidgets.QVBoxLayout()
-
-        # General tools tab ----------------------------------------------------
-        general_tab = QtWidgets.QWidget()
-        tab_widget.addTab(general_tab, 'General')
-        general_tab.setLayout(general_tools_layout)
-
-        # Naming functions
-        name_ui = renamer.NamingWidget()
-        general_tools_layout.addWidget(name_ui)
-        general_tab.layout().addLayout(SplitterLayout())
-
-        # Attribute functions
-        general_tab.layout().addWidget(Splitter('Edit Attribute'))
-        attr_ui = attributes.AttributeWidget()
-        general_tools_layout.addWidget(attr_ui)
-        general_tab.layout().addLayout(SplitterLayout())
-
-        general_tab.layout().addWidget(Splitter('Create Attribute'))
-        add_attr_ui = attributes.AddAttributesWidget()
-        general_tools_layout.addWidget(add_attr_ui)
-        general_tab.layout().addLayout(SplitterLayout())
-
-        # Node functions
-        general_tab.layout().addWidget(Splitter('Nodes'))
-        node_ui = node_builder.NodeWidget()
-        general_tools_layout.addWidget(node_ui)
-        general_tab.layout().addLayout(SplitterLayout())
+        tab_layouts = {}
+        for tab in TABS:
+            tab_page = QtWidgets.QWidget()
+            tab_page.setLayout(QtWidgets.QVBoxLayout())
+            tab_widget.addTab(tab_page, tab)
+            tab_layouts[tab] = tab_page.layout()
+
+        # Tool sections, built empty --------------------------------------------
+        if dev_reload is None:
+            dev_reload = DEV_RELOAD
+        reload_modules = set() if dev_reload else None
+        self.sections = []
+        expanded_sections = []
+        for tab, title, module_name, widget_name, expanded in SECTIONS:
+            section = LazySection(title, module_name, widget_name,
+                                  reload_modules=reload_modules)
+            self.sections.append(section)
+            if expanded:
+                expanded_sections.append(section)
+            if tab is None:
+                top_layout.addWidget(section)
+            else:
+                tab_layouts[tab].addWidget(section)
+                tab_layouts[tab].addLayout(SplitterLayout())
 
         # Dead Space Killer
-        general_tab.layout().addSpacerItem(
-            QtWidgets.QSpacerItem(5, 5, QtWidgets.QSizePolicy.Minimum,
-                                  QtWidgets.QSizePolicy.Expanding)
-        )
-
-        # Skeleton tools tab ---------------------------------------------------
-        # skeleton_tab = QtWidgets.QWidget()
-        # tab_widget.addTab(skeleton_tab, 'Skeleton')
-        # skeleton_tab.setLayout(skeleton_tools_layout)
-
-        # skeleton_tab.layout().addWidget(Splitter('Skeleton Tools'))
-        # skeleton_ui = skele.SkeletonToolsWidget()
-        # skeleton_tools_layout.addWidget(skeleton_ui)
-        # skeleton_tab.layout().addLayout(SplitterLayout())
-
-        # # Dead Space Killer
-        # skeleton_tab.layout().addSpacerItem(
-        #     QtWidgets.QSpacerItem(5, 5, QtWidgets.QSizePolicy.Minimum,
-        #                           QtWidgets.QSizePolicy.Expanding)
-        # )
-
-        # Deformer tools tab ---------------------------------------------------
-        # deformer_tab = QtWidgets.QWidget()
-        # tab_widget.addTab(deformer_tab, 'Deformers')
-        # deformer_tab.setLayout(deformer_tools_layout)
-
-        # Skinning tools tab ---------------------------------------------------
-        # skinning_tab = QtWidgets.QWidget()
-        # tab_widget.addTab(skinning_tab, 'Skinning')
-        # skinning_tab.setLayout(skinning_tools_layout)
-
-        # Control tools tab ----------------------------------------------------
-        controls_tab = QtWidgets.QWidget()
-        tab_widget.addTab(controls_tab, 'Controls')
-        controls_tab.setLayout(control_tools_layout)
-
-        # Create Controls functions
-        controls_tab.layout().addWidget(Splitter('Create Controls'))
-        curve_ui = curve_builder.ControlCurveWidget()
-        control_tools_layout.addWidget(curve_ui)
-        controls_tab.layout().addLayout(SplitterLayout())
-
-        # Offset functions
-        controls_tab.layout().addWidget(Splitter('Offsets'))
-        offset_ui = utils.OffsetNodeWidget()
-        control_tools_layout.addWidget(offset_ui)
-        controls_tab.layout().addLayout(SplitterLayout())
-
-        # Match transformations
-        controls_tab.layout().addWidget(Splitter('Transformations'))
-        transforms_ui = utils.TransformWidget()
-        control_tools_layout.addWidget(transforms_ui)
-        controls_tab.layout().addLayout(SplitterLayout())
-
-        # Create Rig
-        controls_tab.layout().addWidget(Splitter('Create Rig'))
-        rig_ui = rig_setup.CreateRigWidget()
-        control_tools_layout.addWidget(rig_ui)
-        controls_tab.layout().addLayout(SplitterLayout())
-
-        # Constraints
-        controls_tab.layout().addWidget(Splitter('Constraints'))
-        constraints_ui = rig_utils.ConstraintWidget()
-        control_tools_layout.addWidget(constraints_ui)
-        controls_tab.layout().addLayout(SplitterLayout())
-
-        # Hierarchy
-        controls_tab.layout().addWidget(Splitter('Hierarchy Tree'))
-        hierarchy_ui = hierarchy.HierarchyTreeWidget()
-        control_tools_layout.addWidget(hierarchy_ui)
-        controls_tab.layout().addLayout(SplitterLayout())
-
-        # Vector Aim Constraint
-        # controls_tab.layout().addWidget(Splitter('Vector Aim Constraint (WIP)'))
-        # aim_ui = rig_utils.VectorWidget()
-        # control_tools_layout.addWidget(aim_ui)
-        # controls_tab.layout().addLayout(SplitterLayout())
-
-        # Rivets (Move Later)
-        controls_tab.layout().addWidget(Splitter('Rivet (WIP)'))
-        rivet_ui = rig_utils.RivetWidget()
-        control_tools_layout.addWidget(rivet_ui)
-        controls_tab.layout().addLayout(SplitterLayout())
-
-        # PV Solver (Move Later)
-        controls_tab.layout().addWidget(Splitter('Pole Vector Solver (WIP)'))
-        pv_ui = rig_utils.PVWidget()
-        control_tools_layout.addWidget(pv_ui)
-        controls_tab.layout().addLayout(SplitterLayout())
+        for tab_layout in tab_layouts.values():
+            tab_layout.addSpacerItem(
+                QtWidgets.QSpacerItem(5, 5, QtWidgets.QSizePolicy.Minimum,
+                                      QtWidgets.QSizePolicy.Expanding)
+            )
 
-        # Dead Space Killer
-        controls_tab.layout().addSpacerItem(
-            QtWidgets.QSpacerItem(5, 5, QtWidgets.QSizePolicy.Minimum,
-                                  QtWidgets.QSizePolicy.Expanding)
-        )
-
-        # Viewport tools tab ---------------------------------------------------
-        viewport_tab = QtWidgets.QWidget()
-        tab_widget.addTab(viewport_tab, 'Viewport')
-        viewport_tab.setLayout(viewport_tools_layout)
-
-        # Isolate Selection functions (move later?)
-        viewport_tab.layout().addWidget(Splitter('Isolate Options'))
-        isolate_ui = utils.IsolateSelectionWidget()
-        viewport_tools_layout.addWidget(isolate_ui)
-        viewport_tab.layout().addLayout(SplitterLayout())
-
-        # Dead Space Killer
-        viewport_tools_layout.layout().addSpacerItem(
-            QtWidgets.QSpacerItem(5, 5, QtWidgets.QSizePolicy.Minimum,
-                                  QtWidgets.QSizePolicy.Expanding)
-        )
-
-        # Custom tools tab -----------------------------------------------------
-        custom_tab = QtWidgets.QWidget()
-        tab_widget.addTab(custom_tab, 'Custom')
-        custom_tab.setLayout(custom_tools_layout)
+        # Open sections load once the window is up
+        for section in expanded_sections:
+            QtCore.QTimer.singleShot(0, partial(section.set_expanded, True))
 
     # Review widget delete/closing at a later time
     def dockCloseEventTriggered(self):
         self.deleteInstances()
 
+    def closeEvent(self, event):
+        TOOL_CONTEXTS.cleanup()
+        super(TDBuddy, self).closeEvent(event)
+
     def deleteInstances(self):
+        TOOL_CONTEXTS.cleanup()
         dialog.deleteLater()
 
 
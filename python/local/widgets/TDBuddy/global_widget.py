@@ -1,8 +1,8 @@
 from PySide2 import QtWidgets, QtCore, QtGui
 
 from local.widgets.common.splitter import Splitter
+from local.basic import utils
 
-import maya.mel as mel
 import maya.cmds as cmds
 
 
@@ -70,7 +70,7 @@ class GlobalToolWidget(QtWidgets.QFrame):
         cmds.select(flip, replace=True)
 
     def add_to_isolate(self):
-        mel.eval('isolateSelect -addSelected modelPanel4;')
+        utils.add_isolate_nodes()
 
     def remove_from_isolate(self):
-        mel.eval('isolateSelect -removeSelected modelPanel4;')
+        utils.remove_isolate_nodes()
@@ -3,6 +3,10 @@ from functools import partial
 
 from local.widgets.common.splitter import Splitter, SplitterLayout
 from local.widgets.common.button import ShelfButton
+from local.widgets.common.tool_context import TOOL_CONTEXTS
+from local.decorators.undo import UndoBlock
+from local.rigging.common import chains
+from local.rigging.modules import spine
 
 import maya.mel as mel
 import maya.cmds as cmds
@@ -10,8 +14,6 @@ import maya.cmds as cmds
 
 class SkeletonToolsWidget(QtWidgets.QWidget):
 
-    current_tool_context = None
-
     def __init__(self, parent=None):
         QtWidgets.QWidget.__init__(self)
 
@@ -48,6 +50,9 @@ class SkeletonToolsWidget(QtWidgets.QWidget):
         joint_button = ShelfButton(joint_icon)
 
         insert_joint_button = ShelfButton()
+        self.insert_count_spin = QtWidgets.QSpinBox()
+        self.insert_count_spin.setRange(1, 100)
+        self.insert_count_spin.setToolTip('Joints to insert')
 
         mirror_joint_button = ShelfButton()
 
@@ -57,6 +62,7 @@ class SkeletonToolsWidget(QtWidgets.QWidget):
 
         joint_button_layout.addWidget(joint_button)
         joint_button_layout.addWidget(insert_joint_button)
+        joint_button_layout.addWidget(self.insert_count_spin)
         joint_button_layout.addWidget(mirror_joint_button)
         joint_button_layout.addWidget(locator_button)
         joint_button_layout.addWidget(orient_joint_button)
@@ -95,60 +101,74 @@ class SkeletonToolsWidget(QtWidgets.QWidget):
 
         custom_script_layout.addWidget(create_pivot_button)
 
-        joint_button.clicked.connect(self.joint_tool_context)
-
-    @staticmethod
-    def set_context_index(context_string):
-        index = 1
-        context_name = ''
-        context_condition = True
-        while context_condition is True:
-            context_name = context_string + str(index)
-            context_condition = cmds.contextInfo(context_name, exists=True)
-            index += 1
+        joint_button.clicked.connect(lambda: self.joint_tool_context())
+        ik_handle_button.clicked.connect(lambda: self.ik_handle_context())
+        ik_spline_button.clicked.connect(lambda: self.ik_spline_context())
+        insert_joint_button.clicked.connect(
+            lambda: self.insert_joint_group(self.insert_count_spin.value()))
+        mirror_joint_button.clicked.connect(lambda: self.mirror_joints())
+        orient_joint_button.clicked.connect(lambda: self.orient_joints())
+        ribbon_button.clicked.connect(lambda: self.ribbon_builder())
 
-            if index > 100:
-                print('infinite loop... stopping')
-                return
-
-        return context_name
+        # Tool contexts live as long as the UI
+        self.destroyed.connect(lambda: TOOL_CONTEXTS.cleanup())
 
     def joint_tool_context(self):
-        if cmds.currentCtx() == self.current_tool_context:
-            return
-
-        context_string = self.set_context_index('jointContext')
-
-        cmds.jointCtx(context_string)
-        cmds.setToolTo(context_string)
-        self.current_tool_context = context_string
-        print('Context set to %s' % context_string)
+        TOOL_CONTEXTS.set_tool('joint')
 
     def insert_joint_context(self):
-        pass
-
-    def mirror_joints(self):
-        # May not be needed
-        pass
-
-    def orient_joints(self):
-        # Probably trashed later
-        pass
+        TOOL_CONTEXTS.set_tool('insertJoint')
+
+    def mirror_joints(self, mode='behavior', plane='YZ'):
+        # Only the top selected joint of each hierarchy is needed
+        roots = cmds.ls(selection=True, type='joint', long=True)
+        roots = [root for root in roots
+                 if not any(root.startswith(other + '|') for other in roots)]
+        if not roots:
+            return []
+        with UndoBlock():
+            return chains.mirror_joints(roots, mode=mode, plane=plane)
+
+    def orient_joints(self, orient='xzy', up_vector=(0, 1, 0)):
+        roots = cmds.ls(selection=True, type='joint', long=True)
+        if not roots:
+            return []
+        with UndoBlock():
+            return chains.orient_joints(roots, orient=orient, up_vector=up_vector)
 
     def insert_joint_group(self, joint_count):
-        # insert joints evenly between two selected joints
-        # joint count determined by a slider
-        pass
-
-    def ik_handle_context(self, chain_type):
-        pass
+        # Every selected joint is split evenly towards each of its child joints
+        pairs = []
+        for joint in cmds.ls(selection=True, type='joint', long=True):
+            for child in cmds.listRelatives(joint, children=True, type='joint',
+                                            fullPath=True) or []:
+                pairs.append((joint, child))
+        if not pairs:
+            return []
+        with UndoBlock():
+            inserted = chains.insert_joints(pairs, joint_count)
+            new_joints = [joint for pair_joints in inserted for joint in pair_joints]
+            if new_joints:
+                cmds.select(new_joints)
+        return inserted
+
+    def ik_handle_context(self, chain_type='ikRPsolver'):
+        TOOL_CONTEXTS.set_tool('ikHandle', solverTypeH=chain_type)
 
     def ik_spline_context(self):
-        pass
-
-    def ribbon_builder(self):
-        # Will need to import ribbon script and use previous params
-        pass
+        TOOL_CONTEXTS.set_tool('ikSpline')
+
+    def ribbon_builder(self, joint_count=5):
+        # Selected transforms are the guides, in selection order
+        selection = cmds.ls(selection=True, type='transform')
+        if len(selection) > 1:
+            positions = [cmds.xform(node, query=True, translation=True, worldSpace=True)
+                         for node in selection]
+        else:
+            positions = spine.DEFAULT_POSITIONS
+        with UndoBlock():
+            return spine.build_ribbons([spine.ribbon_spec(positions=positions,
+                                                          joint_count=joint_count)])[0]
 
     def create_pivot(self):
         pass
@@ -0,0 +1,86 @@
+"""
+Session registry of the tool contexts the TD Buddy widgets switch to.  Each
+tool gets one context under a fixed name the first time it is used, and every
+later switch reuses it, so no contexts pile up over a session.  The registry
+deletes its contexts when the UI closes.
+
+Example:
+    tool_context.TOOL_CONTEXTS.set_tool('joint')
+"""
+
+import maya.cmds as cmds
+
+# Context command of each tool type
+CONTEXT_COMMANDS = {
+    'joint': 'jointCtx',
+    'insertJoint': 'insertJointCtx',
+    'ikHandle': 'ikHandleCtx',
+    'ikSpline': 'ikSplineHandleCtx',
+}
+# Tool left active when the registry's contexts are deleted
+DEFAULT_TOOL = 'selectSuperContext'
+
+
+class ToolContextRegistry(object):
+    """
+    Creates each tool context once and caches it by tool type.
+
+    Args:
+        prefix (str): Prefix of the context names, keeping them apart from
+            contexts made by other tools.
+
+    """
+
+    def __init__(self, prefix='tdBuddy'):
+        self.prefix = prefix
+        self._contexts = {}
+
+    def get_context(self, tool):
+        """
+        Returns the context of a tool type, creating it on first use.
+        """
+        context = self._contexts.get(tool)
+        if context and cmds.contextInfo(context, exists=True):
+            return context
+
+        if tool not in CONTEXT_COMMANDS:
+            raise KeyError('No context command registered for tool "{}"!'.format(tool))
+        context = '{}_{}Context'.format(self.prefix, tool)
+        # A context left by an earlier registry (such as a module reload) is
+        # reused rather than duplicated
+        if not cmds.contextInfo(context, exists=True):
+            context = getattr(cmds, CONTEXT_COMMANDS[tool])(context)
+        self._contexts[tool] = context
+        return context
+
+    def set_tool(self, tool, **kwargs):
+        """
+        Switches to a tool's context.  Extra keyword arguments edit the context
+        before it is made current.
+
+        Returns:
+            (str): The context name.
+
+        """
+        context = self.get_context(tool)
+        if kwargs:
+            getattr(cmds, CONTEXT_COMMANDS[tool])(context, edit=True, **kwargs)
+        if cmds.currentCtx() != context:
+            cmds.setToolTo(context)
+        return context
+
+    def cleanup(self):
+        """
+        Deletes every context the registry made, leaving the select tool
+        active if one of them was current.
+        """
+        contexts = [context for context in self._contexts.values()
+                    if cmds.contextInfo(context, exists=True)]
+        if cmds.currentCtx() in contexts:
+            cmds.setToolTo(DEFAULT_TOOL)
+        for context in contexts:
+            cmds.deleteUI(context, toolContext=True)
+        self._contexts = {}
+
+
+TOOL_CONTEXTS = ToolContextRegistry()